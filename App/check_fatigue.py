@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    File name: check_fatigue.py
+    Use: checks the fatigue detector (helpers_fatigue) on every catalogued match with a metabolic power:
+         the onset of each player with fatigue must be close to the breakpoint found by ruptures.Binseg on the same
+         samples, and this breakpoint must be a drop of the metabolic power.
+         Run it from the App folder after changing the settings of the detector. Exits with 1 if a check fails.
+    Author: Lutecity (Melanie Baconnais & Chloe Gobe)
+    Date created: 04/2023
+    Python Version: 3.10.4
+"""
+
+##############################################################
+#                       IMPORTS
+##############################################################
+import sys
+
+from pages.helpers import helpers_catalog, helpers_data, helpers_fatigue
+
+MAX_DISTANCE = 300
+
+##############################################################
+#                       CHECK
+##############################################################
+if __name__ == '__main__':
+    failed = False
+    for match_id in helpers_catalog.get_match_ids() :
+        for teamname in ['Home', 'Away'] :
+            df_fatigue = helpers_data.get_fatigue(match_id, teamname)
+            if df_fatigue is None :
+                continue
+            df_comparison = helpers_fatigue.compare_with_binseg(helpers_data.get_metabolic_power(match_id, teamname), df_fatigue, teamname)
+            print(match_id + ' ' + teamname + ': ' + str(len(df_comparison)) + ' player(s) with fatigue out of ' + str(len(df_fatigue)))
+            if len(df_comparison) :
+                print(df_comparison.round(1).to_string(index=False))
+            failed = failed or bool(((df_comparison['distance'] > MAX_DISTANCE) | (df_comparison['binseg drop (%)'] <= 0)).any())
+    print('KO' if failed else 'OK')
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    File name: convert_data.py
+    Use: converts the large CSV files of assets/Data (tracking, metabolic power) to memory-mappable tables,
+         and builds the StatsBomb / SecondSpectrum player id map of each match (reporting the unmatched players).
+         Run it from the App folder once the CSV files have been exported by the Physical notebooks.
+    Author: Lutecity (Melanie Baconnais & Chloe Gobe) 
+    Date created: 04/2023
+    Python Version: 3.10.4
+"""
+
+##############################################################
+#                       IMPORTS
+##############################################################
+import os
+from pages.helpers import helpers_storage, helpers_catalog, helpers_data, helpers_identity
+
+##############################################################
+#                       CONVERSION
+##############################################################
+DATA_NAMES = ['tracking_home', 'tracking_away', 'metabolic_power_home', 'metabolic_power_away']
+
+if __name__ == '__main__':
+    for name in DATA_NAMES :
+        csv_path = os.path.join(os.getcwd(), 'assets/Data', name + '.csv')
+        if not os.path.isfile(csv_path) :
+            print('Skipping ' + name + ': ' + csv_path + ' not found')
+            continue
+        table_path = helpers_storage.convert_csv_to_table(csv_path, os.path.join(os.getcwd(), 'assets/Data', name))
+        print('Converted ' + csv_path + ' to ' + table_path)
+
+    for match_id in helpers_catalog.get_match_ids() :
+        df_map = helpers_data.build_player_id_map(match_id)
+        if df_map is None :
+            print('Skipping the player id map of ' + match_id + ': no SecondSpectrum metadata')
+            continue
+        helpers_identity.write_player_id_map(df_map, helpers_data.get_match_infos(match_id)['player_id_map_path'])
+        df_unmatched = helpers_identity.get_unmatched_players(df_map)
+        print('Player id map of ' + match_id + ': ' + str(len(df_map) - len(df_unmatched)) + ' players matched, '
+              + str(len(df_unmatched)) + ' unmatched')
+        if len(df_unmatched) :
+            print(df_unmatched.to_string(index=False))
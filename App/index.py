@@ -19,11 +19,13 @@ from dash.dependencies import Input, Output
 from dash import dcc
 from dash import html
 import dash_bootstrap_components as dbc
+import flask
 
 #_____________________________________________________________
 # LOCAL LIBRAIRIES
 from app import app
 import pages
+from pages.helpers import helpers_catalog, helpers_figures
 server = app.server
 
 
@@ -55,7 +57,9 @@ app.layout = html.Div(
 def display_page(pathname):
    page_name = app.strip_relative_path(pathname)
    if not page_name:
-      return pages.match_analysis.match_analysis()
+      return pages.match_analysis.match_analysis(helpers_catalog.get_default_match_id())
+   elif page_name.startswith('match/') and helpers_catalog.has_match(page_name[len('match/'):]) :
+      return pages.match_analysis.match_analysis(page_name[len('match/'):])
    else : 
       return 0
 
@@ -71,5 +75,12 @@ def set_page_active(pathname):
       return True
       
 
+#_____________________________________________________________
+#MONITORING OF THE FIGURE CACHE (hits, misses, evictions, memory)
+@server.route('/monitoring/figures')
+def figure_cache_statistics():
+   return flask.jsonify(helpers_figures.get_figure_statistics())
+
+
 if __name__ == '__main__':
     app.run_server(debug=True)
\ No newline at end of file
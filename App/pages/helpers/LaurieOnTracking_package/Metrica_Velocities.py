@@ -11,6 +11,7 @@ Data can be found at: https://github.com/metrica-sports/sample-data
 
 """
 import numpy as np
+import pandas as pd
 import scipy.signal as signal
 
 def calc_player_velocities(team, smoothing=True, filter_='Savitzky-Golay', window=7, polyorder=1, maxspeed = 12):
@@ -82,6 +83,72 @@ def calc_player_velocities(team, smoothing=True, filter_='Savitzky-Golay', windo
 
     return team
 
+def calc_player_velocities_matrix(team, smoothing=True, filter_='Savitzky-Golay', window=7, polyorder=1, maxspeed = 12):
+    """ calc_player_velocities_matrix( tracking_data )
+
+    Matrix version of calc_player_velocities: the positions of all players are stacked in a single (frames x players)
+    array, so that differencing, outlier removal and smoothing are done for the whole team at once (one savgol_filter
+    call per period). Returns exactly the same numbers as calc_player_velocities.
+
+    Parameters
+    -----------
+        see calc_player_velocities
+
+    Returrns
+    -----------
+       team : the tracking DataFrame with columns for speed in the x & y direction and total speed added
+
+    """
+    # remove any velocity data already in the dataframe
+    team = remove_player_velocities(team)
+
+    # Get the player ids
+    player_ids = np.unique( [ c[:-2] for c in team.columns if c[:4] in ['Home','Away'] ] )
+
+    # stack positions of all players: one column per player
+    x = team[[player+"_x" for player in player_ids]].to_numpy(dtype=float)
+    y = team[[player+"_y" for player in player_ids]].to_numpy(dtype=float)
+
+    # Calculate the timestep from one frame to the next. Should always be 0.04 within the same half
+    dt = team['Time [s]'].diff().to_numpy(dtype=float)[:,None]
+
+    # difference player positions in timestep dt to get unsmoothed estimate of velicity
+    vx = np.full(x.shape, np.nan)
+    vy = np.full(y.shape, np.nan)
+    vx[1:] = np.diff(x, axis=0)
+    vy[1:] = np.diff(y, axis=0)
+    vx = vx / dt
+    vy = vy / dt
+
+    if maxspeed>0:
+        # remove unsmoothed data points that exceed the maximum speed (these are most likely position errors)
+        raw_speed = np.sqrt( vx**2 + vy**2 )
+        vx[ raw_speed>maxspeed ] = np.nan
+        vy[ raw_speed>maxspeed ] = np.nan
+
+    if smoothing:
+        period = team['Period'].to_numpy()
+        for half in [1,2]:
+            half_idx = period==half
+            if not half_idx.any():
+                continue
+            if filter_=='Savitzky-Golay':
+                vx[half_idx] = signal.savgol_filter(vx[half_idx],window_length=window,polyorder=polyorder,axis=0)
+                vy[half_idx] = signal.savgol_filter(vy[half_idx],window_length=window,polyorder=polyorder,axis=0)
+            elif filter_=='moving average':
+                ma_window = np.ones( window ) / window
+                vx[half_idx] = np.column_stack([ np.convolve( vx[half_idx,i] , ma_window, mode='same' ) for i in range(vx.shape[1]) ])
+                vy[half_idx] = np.column_stack([ np.convolve( vy[half_idx,i] , ma_window, mode='same' ) for i in range(vy.shape[1]) ])
+
+    # put player speed in x,y direction, and total speed back in the data frame, in a single concat
+    speed = np.sqrt( vx**2 + vy**2 )
+    columns = [player + suffix for player in player_ids for suffix in ["_vx","_vy","_speed"]]
+    velocities = np.stack([vx,vy,speed], axis=2).reshape(len(team), -1)
+    velocities = pd.DataFrame(velocities, index=team.index, columns=columns)
+    team = pd.concat([team, velocities], axis=1)
+
+    return team
+
 def remove_player_velocities(team):
     # remove player velocoties and acceleeration measures that are already in the 'team' dataframe
     columns = [c for c in team.columns if c.split('_')[-1] in ['vx','vy','ax','ay','speed','acceleration']] # Get the player ids
@@ -1,3 +1,17 @@
 from . import helpers_processing
+from . import helpers_clock
+from . import helpers_events
+from . import helpers_storage
+from . import helpers_position_store
 from . import helpers_graph
-from . import helpers_statistics
\ No newline at end of file
+from . import helpers_statistics
+from . import helpers_metabolic_power
+from . import helpers_fatigue
+from . import helpers_live
+from . import helpers_cache
+from . import helpers_figures
+from . import helpers_identity
+from . import helpers_catalog
+from . import helpers_data
+from . import helpers_season
+from . import helpers_loader
\ No newline at end of file
@@ -0,0 +1,169 @@
+'''
+    This script keeps in memory the tables that are expensive to compute, so that the callbacks
+    only have to read them:
+    - position store of each team of a match: positions, velocities and metabolic power of the players
+      (see helpers_position_store), built once from the tracking data
+    - physical statistics of each team of a match (built from the position store)
+    - metabolic power of each team of a match (built from the position store)
+
+    Each entry remembers the signature of the file it was built from (modification time and size),
+    and is computed again as soon as this file changes.
+'''
+
+# LIBRAIRIES ----------------------------------------------------
+# STANDARD LIBRARIES
+import os
+import hashlib
+import threading
+import pandas as pd
+import warnings
+warnings.simplefilter(action='ignore', category=FutureWarning)
+pd.set_option('max_colwidth', 400)
+pd.set_option('display.max_columns', None)
+pd.options.mode.chained_assignment = None
+
+# LOCAL LIBRARIES
+from pages.helpers import helpers_statistics, helpers_metabolic_power, helpers_storage, helpers_position_store
+
+
+# FUNCTIONS ----------------------------------------------------
+def get_file_signature(path) :
+    '''
+    This function returns the signature of a file (modification time and size).
+    It is used to know if a cached table is still up to date.
+    For the tables written by helpers_storage, the header (written last) is used.
+    '''
+    if helpers_storage.is_table(path) :
+        path = os.path.join(path, helpers_storage.TABLE_HEADER)
+    stat = os.stat(path)
+    return((stat.st_mtime_ns, stat.st_size))
+
+# {path : (file signature, SHA-1 of the file)}
+_hashes = {}
+
+def get_file_hash(path) :
+    '''
+    This function returns the hash of the content of a file (SHA-1), which does not change when the file is copied.
+    The hash is only computed again when the signature of the file changes.
+    '''
+    signature = get_file_signature(path)
+    cached = _hashes.get(path)
+    if cached is not None and cached[0] == signature :
+        return(cached[1])
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 ** 2), b''):
+            sha1.update(chunk)
+    _hashes[path] = (signature, sha1.hexdigest())
+    return(_hashes[path][1])
+
+# {(kind, match_id, teamname) : (file signature, table)}
+_tables = {}
+_tables_locks = {}
+_tables_lock = threading.Lock()
+
+def _get_table_lock(key) :
+    with _tables_lock :
+        if key not in _tables_locks :
+            _tables_locks[key] = threading.Lock()
+        return(_tables_locks[key])
+
+def _get_or_compute_table(key, path, compute) :
+    '''
+    This function returns the table stored under key if the file at path did not change since it was computed.
+    Otherwise the table is computed again with compute(path).
+    Only one thread computes a given table, the others wait for the result.
+    '''
+    signature = get_file_signature(path)
+    with _get_table_lock(key) :
+        cached = _tables.get(key)
+        if cached is not None and cached[0] == signature :
+            return(cached[1])
+        table = compute(path)
+        _tables[key] = (signature, table)
+    return(table)
+
+def get_table(key, path, read) :
+    '''
+    This function returns the table read from path with read(path), kept in memory as long as the file does not change.
+    '''
+    return(_get_or_compute_table(key, path, read))
+
+def read_tracking(tracking_path) :
+    '''
+    This function reads a tracking file exported by the Physical notebooks (CSV file or converted table).
+    '''
+    return(helpers_storage.load_table(tracking_path))
+
+def clear_cache() :
+    '''
+    This function empties the cache.
+    '''
+    with _tables_lock :
+        _tables.clear()
+
+def clear_match(match_id) :
+    '''
+    This function drops the tables of a match from the cache.
+    '''
+    with _tables_lock :
+        for key in [key for key in _tables if key[1] == match_id] :
+            del _tables[key]
+
+def get_match_memory(match_id) :
+    '''
+    This function returns the memory used by the cached tables of a match (bytes).
+    '''
+    with _tables_lock :
+        tables = [table for key, (signature, table) in _tables.items() if key[1] == match_id]
+    return(sum(helpers_position_store.get_memory(table) if isinstance(table, dict) else int(table.memory_usage(deep=True).sum())
+               for table in tables))
+
+
+# POSITION STORE -------------------------------------
+def build_position_store(df_tracking, teamname) :
+    '''
+    This function builds the position store of a team from its tracking data, with the velocities and the metabolic power of the players.
+    '''
+    players, x, y = helpers_position_store.get_tracking_positions(df_tracking, teamname)
+    store = helpers_position_store.build_position_store(df_tracking, teamname)
+    speed = helpers_position_store.compute_velocities(store, x, y)
+    helpers_metabolic_power.compute_store_metabolic_power(store, speed)
+    return(store)
+
+def get_position_store(match_id, teamname, tracking_path) :
+    '''
+    This function returns the position store of a team, built once from the tracking file,
+    then read from memory as long as the tracking file does not change.
+    '''
+    return(_get_or_compute_table(('position_store', match_id, teamname),
+                                 tracking_path,
+                                 lambda path : build_position_store(read_tracking(path), teamname)))
+
+# PHYSICAL STATISTICS -------------------------------------
+def get_physical_statistics(match_id, teamname, tracking_path, teamsheet) :
+    '''
+    This function returns the physical statistics of a team (one row per player).
+    The statistics are computed once from the position store of the team, then read from memory
+    as long as the tracking file does not change.
+    '''
+    return(_get_or_compute_table(('physical_statistics', match_id, teamname),
+                                 tracking_path,
+                                 lambda path : helpers_statistics.aggregate_store_physical_statistics(get_position_store(match_id, teamname, path), teamsheet)))
+
+def get_player_physical_statistics(match_id, teamname, tracking_path, teamsheet, jersey_number) :
+    '''
+    This function returns the physical statistics of one player, read from the team's cached table.
+    '''
+    df_summary = get_physical_statistics(match_id, teamname, tracking_path, teamsheet)
+    return(df_summary[df_summary['jID']==jersey_number])
+
+# METABOLIC POWER -------------------------------------
+def get_metabolic_power(match_id, teamname, tracking_path) :
+    '''
+    This function returns the metabolic power table of a team (one row per second, one column per player),
+    derived from the position store of the team the first time and then read from memory.
+    '''
+    return(_get_or_compute_table(('metabolic_power', match_id, teamname),
+                                 tracking_path,
+                                 lambda path : helpers_metabolic_power.build_store_metabolic_power_table(get_position_store(match_id, teamname, path))))
@@ -0,0 +1,261 @@
+'''
+    This script indexes the matches available in assets/Data, and keeps the data of the matches in use in memory.
+
+    A match is identified by the prefix of its StatsBomb files (<match_id>_events.json, <match_id>_lineups.json).
+    Its SecondSpectrum files (<second_spectrum_id>_SecondSpectrum_meta.json, tracking, metabolic power, player id map,
+    live tracking file <second_spectrum_id>_SecondSpectrum_tracking-live.jsonl written while the match is played)
+    and its descriptive infos (teams, date, score, logos, VAEP file) are given by assets/Data/matches.json.
+    When a match is not described in matches.json, the infos are read from the files themselves.
+
+    The data of the matches (lineups, events, etc.) is loaded on demand and kept in a least recently used cache:
+    when the memory used by the cached matches exceeds MAX_CACHE_MEMORY, the least recently used matches are dropped
+    (with their tables in helpers_cache and their figures in helpers_figures).
+'''
+
+# LIBRAIRIES ----------------------------------------------------
+# STANDARD LIBRARIES
+import os
+import sys
+import json
+import glob
+import threading
+from collections import OrderedDict
+import pandas as pd
+import warnings
+warnings.simplefilter(action='ignore', category=FutureWarning)
+pd.set_option('max_colwidth', 400)
+pd.set_option('display.max_columns', None)
+pd.options.mode.chained_assignment = None
+
+# LOCAL LIBRARIES
+from pages.helpers import helpers_cache, helpers_storage, helpers_figures
+
+DATA_PATH = os.path.join(os.getcwd(),'assets/Data')
+MATCHES_FILE = 'matches.json'
+MAX_CACHE_MEMORY = 1024 ** 3 # bytes
+CATALOG_COLUMNS = ['match_id', 'events_path', 'lineups_path', 'second_spectrum_id', 'statsbomb_game_id', 'meta_path',
+                   'match_date', 'score', 'tracking_home_path', 'tracking_away_path', 'metabolic_power_home_path',
+                   'metabolic_power_away_path', 'home_team_name', 'away_team_name', 'title', 'home_logo', 'away_logo',
+                   'cumulative_vaep_path', 'player_id_map_path', 'live_tracking_path']
+
+
+# MATCH CATALOG ----------------------------------------------------
+def read_second_spectrum_meta(meta_path) :
+    '''
+    This function reads the infos of a match (date, score) from its SecondSpectrum metadata file.
+    '''
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+    return({
+        'match_date' : '{:04d}-{:02d}-{:02d}'.format(meta['year'], meta['month'], meta['day']),
+        'score' : '{} - {}'.format(meta['homeScore'], meta['awayScore']),
+    })
+
+def read_statsbomb_teams(lineups_path) :
+    '''
+    This function reads the names of the teams from a StatsBomb lineups file (home team first).
+    '''
+    with open(lineups_path, encoding='utf-8') as f:
+        data_json_line_up = json.load(f)
+    return([team['team_name'] for team in data_json_line_up])
+
+def build_catalog(data_path = DATA_PATH) :
+    '''
+    This function indexes the matches of data_path and returns a dataframe with one row per match (index: match_id),
+    with the paths of the files of the match and its descriptive infos.
+    '''
+    manifest = {}
+    if os.path.isfile(os.path.join(data_path, MATCHES_FILE)) :
+        with open(os.path.join(data_path, MATCHES_FILE), encoding='utf-8') as f:
+            manifest = {match['match_id'] : match for match in json.load(f)}
+
+    matches = []
+    for events_path in sorted(glob.glob(os.path.join(data_path, 'StatsBomb', '*_events.json'))) :
+        match_id = os.path.basename(events_path)[:-len('_events.json')]
+        lineups_path = os.path.join(data_path, 'StatsBomb', match_id + '_lineups.json')
+        if not os.path.isfile(lineups_path) :
+            continue
+        infos = manifest.get(match_id, {})
+
+        match = {
+            'match_id' : match_id,
+            'events_path' : events_path,
+            'lineups_path' : lineups_path,
+            'second_spectrum_id' : infos.get('second_spectrum_id'),
+            'statsbomb_game_id' : infos.get('statsbomb_game_id'),
+            'meta_path' : None,
+            'player_id_map_path' : None,
+            'live_tracking_path' : None,
+            'match_date' : None,
+            'score' : None,
+        }
+
+        # SecondSpectrum files
+        ss_id = match['second_spectrum_id']
+        if ss_id :
+            meta_path = os.path.join(data_path, 'Second_Spectrum', ss_id + '_SecondSpectrum_meta.json')
+            if os.path.isfile(meta_path) :
+                match['meta_path'] = meta_path
+                match['player_id_map_path'] = os.path.join(data_path, 'Second_Spectrum', ss_id + '_player_id_map.csv')
+                live_tracking = infos.get('live_tracking', os.path.join('Second_Spectrum', ss_id + '_SecondSpectrum_tracking-live.jsonl'))
+                match['live_tracking_path'] = os.path.join(data_path, live_tracking)
+                match.update(read_second_spectrum_meta(meta_path))
+        for name in ['tracking_home', 'tracking_away', 'metabolic_power_home', 'metabolic_power_away'] :
+            default_name = os.path.join('Second_Spectrum', '{}_{}'.format(ss_id, name)) if ss_id else None
+            file_name = infos.get(name, default_name)
+            match[name + '_path'] = helpers_storage.resolve_table_path(os.path.join(data_path, file_name)) if file_name else None
+
+        # Teams and descriptive infos
+        if 'home_team_name' in infos and 'away_team_name' in infos :
+            home_team_name, away_team_name = infos['home_team_name'], infos['away_team_name']
+        else :
+            home_team_name, away_team_name = read_statsbomb_teams(lineups_path)[:2]
+        match['home_team_name'] = home_team_name
+        match['away_team_name'] = away_team_name
+        match['title'] = infos.get('title', home_team_name + ' vs ' + away_team_name)
+        match['match_date'] = infos.get('match_date', match['match_date'])
+        match['score'] = infos.get('score', match['score'])
+        match['home_logo'] = infos.get('home_logo')
+        match['away_logo'] = infos.get('away_logo')
+        cumulative_vaep = infos.get('cumulative_vaep')
+        match['cumulative_vaep_path'] = os.path.join(data_path, cumulative_vaep) if cumulative_vaep else None
+        matches.append(match)
+
+    return(pd.DataFrame(matches, columns=CATALOG_COLUMNS).set_index('match_id'))
+
+_catalog = []
+_catalog_lock = threading.Lock()
+
+def get_catalog() :
+    '''
+    This function returns the catalog of the matches, built the first time it is asked for.
+    '''
+    if not _catalog :
+        with _catalog_lock :
+            if not _catalog :
+                _catalog.append(build_catalog())
+    return(_catalog[0])
+
+def refresh_catalog() :
+    '''
+    This function indexes the matches again (e.g. after new files have been added).
+    '''
+    with _catalog_lock :
+        _catalog.clear()
+        _catalog.append(build_catalog())
+    return(_catalog[0])
+
+def get_match_ids() :
+    '''
+    This function returns the ids of the catalogued matches.
+    '''
+    return(get_catalog().index.tolist())
+
+def get_default_match_id() :
+    '''
+    This function returns the match displayed when no match is given in the URL (the first one of the catalog).
+    '''
+    match_ids = get_match_ids()
+    return(match_ids[0] if match_ids else None)
+
+def has_match(match_id) :
+    '''
+    This function checks if a match is in the catalog.
+    '''
+    return(match_id in get_catalog().index)
+
+def get_match_infos(match_id) :
+    '''
+    This function returns the infos of a match (row of the catalog) as a dictionary, missing infos being None.
+    '''
+    infos = get_catalog().loc[match_id].to_dict()
+    return({key : (None if pd.isnull(value) else value) for key, value in infos.items()})
+
+
+# CACHE OF THE MATCHES' DATA ----------------------------------------------------
+# {match_id : {'lock' : threading.RLock(), 'datasets' : {name : dataset}, 'memory' : bytes}}
+_matches = OrderedDict()
+_matches_lock = threading.Lock()
+
+def get_memory_usage(dataset) :
+    '''
+    This function estimates the memory used by a dataset (dataframes, or tuples/lists of dataframes).
+    '''
+    if isinstance(dataset, pd.DataFrame) :
+        return(int(dataset.memory_usage(deep=True).sum()))
+    if isinstance(dataset, pd.Series) :
+        return(int(dataset.memory_usage(deep=True)))
+    if isinstance(dataset, (tuple, list)) :
+        return(sum(get_memory_usage(d) for d in dataset))
+    if isinstance(dataset, dict) :
+        return(sum(get_memory_usage(d) for d in dataset.values()))
+    return(sys.getsizeof(dataset))
+
+def _get_match_entry(match_id) :
+    with _matches_lock :
+        if match_id not in _matches :
+            _matches[match_id] = {'lock' : threading.RLock(), 'datasets' : {}, 'memory' : 0}
+        _matches.move_to_end(match_id)
+        return(_matches[match_id])
+
+def get_cache_memory() :
+    '''
+    This function returns the memory used by the cached matches, including the tables of helpers_cache.
+    '''
+    with _matches_lock :
+        match_ids = list(_matches)
+        memory = sum(_matches[match_id]['memory'] for match_id in match_ids)
+    return(memory + sum(helpers_cache.get_match_memory(match_id) for match_id in match_ids))
+
+def evict_matches(max_memory = None, keep = None) :
+    '''
+    This function drops the least recently used matches until the cache uses less than max_memory.
+    The match keep (the one being displayed) is never dropped.
+    '''
+    max_memory = MAX_CACHE_MEMORY if max_memory is None else max_memory
+    while get_cache_memory() > max_memory :
+        with _matches_lock :
+            candidates = [match_id for match_id in _matches if match_id != keep]
+            if not candidates :
+                break
+            match_id = candidates[0]
+            del _matches[match_id]
+        helpers_cache.clear_match(match_id)
+        helpers_figures.clear_figures(match_id)
+
+def get_dataset(match_id, name, load) :
+    '''
+    This function returns the dataset name of a match. It is loaded with load() the first time, then kept
+    in memory until the match is dropped from the cache.
+    '''
+    entry = _get_match_entry(match_id)
+    with entry['lock'] :
+        if name not in entry['datasets'] :
+            dataset = load()
+            entry['datasets'][name] = dataset
+            entry['memory'] += get_memory_usage(dataset)
+            loaded = True
+        else :
+            loaded = False
+        dataset = entry['datasets'][name]
+    if loaded :
+        evict_matches(keep = match_id)
+    return(dataset)
+
+def touch_match(match_id) :
+    '''
+    This function marks a match as used (for data cached outside of this script, e.g. in helpers_cache).
+    '''
+    _get_match_entry(match_id)
+    evict_matches(keep = match_id)
+
+def clear_matches() :
+    '''
+    This function empties the cache of the matches' data.
+    '''
+    with _matches_lock :
+        match_ids = list(_matches)
+        _matches.clear()
+    for match_id in match_ids :
+        helpers_cache.clear_match(match_id)
+        helpers_figures.clear_figures(match_id)
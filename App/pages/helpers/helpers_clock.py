@@ -0,0 +1,57 @@
+'''
+    This script converts the times of a match to the official clock shown to the users, on whole arrays at once:
+    - parse_timestamps reads StatsBomb timestamps ('HH:MM:SS.fff') as seconds
+    - get_match_minutes gives the minute of play of a time in seconds (the first minute is 1)
+    - get_official_clock writes the minutes as the official clock: the minutes played after the end of a period
+      are added time, e.g 45'+2 in the first half, 90'+3 in the second half, 105'+1 and 120'+2 in extra time
+      (periods 3 and 4), the penalty shoot-out (period 5) being counted after 120'
+    - get_clock_ticks chooses the ticks of a time axis labelled with the official clock (every 5 minutes)
+'''
+
+# LIBRAIRIES ----------------------------------------------------
+# STANDARD LIBRARIES
+import pandas as pd
+import numpy as np
+import warnings
+warnings.simplefilter(action='ignore', category=FutureWarning)
+pd.set_option('max_colwidth', 400)
+pd.set_option('display.max_columns', None)
+pd.options.mode.chained_assignment = None
+
+PERIOD_ENDS = {1 : 45, 2 : 90, 3 : 105, 4 : 120, 5 : 120} # minutes
+
+
+# FUNCTIONS ----------------------------------------------------
+def parse_timestamps(timestamps) :
+    '''
+    This function converts StatsBomb timestamps ('HH:MM:SS.fff') to seconds.
+    '''
+    return(pd.to_timedelta(pd.Series(timestamps, dtype=object)).dt.total_seconds().to_numpy())
+
+def get_match_minutes(seconds) :
+    '''
+    This function returns the minute of play of times in seconds: a time in ]0, 60] seconds is in minute 1.
+    '''
+    return(np.ceil(np.asarray(seconds, dtype=float) / 60).astype(int))
+
+def get_official_clock(minutes, periods) :
+    '''
+    This function writes minutes of play as the official clock (e.g 45'+2), the minutes played after
+    the end of their period (see PERIOD_ENDS) being added time.
+    '''
+    minutes = pd.Series(np.asarray(minutes)).astype(int)
+    period_ends = pd.Series(np.asarray(periods)).astype(int).map(PERIOD_ENDS)
+    return(np.where(minutes > period_ends,
+                    period_ends.astype(str) + "'+" + (minutes - period_ends).astype(str),
+                    minutes.astype(str)))
+
+def get_clock_ticks(times, official_clock, step = 5) :
+    '''
+    This function returns the ticks of a time axis (times of the axis and their official clock, e.g 30, 45'+5):
+    the first time of each minute that is a multiple of step, counting the added time from the end of the period.
+    '''
+    df_ticks = pd.DataFrame({'time' : np.asarray(times), 'official_clock' : np.asarray(official_clock)})
+    df_ticks = df_ticks.drop_duplicates(subset = 'official_clock')
+    minutes = df_ticks['official_clock'].str.rsplit("'+", n=1).str[-1].astype(int)
+    df_ticks = df_ticks[minutes % step == 0]
+    return(df_ticks['time'].tolist(), df_ticks['official_clock'].tolist())
@@ -0,0 +1,400 @@
+'''
+    This script gives access to the data used by the match analysis page:
+    - StatsBomb lineups and events
+    - VAEP tables
+    - SecondSpectrum teamsheets, tracking data and metabolic power (from the live tracking file while the match is played,
+      see helpers_live)
+    - versions of these datasets, to know if the figures built from them are up to date (see helpers_figures)
+
+    Nothing is read when the app starts: each dataset is loaded the first time it is asked for, then kept in memory.
+    The datasets of a match are kept in the cache of helpers_catalog (dropped when the match is no longer used),
+    the datasets shared by all matches are kept for the lifetime of the app.
+    The loading is thread-safe: if several callbacks ask for the same dataset at the same time, it is loaded only once.
+'''
+
+# LIBRAIRIES ----------------------------------------------------
+# STANDARD LIBRARIES
+import os
+import json
+import functools
+import threading
+import pandas as pd
+import warnings
+warnings.simplefilter(action='ignore', category=FutureWarning)
+pd.set_option('max_colwidth', 400)
+pd.set_option('display.max_columns', None)
+pd.options.mode.chained_assignment = None
+
+from floodlight.io.secondspectrum import read_teamsheets_from_meta_json
+
+# LOCAL LIBRARIES
+from pages.helpers import helpers_processing, helpers_graph, helpers_cache, helpers_storage, helpers_catalog, helpers_identity, helpers_events, helpers_fatigue, helpers_live, helpers_figures
+
+DATA_PATH = helpers_catalog.DATA_PATH
+
+
+# FUNCTIONS ----------------------------------------------------
+def lazy_dataset(load) :
+    '''
+    This decorator loads the dataset returned by load(*args) the first time it is asked for, and keeps it.
+    '''
+    lock = threading.Lock()
+    datasets = {}
+
+    @functools.wraps(load)
+    def get(*args) :
+        if args not in datasets :
+            with lock :
+                if args not in datasets :
+                    datasets[args] = load(*args)
+        return(datasets[args])
+    return(get)
+
+def match_dataset(load) :
+    '''
+    This decorator loads the dataset returned by load(match_id, *args) the first time it is asked for,
+    and keeps it in the cache of the matches (see helpers_catalog).
+    '''
+    @functools.wraps(load)
+    def get(match_id, *args) :
+        return(helpers_catalog.get_dataset(match_id, (load.__name__,) + args, lambda : load(match_id, *args)))
+    return(get)
+
+def read_csv(name, sep=',') :
+    '''
+    This function reads a CSV file of the assets/Data folder.
+    '''
+    return(pd.read_csv(os.path.join(DATA_PATH, name), sep=sep, encoding = "utf-8-sig"))
+
+
+# MATCH INFOS ----------------------------------------------------
+def get_match_infos(match_id) :
+    return(helpers_catalog.get_match_infos(match_id))
+
+def get_home_team_name(match_id) :
+    return(get_match_infos(match_id)['home_team_name'])
+
+def get_teamname(match_id, team_name) :
+    '''
+    This function returns the SecondSpectrum name of a team ('Home' or 'Away') from its StatsBomb name.
+    '''
+    return('Home' if team_name == get_home_team_name(match_id) else 'Away')
+
+
+# STATSBOMB INFOS ----------------------------------------------------
+@match_dataset
+def get_line_up_dataframes(match_id) :
+    '''
+    Formations, line up and events (cards, substitutions) extracted from the StatsBomb lineups file.
+    '''
+    with open(get_match_infos(match_id)['lineups_path'], encoding='utf-8') as f:
+        data_json_line_up = json.load(f)
+    return(helpers_processing.extract_dataframe_from_json(data_json_line_up))
+
+def get_line_up_infos(match_id) :
+    return(get_line_up_dataframes(match_id)[1])
+
+@match_dataset
+def get_line_up(match_id) :
+    '''
+    Line up of both teams, with the coordinates of each player on the pitch.
+    '''
+    home_team_name = get_home_team_name(match_id)
+    formations_infos, df_line_up_infos, events_infos = get_line_up_dataframes(match_id)
+    df_line_up_home = df_line_up_infos[(df_line_up_infos['team_name'] == home_team_name)]
+    df_line_up_away = df_line_up_infos[~(df_line_up_infos['team_name'] == home_team_name)]
+    df_formation_home = formations_infos[(formations_infos['reason'] == "Starting XI") &
+                                        (formations_infos['team_name'] == home_team_name)]
+    df_formation_away = formations_infos[(formations_infos['reason'] == "Starting XI") &
+                                        ~(formations_infos['team_name'] == home_team_name)]
+    formation_home = str(df_formation_home['formation'].values[0])
+    formation_away = str(df_formation_away['formation'].values[0])
+
+    df_home = helpers_graph.create_df_line_up_stat(formation_home,df_line_up_home, events_infos,type = 'home')
+    df_away = helpers_graph.create_df_line_up_stat(formation_away,df_line_up_away, events_infos,type = 'away')
+    df_line_up = pd.concat([df_home, df_away])
+    df_line_up = helpers_graph.add_emojis_to_events(df_line_up)
+    return(df_line_up)
+
+@match_dataset
+def get_substitutes(match_id) :
+    '''
+    Substitutes of the home team and of the away team.
+    '''
+    home_team_name = get_home_team_name(match_id)
+    df_line_up = get_line_up(match_id)
+    df_substitutes_home =  df_line_up[~(df_line_up['from']==0) &
+                                        (df_line_up['team_name'] == home_team_name)]
+    df_substitutes_away =  df_line_up[~(df_line_up['from'] == 0) &
+                                        ~(df_line_up['team_name'] == home_team_name)].sort_values(by = 'from')
+    return(df_substitutes_home, df_substitutes_away)
+
+@match_dataset
+def get_events(match_id) :
+    '''
+    Events of the match, with the columns of helpers_events.EVENTS_SCHEMA.
+    '''
+    return(helpers_events.read_events(get_match_infos(match_id)['events_path']))
+
+
+# TECHNICAL INFOS ----------------------------------------------------
+@match_dataset
+def get_cumulative_vaep(match_id) :
+    '''
+    Cumulative VAEP of the players during the match (empty if it has not been computed for this match).
+    '''
+    path = get_match_infos(match_id)['cumulative_vaep_path']
+    if not path :
+        return(pd.DataFrame(columns=['player_id','team_name','adjusted_vaep','time','official_clock']))
+    return(pd.read_csv(path, sep=',', encoding = "utf-8-sig"))
+
+@lazy_dataset
+def get_mean_vaep() :
+    return(read_csv('other_games_grouped_cumulative_vaep.csv'))
+
+@lazy_dataset
+def get_substitution_vaep() :
+    return(read_csv('vaep_rating_on_previous_games_per_positions.csv'))
+
+
+# SECOND SPECTRUM INFOS ----------------------------------------------------
+@match_dataset
+def get_teamsheets(match_id) :
+    '''
+    SecondSpectrum teamsheets of the home team and of the away team (None if the match has no SecondSpectrum data).
+    '''
+    meta_path = get_match_infos(match_id)['meta_path']
+    if not meta_path :
+        return(None, None)
+    teamsheet = read_teamsheets_from_meta_json(meta_path)
+    teamsheet_home = teamsheet['Home']
+    teamsheet_home['player'] = teamsheet_home['player'].str.replace("Angeldahl","Angeldal")
+    teamsheet_away = teamsheet['Away']
+    return(teamsheet_home, teamsheet_away)
+
+def get_teamsheet(match_id, teamname) :
+    teamsheet_home, teamsheet_away = get_teamsheets(match_id)
+    return(teamsheet_home if teamname == 'Home' else teamsheet_away)
+
+@match_dataset
+def get_player_id_map(match_id) :
+    '''
+    Map between the StatsBomb and the SecondSpectrum players of the match (see helpers_identity).
+    It is read from the file written by convert_data.py next to the SecondSpectrum metadata, as long as the metadata
+    and the lineups have not changed since, otherwise it is built in memory. None if the match has no SecondSpectrum data.
+    '''
+    match_infos = get_match_infos(match_id)
+    if not match_infos['meta_path'] :
+        return(None)
+    path = match_infos['player_id_map_path']
+    if helpers_identity.is_up_to_date(path, [match_infos['meta_path'], match_infos['lineups_path']]) :
+        return(helpers_identity.read_player_id_map(path))
+    return(build_player_id_map(match_id))
+
+def build_player_id_map(match_id) :
+    '''
+    Map between the StatsBomb and the SecondSpectrum players of the match, built from the lineups and the teamsheets
+    (None if the match has no SecondSpectrum data). convert_data.py writes it with helpers_identity.write_player_id_map.
+    '''
+    match_infos = get_match_infos(match_id)
+    if not match_infos['meta_path'] :
+        return(None)
+    teamsheet_home, teamsheet_away = get_teamsheets(match_id)
+    return(helpers_identity.build_player_id_map(get_line_up_infos(match_id),
+                                                {'Home' : teamsheet_home, 'Away' : teamsheet_away},
+                                                match_infos['home_team_name']))
+
+def get_tracking_path(match_id, teamname) :
+    '''
+    Path of the tracking data of a team ('Home' or 'Away'): converted table if any, CSV file otherwise.
+    '''
+    return(get_match_infos(match_id)['tracking_' + teamname.lower() + '_path'])
+
+def get_live_match(match_id) :
+    '''
+    Live state of the match (see helpers_live), started the first time its live tracking file is found.
+    None if the match is not played live.
+    '''
+    match_infos = get_match_infos(match_id)
+    path = match_infos['live_tracking_path']
+    if not path or not os.path.isfile(path) :
+        return(helpers_live.get_live_match(match_id))
+    teamsheet_home, teamsheet_away = get_teamsheets(match_id)
+    return(helpers_live.start_live_match(match_id, path, {'Home' : teamsheet_home, 'Away' : teamsheet_away}))
+
+def get_physical_statistics(match_id, teamname, jersey_number) :
+    '''
+    Physical statistics of a player, read from the cache (computed once per team), or from the live match.
+    None if the tracking data of the team is not available.
+    '''
+    live = get_live_match(match_id)
+    if live is not None :
+        df_summary = helpers_live.get_physical_statistics(live, teamname)
+        return(df_summary[df_summary['jID']==jersey_number])
+    tracking_path = get_tracking_path(match_id, teamname)
+    if tracking_path is None :
+        return(None)
+    helpers_catalog.touch_match(match_id)
+    return(helpers_cache.get_player_physical_statistics(match_id, teamname, tracking_path,
+                                                        get_teamsheet(match_id, teamname), jersey_number))
+
+def get_metabolic_power(match_id, teamname) :
+    '''
+    Metabolic power of a team ('Home' or 'Away'), derived from the tracking data when it is available,
+    otherwise read from the precomputed files. None if neither is available.
+    While the match is played, it is the metabolic power so far, from the live match.
+    '''
+    live = get_live_match(match_id)
+    if live is not None :
+        return(helpers_live.get_metabolic_power(live, teamname))
+    tracking_path = get_tracking_path(match_id, teamname)
+    if tracking_path :
+        helpers_catalog.touch_match(match_id)
+        return(helpers_cache.get_metabolic_power(match_id, teamname, tracking_path))
+    return(_get_precomputed_metabolic_power(match_id, teamname))
+
+@match_dataset
+def _get_precomputed_metabolic_power(match_id, teamname) :
+    path = get_match_infos(match_id)['metabolic_power_' + teamname.lower() + '_path']
+    if not path :
+        return(None)
+    return(helpers_storage.load_table(path))
+
+def get_fatigue(match_id, teamname) :
+    '''
+    Fatigue of all the players of a team ('Home' or 'Away') over the second half (see helpers_fatigue),
+    with their StatsBomb id and name. It is computed once per team, and again only if the metabolic power changes.
+    While the match is played, it is read from the fatigue detectors of the live match.
+    None if the metabolic power of the team is not available.
+    '''
+    live = get_live_match(match_id)
+    if live is not None :
+        return(add_player_names(match_id, teamname, helpers_live.get_fatigue(live, teamname)))
+    path = get_tracking_path(match_id, teamname) or get_match_infos(match_id)['metabolic_power_' + teamname.lower() + '_path']
+    if not path :
+        return(None)
+    helpers_catalog.touch_match(match_id)
+    return(helpers_cache.get_table(('fatigue', match_id, teamname), path, lambda path : _compute_fatigue(match_id, teamname)))
+
+def _compute_fatigue(match_id, teamname) :
+    return(add_player_names(match_id, teamname, helpers_fatigue.compute_fatigue_table(get_metabolic_power(match_id, teamname), teamname, max_workers=1)))
+
+def add_player_names(match_id, teamname, df_fatigue) :
+    '''
+    This function adds the StatsBomb id and name of the players to a table with a second_spectrum_id column.
+    '''
+    df_players = get_player_id_map(match_id)
+    if df_players is None :
+        return(df_fatigue.assign(player_id=None, player_name=None))
+    df_players = df_players[df_players['teamname'] == teamname].dropna(subset=['second_spectrum_id'])
+    df_players['second_spectrum_id'] = df_players['second_spectrum_id'].astype(int)
+    df_fatigue = df_fatigue.merge(df_players[['second_spectrum_id', 'player_id', 'player_name']], on='second_spectrum_id', how='left')
+    return(df_fatigue)
+
+def get_player_fatigue(match_id, teamname, second_spectrum_id) :
+    '''
+    Fatigue of one player, read from the team's cached table (None if it is not available).
+    '''
+    df_fatigue = get_fatigue(match_id, teamname)
+    if df_fatigue is None or not (df_fatigue['second_spectrum_id'] == second_spectrum_id).any() :
+        return(None)
+    return(df_fatigue[df_fatigue['second_spectrum_id'] == second_spectrum_id].iloc[0])
+
+
+# DATA VERSIONS ----------------------------------------------------
+def get_line_up_version(match_id) :
+    '''
+    Version of the line up of a match (signature of its StatsBomb lineups file).
+    '''
+    return(helpers_figures.get_data_version([get_match_infos(match_id)['lineups_path']]))
+
+def get_vaep_version(match_id) :
+    '''
+    Version of the VAEP tables of a match (signatures of the cumulative VAEP of the match and of the other games).
+    '''
+    return(helpers_figures.get_data_version([get_match_infos(match_id)['cumulative_vaep_path'],
+                                             os.path.join(DATA_PATH, 'other_games_grouped_cumulative_vaep.csv')]))
+
+def get_metabolic_power_version(match_id, teamname) :
+    '''
+    Version of the metabolic power and of the fatigue of a team: number of updates of the live match while it is played,
+    signatures of the tracking and metabolic power files otherwise.
+    '''
+    live = get_live_match(match_id)
+    if live is not None :
+        return(('live', helpers_live.get_version(live)))
+    match_infos = get_match_infos(match_id)
+    return(helpers_figures.get_data_version([get_tracking_path(match_id, teamname),
+                                             match_infos['metabolic_power_' + teamname.lower() + '_path']]))
+
+
+# PLAYER CONTEXT ----------------------------------------------------
+@match_dataset
+def get_player_index(match_id) :
+    '''
+    Index of the players of the match by StatsBomb player id: line up row, infos row
+    and SecondSpectrum id (None if the player is not in the SecondSpectrum data) of each player.
+    '''
+    df_line_up = get_line_up(match_id).drop_duplicates('player_id').set_index('player_id', drop=False)
+    df_line_up_infos = get_line_up_infos(match_id).drop_duplicates('player_id').set_index('player_id', drop=False)
+    df_map = get_player_id_map(match_id)
+    if df_map is None :
+        second_spectrum_ids = {}
+    else :
+        df_map = df_map[df_map['second_spectrum_id'].notnull()]
+        second_spectrum_ids = dict(zip(df_map['player_id'], df_map['second_spectrum_id'].astype(int)))
+
+    player_index = {}
+    for player_id in df_line_up.index :
+        second_spectrum_id = second_spectrum_ids.get(player_id)
+        player_index[int(player_id)] = {
+            'line_up' : df_line_up.loc[player_id],
+            'infos' : df_line_up_infos.loc[player_id],
+            'second_spectrum_id' : None if second_spectrum_id is None else int(second_spectrum_id),
+        }
+    return(player_index)
+
+def get_player_context(match_id, player_id) :
+    '''
+    This function returns the context of a player, i.e everything the panels of the sidebar
+    need to know about the player: ids, team, position.
+    It returns a dictionary (stored in the page by a dcc.Store), None if the player is not in the line up.
+    '''
+    player = get_player_index(match_id).get(player_id)
+    if player is None :
+        return(None)
+    player_infos = player['infos']
+
+    return({
+        'player_id' : int(player_id),
+        'player_name' : player_infos['player_name'],
+        'jersey_number' : int(player_infos['jersey_number']),
+        'team_name' : player_infos['team_name'],
+        'teamname' : get_teamname(match_id, player_infos['team_name']),
+        'position' : player['line_up']['position'], # position on the pitch
+        'position_name' : player_infos['position'], # first position of the player in the StatsBomb lineups
+        'position_id' : int(player_infos['position_id']),
+        'second_spectrum_id' : player['second_spectrum_id'],
+    })
+
+_warm_lock = threading.Lock()
+_warm_threads = {}
+
+def warm_tracking_data(match_id) :
+    '''
+    This function computes the physical statistics, the metabolic power and the fatigue of both teams in a background thread,
+    so that the page can be used while the tracking data is loading. It only starts one thread per match at a time.
+    '''
+    def warm() :
+        for teamname in ['Home', 'Away'] :
+            tracking_path = get_tracking_path(match_id, teamname)
+            if tracking_path :
+                helpers_cache.get_physical_statistics(match_id, teamname, tracking_path, get_teamsheet(match_id, teamname))
+            get_metabolic_power(match_id, teamname)
+            get_fatigue(match_id, teamname)
+
+    with _warm_lock :
+        if match_id not in _warm_threads or not _warm_threads[match_id].is_alive() :
+            _warm_threads[match_id] = threading.Thread(target=warm, daemon=True)
+            _warm_threads[match_id].start()
+    return(_warm_threads[match_id])
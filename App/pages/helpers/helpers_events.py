@@ -0,0 +1,196 @@
+'''
+    This script loads the StatsBomb events files into dataframes with a fixed schema,
+    instead of normalizing all the (hundreds of, mostly empty) fields of the events.
+
+    Each column of EVENTS_SCHEMA is read from a path in the event (e.g. ('pass', 'outcome', 'name') -> pass_outcome_name,
+    the same name as with pd.json_normalize(events, sep="_")) and typed:
+    - category : repeated strings (event types, outcomes, team and player names)
+    - id : nullable integers (Int64)
+    - float, int
+    - flag : StatsBomb booleans, only given when true (False when missing)
+    - string : free strings (event uuid, timestamp)
+    - location : [x, y] coordinates, split into <name>_x / <name>_y columns
+
+    The files are parsed with orjson when it is installed, with the json library otherwise.
+'''
+
+# LIBRAIRIES ----------------------------------------------------
+# STANDARD LIBRARIES
+import json
+import pandas as pd
+import numpy as np
+import warnings
+warnings.simplefilter(action='ignore', category=FutureWarning)
+pd.set_option('max_colwidth', 400)
+pd.set_option('display.max_columns', None)
+pd.options.mode.chained_assignment = None
+
+try :
+    import orjson
+except ImportError :
+    orjson = None
+
+EVENTS_SCHEMA = {
+    # Event
+    'id' : (('id',), 'string'),
+    'index' : (('index',), 'int'),
+    'period' : (('period',), 'int'),
+    'timestamp' : (('timestamp',), 'string'),
+    'minute' : (('minute',), 'int'),
+    'second' : (('second',), 'int'),
+    'type_id' : (('type', 'id'), 'id'),
+    'type_name' : (('type', 'name'), 'category'),
+    'possession' : (('possession',), 'id'),
+    'possession_team_name' : (('possession_team', 'name'), 'category'),
+    'play_pattern_name' : (('play_pattern', 'name'), 'category'),
+    'team_id' : (('team', 'id'), 'id'),
+    'team_name' : (('team', 'name'), 'category'),
+    'player_id' : (('player', 'id'), 'id'),
+    'player_name' : (('player', 'name'), 'category'),
+    'position_id' : (('position', 'id'), 'id'),
+    'position_name' : (('position', 'name'), 'category'),
+    'location' : (('location',), 'location'),
+    'duration' : (('duration',), 'float'),
+    'under_pressure' : (('under_pressure',), 'flag'),
+    'counterpress' : (('counterpress',), 'flag'),
+    'obv_total_net' : (('obv_total_net',), 'float'),
+    # Pass
+    'pass_recipient_id' : (('pass', 'recipient', 'id'), 'id'),
+    'pass_recipient_name' : (('pass', 'recipient', 'name'), 'category'),
+    'pass_length' : (('pass', 'length'), 'float'),
+    'pass_angle' : (('pass', 'angle'), 'float'),
+    'pass_end_location' : (('pass', 'end_location'), 'location'),
+    'pass_height_name' : (('pass', 'height', 'name'), 'category'),
+    'pass_body_part_name' : (('pass', 'body_part', 'name'), 'category'),
+    'pass_type_name' : (('pass', 'type', 'name'), 'category'),
+    'pass_outcome_name' : (('pass', 'outcome', 'name'), 'category'),
+    'pass_cross' : (('pass', 'cross'), 'flag'),
+    'pass_switch' : (('pass', 'switch'), 'flag'),
+    'pass_shot_assist' : (('pass', 'shot_assist'), 'flag'),
+    'pass_goal_assist' : (('pass', 'goal_assist'), 'flag'),
+    # Carry
+    'carry_end_location' : (('carry', 'end_location'), 'location'),
+    # Shot
+    'shot_statsbomb_xg' : (('shot', 'statsbomb_xg'), 'float'),
+    'shot_end_location' : (('shot', 'end_location'), 'location'),
+    'shot_body_part_name' : (('shot', 'body_part', 'name'), 'category'),
+    'shot_type_name' : (('shot', 'type', 'name'), 'category'),
+    'shot_outcome_name' : (('shot', 'outcome', 'name'), 'category'),
+    # Duels and defensive actions
+    'duel_type_name' : (('duel', 'type', 'name'), 'category'),
+    'duel_outcome_name' : (('duel', 'outcome', 'name'), 'category'),
+    'interception_outcome_name' : (('interception', 'outcome', 'name'), 'category'),
+    'dribble_outcome_name' : (('dribble', 'outcome', 'name'), 'category'),
+    'ball_receipt_outcome_name' : (('ball_receipt', 'outcome', 'name'), 'category'),
+    'goalkeeper_outcome_name' : (('goalkeeper', 'outcome', 'name'), 'category'),
+    'foul_committed_card_name' : (('foul_committed', 'card', 'name'), 'category'),
+    'bad_behaviour_card_name' : (('bad_behaviour', 'card', 'name'), 'category'),
+    # Substitution
+    'substitution_replacement_id' : (('substitution', 'replacement', 'id'), 'id'),
+    'substitution_replacement_name' : (('substitution', 'replacement', 'name'), 'category'),
+}
+
+
+# FUNCTIONS ----------------------------------------------------
+def read_json(path) :
+    '''
+    This function parses a JSON file, with orjson when it is installed.
+    '''
+    if orjson is not None :
+        with open(path, 'rb') as f :
+            return(orjson.loads(f.read()))
+    with open(path, encoding='utf-8') as f :
+        return(json.load(f))
+
+def extract_values(items, path) :
+    '''
+    This function extracts the value at path (tuple of keys) of each item, None when it is missing.
+    '''
+    values = [item.get(path[0]) for item in items]
+    for key in path[1:] :
+        values = [value.get(key) if isinstance(value, dict) else None for value in values]
+    return(values)
+
+def extract_schema_values(events, schema) :
+    '''
+    This function extracts the values of all the columns of schema.
+    The nested fields (pass, shot, duel...) are only looked for in the events that have them:
+    the events having a given first key are found once, then all its fields are read from these events only.
+    '''
+    n_events = len(events)
+    groups = {}
+    for name, (path, kind) in schema.items() :
+        groups.setdefault(path[0], []).append((name, path))
+
+    columns = {}
+    for key, fields in groups.items() :
+        if all(len(path) == 1 for name, path in fields) :
+            values = [event.get(key) for event in events]
+            for name, path in fields :
+                columns[name] = values
+            continue
+        positions, items = [], []
+        for i, event in enumerate(events) :
+            item = event.get(key)
+            if item is not None :
+                positions.append(i)
+                items.append(item)
+        for name, path in fields :
+            values = [None] * n_events
+            for i, value in zip(positions, extract_values(items, path[1:]) if len(path) > 1 else items) :
+                values[i] = value
+            columns[name] = values
+    return(columns)
+
+def build_column(values, kind) :
+    '''
+    This function builds the column(s) of a schema entry from the extracted values.
+    It returns a list of (suffix, column), the location columns being split in two.
+    '''
+    if kind == 'category' :
+        return([('', pd.Categorical(values))])
+    if kind == 'id' :
+        return([('', pd.array(values, dtype='Int64'))])
+    if kind == 'int' :
+        return([('', np.array(values, dtype=np.int64))])
+    if kind == 'float' :
+        return([('', np.array([np.nan if value is None else value for value in values], dtype=float))])
+    if kind == 'flag' :
+        return([('', np.array([value is True for value in values], dtype=bool))])
+    if kind == 'location' :
+        x = np.array([value[0] if value else np.nan for value in values], dtype=float)
+        y = np.array([value[1] if value else np.nan for value in values], dtype=float)
+        return([('_x', x), ('_y', y)])
+    return([('', np.array(values, dtype=object))])
+
+def build_events_dataframe(events, schema = EVENTS_SCHEMA) :
+    '''
+    This function builds the dataframe of a list of StatsBomb events (parsed JSON), with the columns of schema.
+    '''
+    values = extract_schema_values(events, schema)
+    columns = {}
+    for name, (path, kind) in schema.items() :
+        for suffix, column in build_column(values[name], kind) :
+            columns[name + suffix] = column
+    return(pd.DataFrame(columns))
+
+def read_events(path, schema = EVENTS_SCHEMA) :
+    '''
+    This function reads a StatsBomb events file (see the description of this script).
+    '''
+    return(build_events_dataframe(read_json(path), schema))
+
+def concat_events(frames) :
+    '''
+    This function concatenates the events of several matches, keeping the categorical columns
+    categorical (pd.concat turns them to objects when their categories differ).
+    '''
+    frames = [df for df in frames if len(df)]
+    if not frames :
+        return(pd.DataFrame())
+    columns = frames[0].columns
+    categorical_columns = [col for col in columns if isinstance(frames[0][col].dtype, pd.CategoricalDtype)]
+    df_events = pd.concat([df.drop(columns=categorical_columns) for df in frames], ignore_index=True)
+    for col in categorical_columns :
+        df_events[col] = pd.api.types.union_categoricals([df[col] for df in frames])
+    return(df_events[columns])
@@ -0,0 +1,245 @@
+'''
+    This script detects the fatigue of a player, i.e a lasting drop of their metabolic power, in the second half.
+
+    The detector is an online one-sided CUSUM, updated in O(1) for each new sample of metabolic power
+    and keeping a constant state per player, so that it can run on all the players as the tracking data arrives:
+    - the first `warmup` samples of a player (5 minutes by default, the window of the metabolic power) are skipped,
+      the window filling up
+    - the reference power is the mean of the player's first half, or of the next `warmup` samples for a player
+      coming on in the second half (the start of the second half, the most intense phase, would flag everybody)
+    - each sample of the second half then adds its relative drop under the reference, minus an allowed drift
+      of `drift` (15%), to the CUSUM statistic (never below 0)
+    - fatigue is detected when the statistic reaches `threshold`, e.g a drop of 25% lasting 10 minutes; its onset
+      is the time at which the statistic last left 0, and stays the same once detected
+    The confidence is the statistic relative to the threshold (1 when the fatigue is detected).
+    When a player leaves the pitch, the metabolic power drains to 0 over the window: these samples are removed
+    (mask_window_drain), or not given to the detector while the match is played.
+
+    compute_fatigue_table runs the detector on every player of a team at once (one process per player column),
+    and returns one row per player with the onset of their fatigue and the drop of their metabolic power.
+
+    find_fatigue_threshold_binseg is the previous offline detection (one breakpoint found by ruptures.Binseg
+    on the whole second half), kept as a reference to validate the online detector (compare_with_binseg, check_fatigue.py):
+    on the shipped match, each onset is within 70 seconds of a breakpoint that is a drop of the metabolic power.
+'''
+
+# LIBRAIRIES ----------------------------------------------------
+# STANDARD LIBRARIES
+import math
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import numpy as np
+import ruptures as rpt
+import warnings
+warnings.simplefilter(action='ignore', category=FutureWarning)
+pd.set_option('max_colwidth', 400)
+pd.set_option('display.max_columns', None)
+pd.options.mode.chained_assignment = None
+
+FATIGUE_WARMUP = 300
+FATIGUE_DRIFT = 0.15
+FATIGUE_THRESHOLD = 60
+FATIGUE_DRAIN_RATIO = 0.1
+FATIGUE_COLUMNS = ['teamname', 'second_spectrum_id', 'onset', 'confidence', 'last_time', 'pre_mean', 'post_mean', 'drop', 'drop (%)']
+
+
+# FUNCTIONS ----------------------------------------------------
+def create_fatigue_detector(warmup = FATIGUE_WARMUP, drift = FATIGUE_DRIFT, threshold = FATIGUE_THRESHOLD) :
+    '''
+    This function creates the state of the fatigue detector of a player.
+    '''
+    detector = {
+        'warmup' : warmup,
+        'drift' : drift,
+        'threshold' : threshold,
+        'n_samples' : 0,
+        'n_reference' : 0,
+        'reference' : 0.0,
+        'statistic' : 0.0,
+        'start_time' : None,
+        'onset' : None,
+        'last_time' : None,
+    }
+    return(detector)
+
+def update_fatigue_detector(detector, time, value, period = 2) :
+    '''
+    This function updates the detector with a new sample of metabolic power of a period (missing samples are ignored).
+    '''
+    if value is None or math.isnan(value) :
+        return(detector)
+    detector['last_time'] = time
+
+    # Window of the metabolic power filling up
+    detector['n_samples'] += 1
+    if detector['n_samples'] <= detector['warmup'] :
+        return(detector)
+
+    # Reference power: running mean of the first half, or of the first samples of a substitute
+    if period == 1 or detector['n_reference'] < detector['warmup'] :
+        detector['n_reference'] += 1
+        detector['reference'] += (value - detector['reference']) / detector['n_reference']
+        return(detector)
+    if detector['reference'] <= 0 :
+        return(detector)
+
+    # CUSUM of the relative drops under the reference
+    statistic = detector['statistic'] + (detector['reference'] - value) / detector['reference'] - detector['drift']
+    if statistic <= 0 :
+        statistic = 0.0
+        detector['start_time'] = None
+    elif detector['start_time'] is None :
+        detector['start_time'] = time
+    detector['statistic'] = statistic
+    if detector['onset'] is None and statistic >= detector['threshold'] :
+        detector['onset'] = detector['start_time']
+    return(detector)
+
+def get_fatigue_onset(detector) :
+    '''
+    This function returns the onset of the fatigue (None if it has not been detected) and the confidence of the detector.
+    '''
+    return(detector['onset'], min(1.0, detector['statistic'] / detector['threshold']))
+
+def run_fatigue_detector(time_sec, metabolic_power, period = None, **kwargs) :
+    '''
+    This function feeds a whole series of metabolic power to a new detector, and returns the detector.
+    The periods of the samples are given by period (all in the second half by default).
+    '''
+    detector = create_fatigue_detector(**kwargs)
+    period = np.full(len(time_sec), 2) if period is None else np.asarray(period)
+    for time, value, period_id in zip(np.asarray(time_sec, dtype=float).tolist(), np.asarray(metabolic_power, dtype=float).tolist(), period.tolist()) :
+        update_fatigue_detector(detector, time, value, period_id)
+    return(detector)
+
+def mask_window_drain(metabolic_power, window = FATIGUE_WARMUP, ratio = FATIGUE_DRAIN_RATIO) :
+    '''
+    This function removes the samples of a player after they left the pitch: the metabolic power, summed over a window,
+    then drains to 0 during `window` samples. The series ends with a drain when its last value is under `ratio` of its median.
+    '''
+    metabolic_power = np.array(metabolic_power, dtype=float)
+    valid = np.flatnonzero(~np.isnan(metabolic_power))
+    if len(valid) and metabolic_power[valid[-1]] < ratio * np.median(metabolic_power[valid]) :
+        metabolic_power[valid[-window:]] = np.nan
+    return(metabolic_power)
+
+def find_fatigue_threshold(time_sec, metabolic_power) :
+    '''
+    This function finds the period of fatigue of a player, [onset, end of the series], with the online detector.
+    It returns None if no fatigue has been detected.
+    '''
+    detector = run_fatigue_detector(time_sec, metabolic_power)
+    onset, confidence = get_fatigue_onset(detector)
+    if onset is None :
+        return(None)
+    return([onset, detector['last_time']])
+
+def summarize_player_fatigue(second_spectrum_id, detector, time_sec, metabolic_power) :
+    '''
+    This function returns the row of a player: onset and confidence of the player's detector, time of the last valid sample,
+    mean metabolic power before and after the onset (NaN if no fatigue has been detected) and their difference.
+    '''
+    time_sec = np.asarray(time_sec, dtype=float)
+    metabolic_power = np.asarray(metabolic_power, dtype=float)
+    onset, confidence = get_fatigue_onset(detector)
+
+    pre_mean, post_mean = np.nan, np.nan
+    if onset is not None :
+        is_valid = ~np.isnan(metabolic_power)
+        pre_mean = metabolic_power[is_valid & (time_sec < onset)].mean()
+        post_mean = metabolic_power[is_valid & (time_sec >= onset)].mean()
+    row = {
+        'second_spectrum_id' : second_spectrum_id,
+        'onset' : np.nan if onset is None else onset,
+        'confidence' : confidence,
+        'last_time' : np.nan if detector['last_time'] is None else detector['last_time'],
+        'pre_mean' : pre_mean,
+        'post_mean' : post_mean,
+        'drop' : pre_mean - post_mean,
+        'drop (%)' : (pre_mean - post_mean) / pre_mean * 100,
+    }
+    return(row)
+
+def detect_player_fatigue(second_spectrum_id, period, time_sec, metabolic_power) :
+    '''
+    This function detects the fatigue of a player over a series of metabolic power of the match,
+    and returns the row of the player (summarized over the second half).
+    '''
+    detector = run_fatigue_detector(time_sec, metabolic_power, period)
+    is_second_half = period == 2
+    return(summarize_player_fatigue(second_spectrum_id, detector, time_sec[is_second_half], metabolic_power[is_second_half]))
+
+def build_fatigue_table(rows, teamname) :
+    '''
+    This function builds the fatigue table of a team from the rows of its players, sorted by onset.
+    '''
+    df_fatigue = pd.DataFrame(rows, columns=FATIGUE_COLUMNS[1:])
+    df_fatigue.insert(0, 'teamname', teamname)
+    return(df_fatigue.sort_values('onset', kind='stable').reset_index(drop=True))
+
+def get_second_spectrum_id(column, teamname) :
+    '''
+    This function returns the SecondSpectrum id of the player of a '<teamname>_<id>_Metabolic_power' column.
+    '''
+    return(int(column[len(teamname) + 1:-len('_Metabolic_power')]))
+
+def compute_fatigue_table(df_metabolic_power, teamname, max_workers = None) :
+    '''
+    This function detects the fatigue of all the players of a team over the second half (the first half giving
+    the reference power), from the metabolic power table of the team (one '<teamname>_<id>_Metabolic_power' column per player).
+    The players are processed in parallel by max_workers processes (one per CPU by default, none if max_workers is 1).
+    It returns one row per player (see FATIGUE_COLUMNS), sorted by onset.
+    '''
+    df_match = df_metabolic_power[df_metabolic_power['Period'].isin([1, 2])]
+    columns = [col for col in df_match.columns if col.endswith('_Metabolic_power')]
+    second_spectrum_ids = [get_second_spectrum_id(col, teamname) for col in columns]
+    period = df_match['Period'].to_numpy(dtype=int)
+    time_sec = df_match['Time_sec'].to_numpy(dtype=float)
+    series = [mask_window_drain(df_match[col].to_numpy(dtype=float)) for col in columns]
+
+    if max_workers == 1 :
+        rows = list(map(detect_player_fatigue, second_spectrum_ids, [period] * len(columns), [time_sec] * len(columns), series))
+    else :
+        with ProcessPoolExecutor(max_workers=max_workers) as executor :
+            rows = list(executor.map(detect_player_fatigue, second_spectrum_ids, [period] * len(columns), [time_sec] * len(columns), series))
+    return(build_fatigue_table(rows, teamname))
+
+def compare_with_binseg(df_metabolic_power, df_fatigue, teamname, warmup = FATIGUE_WARMUP, n_bkps = 2) :
+    '''
+    This function compares the onsets of the players with fatigue (table of compute_fatigue_table) with the breakpoints
+    of find_fatigue_threshold_binseg, found on the samples watched by the detector (second half, without the filling
+    and the drain of the window). Several breakpoints are searched, as a player may also recover at the end of the match
+    (the single breakpoint would then be the rise). It returns one row per player: onset, closest breakpoint, distance
+    between them (seconds), and drop of the mean metabolic power at this breakpoint (%, negative for a rise).
+    '''
+    df_match = df_metabolic_power[df_metabolic_power['Period'].isin([1, 2])]
+    is_second_half = df_match['Period'].to_numpy() == 2
+    time_sec = df_match['Time_sec'].to_numpy(dtype=float)
+    rows = []
+    for player in df_fatigue[df_fatigue['onset'].notnull()].itertuples() :
+        metabolic_power = mask_window_drain(df_match[teamname + '_' + str(player.second_spectrum_id) + '_Metabolic_power'].to_numpy(dtype=float), warmup)
+        is_valid = ~np.isnan(metabolic_power)
+        is_watched = is_valid & is_second_half & (np.cumsum(is_valid) > warmup)
+        bounds = [-np.inf] + find_fatigue_threshold_binseg(time_sec[is_watched], metabolic_power[is_watched], n_bkps)[:-1] + [np.inf]
+        i = 1 + int(np.argmin([abs(player.onset - x) for x in bounds[1:-1]]))
+        pre_mean = metabolic_power[is_watched & (time_sec >= bounds[i - 1]) & (time_sec < bounds[i])].mean()
+        post_mean = metabolic_power[is_watched & (time_sec >= bounds[i]) & (time_sec < bounds[i + 1])].mean()
+        rows.append({
+            'second_spectrum_id' : player.second_spectrum_id,
+            'onset' : player.onset,
+            'binseg' : bounds[i],
+            'distance' : abs(player.onset - bounds[i]),
+            'binseg drop (%)' : (pre_mean - post_mean) / pre_mean * 100,
+        })
+    return(pd.DataFrame(rows, columns=['second_spectrum_id', 'onset', 'binseg', 'distance', 'binseg drop (%)']))
+
+def find_fatigue_threshold_binseg(time_sec, metabolic_power, n_bkps = 1) :
+    '''
+    This function finds the spot where substitution should happen, with one breakpoint of ruptures.Binseg (reference).
+    It returns [breakpoint, end of the series], in seconds ([breakpoints..., end of the series] if n_bkps > 1).
+    '''
+    time_sec = np.asarray(time_sec, dtype=float)
+    signal = np.asarray(metabolic_power, dtype=float).reshape((len(time_sec),1))
+    algo = rpt.Binseg(model="l2").fit(signal)
+    result = algo.predict(n_bkps=n_bkps)
+    return([time_sec[min(x, len(time_sec) - 1)] for x in result])
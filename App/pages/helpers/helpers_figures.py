@@ -0,0 +1,120 @@
+'''
+    This script keeps the figures of the page in memory, so that a figure is built only once
+    for a given match, player and version of the data it is built from:
+    - a figure is identified by (kind, match_id, player_id), e.g. ('vaep', match_id, player_id), player_id being None
+      for the figures of the whole match (pitch), and remembers the version of its data (see get_data_version):
+      it is built again as soon as the version changes
+    - the figure is serialized once to compact JSON (no indentation, no uids), and the dict read from this JSON
+      is what the callbacks give to dcc.Graph
+    - the figures are kept in a least recently used cache: when their JSON uses more than MAX_FIGURE_MEMORY,
+      the least recently used figures are dropped
+    - the hits, misses and evictions of the cache are counted (get_figure_statistics)
+'''
+
+# LIBRAIRIES ----------------------------------------------------
+# STANDARD LIBRARIES
+import os
+import json
+import threading
+from collections import OrderedDict
+import pandas as pd
+import warnings
+warnings.simplefilter(action='ignore', category=FutureWarning)
+pd.set_option('max_colwidth', 400)
+pd.set_option('display.max_columns', None)
+pd.options.mode.chained_assignment = None
+
+# GRAPHIC LIBRAIRIES----------------------------------------------------
+import plotly.io as pio
+
+# LOCAL LIBRARIES
+from pages.helpers import helpers_cache
+
+MAX_FIGURE_MEMORY = 64 * 1024 ** 2 # bytes of JSON
+
+
+# FUNCTIONS ----------------------------------------------------
+def get_data_version(paths) :
+    '''
+    This function returns the version of the data read from some files: the signature of each file
+    (see helpers_cache.get_file_signature), None for the missing files.
+    '''
+    return(tuple(helpers_cache.get_file_signature(path) if path and os.path.exists(path) else None for path in paths))
+
+def serialize_figure(fig) :
+    '''
+    This function serializes a figure (plotly figure or dict) to compact JSON.
+    It returns the dict read from the JSON and the size of the JSON (bytes).
+    '''
+    figure_json = pio.to_json(fig, validate=False, pretty=False, remove_uids=True)
+    return(json.loads(figure_json), len(figure_json))
+
+# {(kind, match_id, player_id) : (version, figure dict, size)}
+_figures = OrderedDict()
+_figures_locks = {}
+_figures_lock = threading.Lock()
+_statistics = {'hits' : 0, 'misses' : 0, 'evictions' : 0, 'memory' : 0}
+
+def _get_figure_lock(key) :
+    with _figures_lock :
+        if key not in _figures_locks :
+            _figures_locks[key] = threading.Lock()
+        return(_figures_locks[key])
+
+def _drop_figure(key) :
+    version, figure, size = _figures.pop(key)
+    _statistics['memory'] -= size
+
+def evict_figures(max_memory = None) :
+    '''
+    This function drops the least recently used figures until the cache uses less than max_memory.
+    '''
+    max_memory = MAX_FIGURE_MEMORY if max_memory is None else max_memory
+    with _figures_lock :
+        while _figures and _statistics['memory'] > max_memory :
+            _drop_figure(next(iter(_figures)))
+            _statistics['evictions'] += 1
+
+def get_figure(kind, match_id, player_id, version, build) :
+    '''
+    This function returns the figure kind of a player (None for the figures of the whole match) as a dict,
+    read from the cache if it has been built for the same version of the data, built with build() otherwise.
+    Only one thread builds a given figure, the others wait for the result.
+    '''
+    key = (kind, match_id, player_id)
+    with _get_figure_lock(key) :
+        with _figures_lock :
+            cached = _figures.get(key)
+            if cached is not None and cached[0] == version :
+                _figures.move_to_end(key)
+                _statistics['hits'] += 1
+                return(cached[1])
+            _statistics['misses'] += 1
+
+        figure, size = serialize_figure(build())
+        with _figures_lock :
+            if key in _figures :
+                _drop_figure(key)
+            _figures[key] = (version, figure, size)
+            _statistics['memory'] += size
+    evict_figures()
+    return(figure)
+
+def get_figure_statistics() :
+    '''
+    This function returns the counters of the cache: hits, misses, evictions, number of figures
+    and memory used by their JSON (bytes), and the hit rate.
+    '''
+    with _figures_lock :
+        statistics = dict(_statistics, figures=len(_figures))
+    requests = statistics['hits'] + statistics['misses']
+    statistics['hit_rate'] = statistics['hits'] / requests if requests else None
+    return(statistics)
+
+def clear_figures(match_id = None) :
+    '''
+    This function drops the figures of a match from the cache (all the figures by default).
+    '''
+    with _figures_lock :
+        for key in [key for key in _figures if match_id is None or key[1] == match_id] :
+            _drop_figure(key)
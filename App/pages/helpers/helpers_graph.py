@@ -11,9 +11,6 @@
 import pandas as pd
 import warnings
 import numpy as np
-from datetime import datetime
-import math
-import ruptures as rpt
 warnings.simplefilter(action='ignore', category=FutureWarning)
 pd.set_option('max_colwidth', 400)
 pd.set_option('display.max_columns', None)
@@ -24,6 +21,9 @@ pd.options.mode.chained_assignment = None
 import plotly.graph_objs as go
 import plotly_football_pitch as pfp
 
+# LOCAL LIBRARIES
+from pages.helpers import helpers_clock
+
 
 # FUNCTIONS ----------------------------------------------------
 def return_blank_fig(figure_height=20):
@@ -195,17 +195,8 @@ def create_df_line_up_stat(formation,df_line_up, events_infos,type) :
     )
 
     # Change time format
-    df['from'] = df['from'].apply(lambda x: math.ceil((datetime.strptime(x, '%H:%M:%S.%f') - datetime(1900,1,1)).total_seconds() /60))
-    df['from_format'] = np.where(df['from_period'] == 1,
-                                np.where(df['from'] > 45,
-                                        df['from'].apply(lambda x: str(45) + "'+" + str(x - 45)),
-                                        df['from'].astype(str)
-                                ), 
-                                np.where(df['from'] > 90,
-                                        df['from'].apply(lambda x: str(90) + "'+" + str(x - 90)),
-                                        df['from'].astype(str)
-                                ),
-                            )
+    df['from'] = helpers_clock.get_match_minutes(helpers_clock.parse_timestamps(df['from']))
+    df['from_format'] = helpers_clock.get_official_clock(df['from'], df['from_period'])
     df = df[['from_format','from', 'team_id','team_name','player_id', 'jersey_number','player_name','goals'] + list(df.columns[df.columns.str.contains('Card')].values) + ['position', 'position_id','x_coord', 'y_coord', 'counterpart_id', 'counterpart_name']]
     
     if not 'Yellow Card' in df.columns :
@@ -238,11 +229,49 @@ def add_emojis_to_events(df_line_up_stat) :
     return(df_line_up_stat)
 
 
+COLOR_TEAM = {'Manchester City WFC' : '#5db7d3', 'Arsenal WFC': '#d52e22'}
+DEFAULT_COLORS = ['#5db7d3', '#d52e22'] # home, away
+
+def get_team_color(team_name, index = 0) :
+    '''
+    This function returns the color of a team. The teams without a color of their own
+    get the default color of their side (index 0 for home, 1 for away).
+    '''
+    return(COLOR_TEAM.get(team_name, DEFAULT_COLORS[index % len(DEFAULT_COLORS)]))
+
+def get_pixel_size(fig) :
+    '''
+    This function returns the size of a pixel in the units of the x and y axes of a figure with fixed ranges, width and height.
+    '''
+    layout = fig.layout
+    x_range, y_range = layout.xaxis.range, layout.yaxis.range
+    x_pixel = (x_range[1] - x_range[0]) / (layout.width - layout.margin.l - layout.margin.r)
+    y_pixel = (y_range[1] - y_range[0]) / (layout.height - layout.margin.t - layout.margin.b)
+    return(x_pixel, y_pixel)
+
+def add_text_trace(fig, x, y, text, color = None) :
+    '''
+    This function writes texts at some points of a figure as a single text trace, instead of one annotation per text.
+    The trace ignores the mouse, so that hovering and clicking still reach the traces below.
+    '''
+    fig.add_trace(
+        go.Scatter(
+            x = x,
+            y = y,
+            text = text,
+            mode = "text",
+            textfont = dict(
+                color = color,
+                size = 10
+            ),
+            hoverinfo = "skip",
+        )
+    )
+
 def plot_line_up_on_pitch(df):
     '''
     This function plots the lineup on a football pitch depending on the starting formation
     '''
-    color_team = {'Manchester City WFC' : '#5db7d3', 'Arsenal WFC': '#d52e22'}
 
     # Draw the pitch
     dimensions = pfp.PitchDimensions()
@@ -261,7 +290,7 @@ def plot_line_up_on_pitch(df):
     df_substitutes = df[~(df['from'] == 0)]
 
     # Draw the lineup
-    for team in df['team_name'].unique() :
+    for team_index, team in enumerate(df['team_name'].unique()) :
         df_starting_xi_team = df_starting_xi[df_starting_xi['team_name']==team]
         df_substitutes_team = df_substitutes[df_substitutes['team_name']==team]
 
@@ -272,76 +301,16 @@ def plot_line_up_on_pitch(df):
                 mode="markers+text",
                 marker={
                         "size": 25, 
-                        "color": color_team[df_starting_xi_team['team_name'].unique()[0]],
+                        "color": get_team_color(team, team_index),
                         'opacity' : 0.8
                 },
                 hoverinfo="none",
                 text = df_starting_xi_team['player_name'],
                 textposition="bottom center",
+                customdata = df_starting_xi_team['player_id'], # read by the click callback
             )
         )
 
-        # Add jersey number
-        for x,y,jersey in zip(df_starting_xi_team['x_coord'], df_starting_xi_team['y_coord'],df_starting_xi_team['jersey_number']) :
-            fig.add_annotation(
-                x = x, 
-                y = y,
-                text=jersey,
-                showarrow=False,
-                font=dict(
-                    color="black",
-                    size=10
-                ),
-            )
-
-    # Plot yellow cards
-    for x,y,yellow_card in zip(df_starting_xi['x_coord'], df_starting_xi['y_coord'],df_starting_xi['Yellow Card']) :
-        if yellow_card != yellow_card :
-            yellow_card = ""
-        fig.add_annotation(
-            x = x, 
-            y = y,
-            xshift = -10,
-            yshift = 12,
-            text=yellow_card,
-            showarrow=False,
-            font=dict(
-                size=10
-            ),
-        )
-
-    # Plot yellow cards
-    for x,y,red_card in zip(df_starting_xi['x_coord'], df_starting_xi['y_coord'],df_starting_xi['Red Card']) :
-        if red_card != red_card :
-            red_card = ""
-        fig.add_annotation(
-            x = x, 
-            y = y,
-            xshift = -10,
-            yshift = 8,
-            text=red_card,
-            showarrow=False,
-            font=dict(
-                size=10
-            ),
-        )
-
-    # Plot goals
-    for x,y,goal in zip(df_starting_xi['x_coord'], df_starting_xi['y_coord'],df_starting_xi['goals']) :
-        if goal != goal :
-            goal = ""
-        fig.add_annotation(
-            x = x, 
-            y = y,
-            xshift = 10,
-            yshift = 12,
-            text=goal,
-            showarrow=False,
-            font=dict(
-                size=10
-            ),
-        )
-
     fig.update_layout(
         showlegend = False,
         margin=dict(
@@ -358,13 +327,20 @@ def plot_line_up_on_pitch(df):
         dragmode = False,
         clickmode = 'event',
     )
+
+    # Jersey numbers, cards and goals: one text trace each, shifted from the players' markers by a few pixels
+    x_pixel, y_pixel = get_pixel_size(fig)
+    add_text_trace(fig, df_starting_xi['x_coord'], df_starting_xi['y_coord'], df_starting_xi['jersey_number'], color = "black")
+    for column, x_shift, y_shift in [('Yellow Card', -10, 12), ('Red Card', -10, 8), ('goals', 10, 12)] :
+        df_icons = df_starting_xi[df_starting_xi[column].notnull() & (df_starting_xi[column] != "")]
+        add_text_trace(fig, df_icons['x_coord'] + x_shift * x_pixel, df_icons['y_coord'] + y_shift * y_pixel, df_icons[column])
     return(fig)
 
-def create_vaep_graph(df_cumulative_vaep, df_mean_vaep) :
+def create_vaep_graph(df_cumulative_vaep, df_mean_vaep, team_index = 0) :
     '''
     This function creates the vaep plot, i.e the cumulative vaep as a function of time.
+    team_index is the side of the player's team (0 for home, 1 for away), see get_team_color.
     '''
-    color_team = {'Manchester City WFC' : '#5db7d3', 'Arsenal WFC': '#d52e22'}
 
     fig = go.Figure()
 
@@ -374,7 +350,7 @@ def create_vaep_graph(df_cumulative_vaep, df_mean_vaep) :
             y = df_cumulative_vaep['adjusted_vaep'],
             name = 'Technical efficiency',
             line = {
-                "color": color_team[df_cumulative_vaep['team_name'].unique()[0]]
+                "color": get_team_color(df_cumulative_vaep['team_name'].unique()[0], team_index)
             },
             hovertext = (
                 '<br>Time: '
@@ -402,11 +378,7 @@ def create_vaep_graph(df_cumulative_vaep, df_mean_vaep) :
     )
 
     # Define x tick as official time
-    df_official_clock = df_cumulative_vaep[['time','official_clock']].drop_duplicates()
-    df_official_clock['official_mod'] = df_cumulative_vaep['official_clock'].apply(lambda x: int(x.split("'+")[-1]))
-    df_official_clock = df_official_clock[df_official_clock['official_mod'] % 5 == 0]
-    x_tick_val = df_official_clock['time'].tolist()
-    x_tick_labels = df_official_clock['official_clock'].tolist()
+    x_tick_val, x_tick_labels = helpers_clock.get_clock_ticks(df_cumulative_vaep['time'], df_cumulative_vaep['official_clock'])
 
     fig.update_layout(
         xaxis = dict(
@@ -444,38 +416,11 @@ def create_vaep_graph(df_cumulative_vaep, df_mean_vaep) :
 
     return(fig)
 
-def extract_from_second_spectrum_id(df_line_up_infos, df_teamsheet, player_id) :
-    '''
-    This function extracts from StatsBombs player id, the id used in Second Spectrum
-    '''
-    
-    player_name = df_line_up_infos[df_line_up_infos['player_id']==player_id]['player_name'].unique()[0]
-    df_name_in_second_spectrum = pd.DataFrame(df_teamsheet['player'], columns=['player'])
-    df_name_in_second_spectrum['Fake_name'] = df_name_in_second_spectrum['player'].apply(lambda x: x.split(". ")[-1])
-    df_name_in_second_spectrum['pID'] = df_name_in_second_spectrum.index
-    for fake_name in df_name_in_second_spectrum['Fake_name'] :
-        list_player_name =  player_name.split(" ")
-        list_fake_name = fake_name.split(" ")
-        if (set(list_fake_name) & set(list_player_name)) == set(list_fake_name) :
-            id_player_ss = df_name_in_second_spectrum[df_name_in_second_spectrum['Fake_name']==fake_name]['pID'].unique()[0]
-    return(id_player_ss)
-
-def find_fatigue_threshold(metabolic_power) : 
-    '''
-    This function find the spot where substitution should happen.
-    '''
-    signal = np.array(metabolic_power).reshape((len(metabolic_power),1))
-    algo = rpt.Binseg(model="l2").fit(signal) ##potentially finding spot where substitution should happen
-    result = algo.predict(n_bkps=1) #big_seg
-    result = [x + 3000 for x in result]
-    return(result)
-
-
-def create_metabolic_power_graph(df_tracking, list_threshold,teamname) :
+def create_metabolic_power_graph(df_tracking, list_threshold,teamname, team_index = 0) :
     '''
     This function creates the metabolic power plot
+    team_index is the side of the player's team (0 for home, 1 for away), see get_team_color.
     '''
-    color_team = {'Manchester City WFC' : '#5db7d3', 'Arsenal WFC': '#d52e22'}
 
     fig = go.Figure()
     fig.add_trace(
@@ -483,25 +428,22 @@ def create_metabolic_power_graph(df_tracking, list_threshold,teamname) :
             x = df_tracking.loc[:,'Time_sec'],
             y = df_tracking.iloc[:, 3],
             line = {
-                "color":color_team[teamname]
+                "color":get_team_color(teamname, team_index)
             }
         )
     )
 
-    fig.add_vrect(
-        x0=list_threshold[0], 
-        x1=list_threshold[1], 
-        line_width=0, 
-        fillcolor = color_team[teamname],
-        opacity=0.2
-    )
+    if list_threshold is not None :
+        fig.add_vrect(
+            x0=list_threshold[0], 
+            x1=list_threshold[1], 
+            line_width=0, 
+            fillcolor = get_team_color(teamname, team_index),
+            opacity=0.2
+        )
 
     # Define x tick as official time
-    df_official_clock = df_tracking[['Time_sec','official_clock']].drop_duplicates()
-    df_official_clock['official_mod'] = df_tracking['official_clock'].apply(lambda x: int(x.split("'+")[-1]))
-    df_official_clock = df_official_clock[df_official_clock['official_mod'] % 5 == 0].drop_duplicates(subset = 'official_clock')
-    x_tick_val = df_official_clock['Time_sec'].tolist()
-    x_tick_labels = df_official_clock['official_clock'].tolist()
+    x_tick_val, x_tick_labels = helpers_clock.get_clock_ticks(df_tracking['Time_sec'], df_tracking['official_clock'])
 
     fig.update_layout(
         xaxis = dict(
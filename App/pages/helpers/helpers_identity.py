@@ -0,0 +1,128 @@
+'''
+    This script links the players of the StatsBomb data (events, lineups) to the players of the SecondSpectrum data
+    (teamsheets, tracking data), which do not share any id.
+
+    The link is built once per match by convert_data.py and stored next to the SecondSpectrum metadata file:
+    - first on the team and the jersey number, which are the same in both providers
+    - then, for the players left, on their normalized names (the SecondSpectrum name, often abbreviated
+      as "L. Hemp", must be contained in the StatsBomb name)
+    The players matched by neither rule are reported by get_unmatched_players.
+'''
+
+# LIBRAIRIES ----------------------------------------------------
+# STANDARD LIBRARIES
+import os
+import re
+import unicodedata
+import pandas as pd
+import numpy as np
+import warnings
+warnings.simplefilter(action='ignore', category=FutureWarning)
+pd.set_option('max_colwidth', 400)
+pd.set_option('display.max_columns', None)
+pd.options.mode.chained_assignment = None
+
+PLAYER_ID_MAP_COLUMNS = ['player_id', 'player_name', 'team_name', 'teamname', 'jersey_number',
+                         'second_spectrum_id', 'pID', 'jID', 'second_spectrum_name', 'matched_by']
+
+
+# FUNCTIONS ----------------------------------------------------
+def normalize_name(name) :
+    '''
+    This function normalizes a player's name: no accents, no punctuation, lower case.
+    '''
+    name = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode('ascii')
+    name = re.sub(r"[^a-z ]", " ", name.lower())
+    return(" ".join(name.split()))
+
+def get_name_tokens(name) :
+    '''
+    This function returns the words of a player's name, without the initials ("L. Hemp" -> {'hemp'}).
+    '''
+    return({token for token in normalize_name(name.split(". ")[-1]).split(" ") if len(token) > 1})
+
+def extract_teamsheet(df_teamsheet) :
+    '''
+    This function extracts the players of a SecondSpectrum teamsheet.
+    second_spectrum_id is the index of the player in the teamsheet, used in the columns of the tracking data.
+    '''
+    df_teamsheet_players = pd.DataFrame({
+        'second_spectrum_id' : df_teamsheet['player'].index,
+        'second_spectrum_name' : df_teamsheet['player'].values,
+        'jID' : df_teamsheet['jID'].values,
+        'pID' : df_teamsheet['pID'].values,
+    })
+    return(df_teamsheet_players)
+
+def match_players_on_names(df_players, df_teamsheet_players) :
+    '''
+    This function matches the players on their names: a SecondSpectrum player is matched to a StatsBomb player
+    if all the words of their name are in the StatsBomb name, and if it is the only one in this case.
+    It returns a dictionary {StatsBomb player id : index of the SecondSpectrum player in df_teamsheet_players}.
+    '''
+    matches = {}
+    teamsheet_tokens = [get_name_tokens(name) for name in df_teamsheet_players['second_spectrum_name']]
+    for player_id, player_name in zip(df_players['player_id'], df_players['player_name']) :
+        player_tokens = set(normalize_name(player_name).split(" "))
+        candidates = [i for i, tokens in enumerate(teamsheet_tokens) if tokens and tokens <= player_tokens]
+        if len(candidates) == 1 and candidates[0] not in matches.values() :
+            matches[player_id] = candidates[0]
+    return(matches)
+
+def build_player_id_map(df_line_up_infos, teamsheets, home_team_name) :
+    '''
+    This function builds the map between the StatsBomb players and the SecondSpectrum players of a match.
+    teamsheets is a dictionary {'Home' : teamsheet, 'Away' : teamsheet}.
+    It returns a dataframe with one row per StatsBomb player (see PLAYER_ID_MAP_COLUMNS),
+    matched_by being 'jersey', 'name' or NaN if the player has not been found in the teamsheet.
+    '''
+    df_players = df_line_up_infos.drop_duplicates('player_id')[['player_id', 'player_name', 'team_name', 'jersey_number']]
+    df_players['teamname'] = np.where(df_players['team_name'] == home_team_name, 'Home', 'Away')
+
+    maps = []
+    for teamname, df_teamsheet in teamsheets.items() :
+        df_players_team = df_players[df_players['teamname'] == teamname]
+        df_teamsheet_players = extract_teamsheet(df_teamsheet)
+
+        # Team and jersey number
+        df_map = df_players_team.merge(df_teamsheet_players.drop_duplicates('jID'), how='left', left_on='jersey_number', right_on='jID')
+        df_map['matched_by'] = np.where(df_map['second_spectrum_id'].notnull(), 'jersey', None)
+
+        # Names, for the players left
+        is_unmatched = df_map['matched_by'].isnull()
+        df_teamsheet_left = df_teamsheet_players[~df_teamsheet_players['second_spectrum_id'].isin(df_map['second_spectrum_id'])].reset_index(drop=True)
+        name_matches = match_players_on_names(df_map[is_unmatched], df_teamsheet_left)
+        for player_id, i in name_matches.items() :
+            row = df_map['player_id'] == player_id
+            for col in ['second_spectrum_id', 'second_spectrum_name', 'jID', 'pID'] :
+                df_map.loc[row, col] = df_teamsheet_left.loc[i, col]
+            df_map.loc[row, 'matched_by'] = 'name'
+        maps.append(df_map)
+
+    df_map = pd.concat(maps, ignore_index=True)
+    return(df_map[PLAYER_ID_MAP_COLUMNS])
+
+def get_unmatched_players(df_map) :
+    '''
+    This function returns the StatsBomb players that have not been found in the SecondSpectrum teamsheets.
+    '''
+    return(df_map[df_map['matched_by'].isnull()][['player_id', 'player_name', 'team_name', 'jersey_number']])
+
+def is_up_to_date(path, source_paths) :
+    '''
+    This function checks if the file at path exists and is more recent than all the files it was built from.
+    '''
+    if not os.path.isfile(path) :
+        return(False)
+    return(all(os.path.getmtime(path) >= os.path.getmtime(source_path) for source_path in source_paths))
+
+def write_player_id_map(df_map, path) :
+    '''
+    This function writes the map to a temporary file, then replaces the previous map with it,
+    so that the app never reads a map being written.
+    '''
+    df_map.to_csv(path + '.tmp', sep=',', index=False, encoding = "utf-8-sig")
+    os.replace(path + '.tmp', path)
+
+def read_player_id_map(path) :
+    return(pd.read_csv(path, sep=',', encoding = "utf-8-sig"))
@@ -0,0 +1,452 @@
+'''
+    This script ingests the tracking data of a match while it is played, from a SecondSpectrum JSONL file
+    growing as the frames arrive (one JSON frame per line, the format read by floodlight's read_position_data_jsonl).
+
+    The new lines of the file are read every poll_interval seconds, and each block of frames updates the state
+    of each team at once, as the Physical notebooks and helpers_statistics / helpers_metabolic_power would do
+    on the whole match:
+    - positions, speed and metabolic power of the last `capacity` frames, in a position store used as a ring buffer
+      (see helpers_position_store; coordinates flipped in the second half, so that each team always plays in the same direction)
+    - velocities, smoothed with a centered mean over 7 frames (the Savitzky-Golay filter of Metrica_Velocities,
+      whose polyorder is 1), hence known 3 frames after the positions. The first and last 3 frames of each half have no velocity.
+    - distance covered in each speed band, sustained sprints and minutes played
+    - metabolic power, summed over the last 5 minutes, and its mean per second
+    - fatigue detectors of the players (see helpers_fatigue), fed with the metabolic power while they are on the pitch
+    The state of a team has a fixed size whatever the length of the match, except the table of the metabolic power
+    per second (one row per second).
+
+    The live matches are followed in background threads (start_live_match), and read by the callbacks
+    through get_physical_statistics, get_metabolic_power and get_fatigue (get_version changes each time they are updated).
+    replay_tracking_file writes a recorded match to a live file at 1x to 50x speed, to test the live mode offline.
+'''
+
+# LIBRAIRIES ----------------------------------------------------
+# STANDARD LIBRARIES
+import os
+import json
+import time
+import threading
+import pandas as pd
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import warnings
+warnings.simplefilter(action='ignore', category=FutureWarning)
+pd.set_option('max_colwidth', 400)
+pd.set_option('display.max_columns', None)
+pd.options.mode.chained_assignment = None
+
+try :
+    import orjson
+except ImportError :
+    orjson = None
+
+# LOCAL LIBRARIES
+from pages.helpers import helpers_statistics, helpers_metabolic_power, helpers_fatigue, helpers_position_store
+
+FRAME_RATE = 25
+LIVE_CAPACITY = 7500 # frames of positions kept (5 minutes)
+MAX_BLOCK = 1500 # frames processed at once
+MAX_READ = 16 * 1024 ** 2 # bytes read from the file at once
+SMOOTHING_WINDOW = 7
+MAX_SPEED = 12 # m/s, faster moves are tracking errors
+MAX_ACCELERATION = 6 # m/s², greater accelerations are tracking errors
+METABOLIC_WINDOW = 7500 # frames (5 minutes)
+SPRINT_THRESHOLD = 7 # m/s
+SPRINT_WINDOW = 25 # frames
+MAX_REPLAY_SPEED = 50
+LIVE_CHANNELS = ['x', 'y', 'speed', 'Metabolic_power']
+
+
+# FUNCTIONS ----------------------------------------------------
+def loads(line) :
+    '''
+    This function parses a JSON line, with orjson when it is installed.
+    '''
+    return(orjson.loads(line) if orjson is not None else json.loads(line))
+
+def decode_frames(lines, jersey_columns) :
+    '''
+    This function decodes a list of SecondSpectrum JSONL lines.
+    jersey_columns is a dictionary {'Home' : {jersey number : column}, 'Away' : {...}}, the columns being the rows of the teamsheets.
+    It returns the period of each frame and, for each team, the (frames x players x 2) positions (NaN when the player is not on the pitch).
+    '''
+    frames = [loads(line) for line in lines if line.strip()]
+    period = np.array([frame['period'] for frame in frames], dtype=np.int64)
+    positions = {}
+    for teamname, key in [('Home', 'homePlayers'), ('Away', 'awayPlayers')] :
+        columns = jersey_columns[teamname]
+        xy = np.full((len(frames), len(columns), 2), np.nan)
+        for i, frame in enumerate(frames) :
+            for player in frame.get(key) or [] :
+                column = columns.get(player['number'])
+                if column is not None :
+                    xy[i, column] = player['xyz'][:2]
+        positions[teamname] = xy
+    return(period, positions)
+
+
+# STATE OF A TEAM ----------------------------------------------------
+def create_live_team(teamsheet, teamname, capacity = LIVE_CAPACITY) :
+    '''
+    This function creates the state of a team, whose players are the rows of its teamsheet.
+    '''
+    n_players = len(teamsheet)
+    columns = [teamname + '_' + str(xID) for xID in teamsheet['xID']]
+    team = {
+        'teamname' : teamname,
+        'teamsheet' : teamsheet,
+        'columns' : columns,
+        'n_frames' : 0,
+        'period' : None,
+        'period_start' : 0,
+        # Positions, speed and metabolic power of the last frames
+        'store' : helpers_position_store.create_position_store(capacity, columns, LIVE_CHANNELS),
+        'first_frame' : np.full(n_players, -1),
+        'last_frame' : np.full(n_players, -1),
+        # Raw velocities waiting for their smoothing window
+        'last_xy' : np.full((n_players, 2), np.nan),
+        'raw' : np.empty((0, n_players, 2)),
+        'raw_start' : 0,
+        'next_frame' : 0,
+        # Speed statistics
+        'distance' : np.zeros((len(helpers_statistics.SPEED_THRESHOLDS) + 1, n_players)),
+        'sprints' : np.zeros(n_players, dtype=np.int64),
+        'sprint_length' : np.zeros(n_players, dtype=np.int64),
+        # Metabolic power
+        'last_speed' : np.full(n_players, np.nan),
+        'cost' : np.full((METABOLIC_WINDOW, n_players), np.nan),
+        'n_costs' : 0,
+        'cost_total' : np.zeros(n_players),
+        'cost_count' : np.zeros(n_players, dtype=np.int64),
+        'second' : None,
+        'power_periods' : [],
+        'power_times' : [],
+        'power_values' : [],
+        'detectors' : [helpers_fatigue.create_fatigue_detector() for i in range(n_players)],
+    }
+    return(team)
+
+def update_live_team(team, period, xy) :
+    '''
+    This function adds a block of frames of the same period ((frames x players x 2) positions) to the state of a team.
+    '''
+    if period != team['period'] :
+        start_period(team, period)
+    if period == 2 :
+        xy = -xy
+    n_new = len(xy)
+    frames = team['n_frames'] + np.arange(n_new)
+
+    # Positions
+    helpers_position_store.append_frames(team['store'], period, frames / FRAME_RATE, x=xy[:, :, 0], y=xy[:, :, 1])
+    is_observed = ~np.isnan(xy[:, :, 0])
+    on_pitch = is_observed.any(axis=0)
+    first_frame = frames[is_observed.argmax(axis=0)]
+    last_frame = frames[n_new - 1 - is_observed[::-1].argmax(axis=0)]
+    team['first_frame'] = np.where(on_pitch & (team['first_frame'] < 0), first_frame, team['first_frame'])
+    team['last_frame'] = np.where(on_pitch, last_frame, team['last_frame'])
+
+    # Raw velocities, without the moves faster than MAX_SPEED
+    raw = np.diff(np.concatenate([team['last_xy'][None], xy]), axis=0) * FRAME_RATE
+    with np.errstate(invalid='ignore') :
+        raw[np.hypot(raw[:, :, 0], raw[:, :, 1]) > MAX_SPEED] = np.nan
+    team['last_xy'] = xy[-1]
+    team['raw'] = np.concatenate([team['raw'], raw])
+    team['n_frames'] += n_new
+    smooth_velocities(team)
+    return(team)
+
+def start_period(team, period) :
+    '''
+    This function ends the current period of a team (its last frames are given no velocity) and starts a new one.
+    '''
+    if team['period'] is not None :
+        smooth_velocities(team, end_of_period=True)
+    team['period'] = period
+    team['period_start'] = team['n_frames']
+    team['last_xy'] = np.full(team['last_xy'].shape, np.nan)
+    team['raw'] = team['raw'][:0]
+    team['raw_start'] = team['n_frames']
+
+def smooth_velocities(team, end_of_period = False) :
+    '''
+    This function smooths the raw velocities of the frames whose smoothing window is complete
+    (or of all the frames left at the end of a period), and adds them to the speed statistics.
+    '''
+    half = SMOOTHING_WINDOW // 2
+    last = team['n_frames'] - 1
+    start = team['next_frame']
+    end = last if end_of_period else last - half
+    if end < start :
+        return
+    velocities = np.full((end - start + 1,) + team['raw'].shape[1:], np.nan)
+    first_smoothed = max(start, team['period_start'] + half)
+    last_smoothed = min(end, last - half)
+    if last_smoothed >= first_smoothed :
+        window = team['raw'][first_smoothed - half - team['raw_start'] : last_smoothed + half + 1 - team['raw_start']]
+        velocities[first_smoothed - start : last_smoothed - start + 1] = sliding_window_view(window, SMOOTHING_WINDOW, axis=0).mean(axis=-1)
+    update_speed_statistics(team, start, np.hypot(velocities[:, :, 0], velocities[:, :, 1]))
+
+    team['next_frame'] = end + 1
+    keep = max(team['next_frame'] - half, team['raw_start'])
+    team['raw'] = team['raw'][keep - team['raw_start']:]
+    team['raw_start'] = keep
+
+def update_speed_statistics(team, start, speed) :
+    '''
+    This function adds the (frames x players) speed of the frames from start to the speed statistics of the team:
+    distance in each speed band, sustained sprints and metabolic power.
+    '''
+    n_new = len(speed)
+    is_observed = ~np.isnan(speed)
+    observed_speed = np.where(is_observed, speed, 0.)
+
+    # Distance in each speed band
+    band = np.searchsorted(helpers_statistics.SPEED_THRESHOLDS, observed_speed, side='right')
+    for i in range(len(team['distance'])) :
+        team['distance'][i] += np.where(band == i, observed_speed, 0.).sum(axis=0) / FRAME_RATE / 1000
+
+    # Sustained sprints: length of the current sprint of each player, carried from a block to the next
+    block_frames = np.arange(n_new)[:, None]
+    last_stop = np.where(observed_speed < SPRINT_THRESHOLD, block_frames, -1 - team['sprint_length'][None])
+    sprint_length = block_frames - np.maximum.accumulate(last_stop, axis=0)
+    team['sprints'] += (sprint_length == SPRINT_WINDOW).sum(axis=0)
+    team['sprint_length'] = sprint_length[-1]
+
+    # Metabolic power: metabolic cost summed over the last METABOLIC_WINDOW frames
+    acc = np.diff(np.concatenate([team['last_speed'][None], speed]), axis=0) * FRAME_RATE
+    with np.errstate(invalid='ignore') :
+        acc[np.absolute(acc) > MAX_ACCELERATION] = np.nan
+    team['last_speed'] = speed[-1]
+    frames = start + np.arange(n_new)
+    helpers_position_store.set_frames(team['store'], frames, 'speed', speed)
+    cost = helpers_metabolic_power.metabolic_cost(acc) * speed
+
+    ring = (team['n_costs'] + np.arange(n_new)) % METABOLIC_WINDOW
+    old_cost = team['cost'][ring]
+    is_new_valid, is_old_valid = ~np.isnan(cost), ~np.isnan(old_cost)
+    total = team['cost_total'] + np.cumsum(np.where(is_new_valid, cost, 0.) - np.where(is_old_valid, old_cost, 0.), axis=0)
+    count = team['cost_count'] + np.cumsum(is_new_valid.astype(np.int64) - is_old_valid, axis=0)
+    team['cost'][ring] = cost
+    team['n_costs'] += n_new
+    team['cost_total'], team['cost_count'] = total[-1], count[-1]
+    power = np.where(count > 0, total, np.nan)
+    helpers_position_store.set_frames(team['store'], frames, 'Metabolic_power', power)
+
+    add_seconds(team, np.round(frames / FRAME_RATE), power)
+
+def add_seconds(team, time_sec, power) :
+    '''
+    This function adds the metabolic power of a block of frames to the means per second.
+    The last second of the block is kept open until a frame of the next second arrives.
+    '''
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(time_sec)) + 1])
+    is_valid = ~np.isnan(power)
+    sums = np.add.reduceat(np.where(is_valid, power, 0.), starts, axis=0)
+    counts = np.add.reduceat(is_valid.astype(np.int64), starts, axis=0)
+    for second, total, count in zip(time_sec[starts], sums, counts) :
+        if team['second'] is not None and team['second'][:2] != [team['period'], second] :
+            close_second(team)
+        if team['second'] is None :
+            team['second'] = [team['period'], second, np.zeros(len(total)), np.zeros(len(total), dtype=np.int64)]
+        team['second'][2] += total
+        team['second'][3] += count
+
+def close_second(team) :
+    '''
+    This function adds the mean metabolic power of the open second to the table of the team,
+    and to the fatigue detectors of the players on the pitch (the metabolic power of the players who left drains to 0).
+    '''
+    period, second, total, count = team['second']
+    with np.errstate(invalid='ignore') :
+        values = np.where(count > 0, total / count, np.nan)
+    team['power_periods'].append(period)
+    team['power_times'].append(second)
+    team['power_values'].append(values)
+    if period in [1, 2] :
+        on_pitch = np.round(team['last_frame'] / FRAME_RATE) >= second
+        for detector, value in zip(team['detectors'], np.where(on_pitch, values, np.nan).tolist()) :
+            helpers_fatigue.update_fatigue_detector(detector, second, value, period)
+    team['second'] = None
+
+def get_team_positions(team) :
+    '''
+    This function returns the last frames of a team (see LIVE_CHANNELS) as a tracking dataframe, oldest first.
+    '''
+    return(helpers_position_store.to_dataframe(team['store']))
+
+def get_team_physical_statistics(team) :
+    '''
+    This function returns the physical statistics of the players of a team so far, as helpers_statistics.aggregate_physical_statistics.
+    '''
+    on_pitch = team['first_frame'] >= 0
+    df_kernel = pd.DataFrame({
+        'Minutes Played' : np.where(on_pitch, (team['last_frame'] - team['first_frame'] + 1) / FRAME_RATE / 60., 0),
+        'Distance [km]' : team['distance'].sum(axis=0),
+        'Number of sprints' : team['sprints'],
+    })
+    for band, distance in zip(helpers_statistics.SPEED_BANDS, team['distance']) :
+        df_kernel[band] = distance
+    return(helpers_statistics.summarize_physical_statistics(team['teamsheet'], df_kernel))
+
+def get_team_metabolic_power(team) :
+    '''
+    This function returns the metabolic power of the players of a team per second so far,
+    as helpers_metabolic_power.build_metabolic_power_table.
+    '''
+    values = np.array(team['power_values']).reshape(-1, len(team['columns']))
+    df_power = pd.DataFrame(values, columns=[column + '_Metabolic_power' for column in team['columns']])
+    df_power.insert(0, 'Time_sec', np.array(team['power_times'], dtype=float))
+    df_power.insert(0, 'Period', np.array(team['power_periods'], dtype=float))
+    return(helpers_metabolic_power.add_official_clock(df_power))
+
+def get_team_fatigue(team) :
+    '''
+    This function returns the fatigue of the players of a team so far, as helpers_fatigue.compute_fatigue_table.
+    '''
+    is_second_half = np.array(team['power_periods']) == 2
+    time_sec = np.array(team['power_times'], dtype=float)[is_second_half]
+    values = np.array(team['power_values']).reshape(-1, len(team['columns']))[is_second_half]
+    rows = [helpers_fatigue.summarize_player_fatigue(xID, detector, time_sec, helpers_fatigue.mask_window_drain(values[:, i]))
+            for i, (xID, detector) in enumerate(zip(team['teamsheet']['xID'], team['detectors']))]
+    return(helpers_fatigue.build_fatigue_table(rows, team['teamname']))
+
+
+# LIVE MATCHES ----------------------------------------------------
+def create_live_match(teamsheets, capacity = LIVE_CAPACITY) :
+    '''
+    This function creates the state of a live match. teamsheets is a dictionary {'Home' : teamsheet, 'Away' : teamsheet}.
+    '''
+    live = {
+        'teamsheets' : teamsheets,
+        'capacity' : capacity,
+        'jersey_columns' : {teamname : {int(jID) : i for i, jID in enumerate(teamsheet['jID'])} for teamname, teamsheet in teamsheets.items()},
+        'teams' : {teamname : create_live_team(teamsheet, teamname, capacity) for teamname, teamsheet in teamsheets.items()},
+        'position' : 0,
+        'partial_line' : b'',
+        'version' : 0, # number of updates of the teams, e.g. to know if a figure is up to date
+        'lock' : threading.Lock(),
+        'stop' : threading.Event(),
+        'thread' : None,
+    }
+    return(live)
+
+def reset_live_match(live) :
+    '''
+    This function empties the state of a live match (e.g. when its file has been written again from the start).
+    '''
+    live['teams'] = {teamname : create_live_team(teamsheet, teamname, live['capacity']) for teamname, teamsheet in live['teamsheets'].items()}
+    live['position'] = 0
+    live['partial_line'] = b''
+    live['version'] += 1
+
+def ingest_lines(live, lines) :
+    '''
+    This function adds the frames of a list of JSONL lines to the state of both teams.
+    The frames are processed in blocks of the same period of at most MAX_BLOCK frames.
+    '''
+    for block_start in range(0, len(lines), MAX_BLOCK) :
+        period, positions = decode_frames(lines[block_start : block_start + MAX_BLOCK], live['jersey_columns'])
+        if not len(period) :
+            continue
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(period)) + 1, [len(period)]])
+        with live['lock'] :
+            for start, end in zip(starts[:-1], starts[1:]) :
+                for teamname, team in live['teams'].items() :
+                    update_live_team(team, int(period[start]), positions[teamname][start:end])
+            live['version'] += 1
+
+def read_new_lines(live, path) :
+    '''
+    This function reads the complete lines added to the file since the last call (at most MAX_READ bytes).
+    The file is read again from the start if it has been truncated.
+    '''
+    if os.path.getsize(path) < live['position'] :
+        with live['lock'] :
+            reset_live_match(live)
+    with open(path, 'rb') as f :
+        f.seek(live['position'])
+        data = f.read(MAX_READ)
+    live['position'] += len(data)
+    lines = (live['partial_line'] + data).split(b'\n')
+    live['partial_line'] = lines.pop()
+    return(lines)
+
+def follow_tracking_file(live, path, poll_interval = 0.2) :
+    '''
+    This function adds the new frames of the file to the live match until it is stopped.
+    '''
+    while not live['stop'].is_set() :
+        lines = read_new_lines(live, path) if os.path.isfile(path) else []
+        if lines :
+            ingest_lines(live, lines)
+        else :
+            live['stop'].wait(poll_interval)
+
+_live_matches = {}
+_live_lock = threading.Lock()
+
+def start_live_match(match_id, path, teamsheets, poll_interval = 0.2) :
+    '''
+    This function starts following the live tracking file of a match in a background thread,
+    and returns the live match (the one already started, if any).
+    '''
+    with _live_lock :
+        if match_id not in _live_matches :
+            live = create_live_match(teamsheets)
+            live['thread'] = threading.Thread(target=follow_tracking_file, args=(live, path, poll_interval), daemon=True)
+            live['thread'].start()
+            _live_matches[match_id] = live
+        return(_live_matches[match_id])
+
+def get_live_match(match_id) :
+    return(_live_matches.get(match_id))
+
+def stop_live_match(match_id) :
+    '''
+    This function stops following the live tracking file of a match.
+    '''
+    with _live_lock :
+        live = _live_matches.pop(match_id, None)
+    if live is not None :
+        live['stop'].set()
+        live['thread'].join()
+
+def get_version(live) :
+    return(live['version'])
+
+def get_physical_statistics(live, teamname) :
+    with live['lock'] :
+        return(get_team_physical_statistics(live['teams'][teamname]))
+
+def get_metabolic_power(live, teamname) :
+    with live['lock'] :
+        return(get_team_metabolic_power(live['teams'][teamname]))
+
+def get_fatigue(live, teamname) :
+    with live['lock'] :
+        return(get_team_fatigue(live['teams'][teamname]))
+
+
+# REPLAY ----------------------------------------------------
+def replay_tracking_file(source_path, live_path, speed = 1, start_frame = 0) :
+    '''
+    This function writes the frames of a recorded tracking file (JSONL) to live_path as if the match was played,
+    speed times faster (1 to MAX_REPLAY_SPEED), starting from start_frame. live_path is written from the start.
+    '''
+    if not 1 <= speed <= MAX_REPLAY_SPEED :
+        raise ValueError('speed must be between 1 and {}'.format(MAX_REPLAY_SPEED))
+    with open(source_path, 'rb') as source, open(live_path, 'wb') as live_file :
+        start_time = time.monotonic()
+        n_frames = 0
+        for i, line in enumerate(source) :
+            if i < start_frame :
+                continue
+            delay = start_time + n_frames / (FRAME_RATE * speed) - time.monotonic()
+            if delay > 0 :
+                live_file.flush()
+                time.sleep(delay)
+            live_file.write(line)
+            n_frames += 1
+        live_file.flush()
+    return(n_frames)
@@ -0,0 +1,105 @@
+'''
+    This script loads the StatsBomb files (events and lineups) of many matches at once, e.g. a whole season,
+    parsing the matches in parallel in a pool of processes.
+
+    The matches are given as a directory or as a list of match ids of the catalog (see helpers_catalog).
+    Two layouts of directory are supported:
+    - <match_id>_events.json / <match_id>_lineups.json, as in assets/Data/StatsBomb
+    - events/<match_id>.json / lineups/<match_id>.json, as in the StatsBomb open data
+
+    iter_matches yields the matches one by one as they are parsed, with at most max_pending matches
+    parsed in advance, so that the memory used does not depend on the number of matches.
+    load_matches concatenates all the matches, with a match_id column.
+'''
+
+# LIBRAIRIES ----------------------------------------------------
+# STANDARD LIBRARIES
+import os
+import glob
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import warnings
+warnings.simplefilter(action='ignore', category=FutureWarning)
+pd.set_option('max_colwidth', 400)
+pd.set_option('display.max_columns', None)
+pd.options.mode.chained_assignment = None
+
+# LOCAL LIBRARIES
+from pages.helpers import helpers_processing, helpers_events, helpers_catalog
+
+
+# FUNCTIONS ----------------------------------------------------
+def find_matches(directory) :
+    '''
+    This function lists the matches of a directory (see the layouts in the description of this script).
+    It returns a list of (match_id, events_path, lineups_path), sorted by match_id.
+    '''
+    matches = []
+    if os.path.isdir(os.path.join(directory, 'events')) :
+        for events_path in glob.glob(os.path.join(directory, 'events', '*.json')) :
+            match_id = os.path.splitext(os.path.basename(events_path))[0]
+            matches.append((match_id, events_path, os.path.join(directory, 'lineups', match_id + '.json')))
+    else :
+        for events_path in glob.glob(os.path.join(directory, '*_events.json')) :
+            match_id = os.path.basename(events_path)[:-len('_events.json')]
+            matches.append((match_id, events_path, os.path.join(directory, match_id + '_lineups.json')))
+    return(sorted(match for match in matches if os.path.isfile(match[2])))
+
+def resolve_matches(source) :
+    '''
+    This function returns the list of (match_id, events_path, lineups_path) of a directory or of a list of match ids.
+    '''
+    if isinstance(source, str) :
+        return(find_matches(source))
+    matches = []
+    for match_id in source :
+        match_infos = helpers_catalog.get_match_infos(match_id)
+        matches.append((match_id, match_infos['events_path'], match_infos['lineups_path']))
+    return(matches)
+
+def load_match(match) :
+    '''
+    This function parses the files of a match (match_id, events_path, lineups_path).
+    It returns (match_id, df_events, df_line_up_infos), both dataframes having a match_id column.
+    It is run in the processes of the pool, so it only uses picklable arguments and results.
+    '''
+    match_id, events_path, lineups_path = match
+    df_events = helpers_events.read_events(events_path)
+    formations_infos, df_line_up_infos, events_infos = helpers_processing.extract_dataframe_from_json(helpers_events.read_json(lineups_path))
+    df_events.insert(0, 'match_id', match_id)
+    df_line_up_infos.insert(0, 'match_id', match_id)
+    return(match_id, df_events, df_line_up_infos)
+
+def iter_matches(source, max_workers = None, max_pending = None) :
+    '''
+    This function yields (match_id, df_events, df_line_up_infos) for each match of source
+    (directory or list of match ids), in the order of the matches.
+    The matches are parsed by max_workers processes (one per CPU by default), and at most max_pending matches
+    (2 per process by default) are parsed or waiting to be consumed at the same time.
+    '''
+    matches = resolve_matches(source)
+    max_workers = max_workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * max_workers
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor :
+        pending = deque()
+        for match in matches :
+            if len(pending) >= max_pending :
+                yield(pending.popleft().result())
+            pending.append(executor.submit(load_match, match))
+        while pending :
+            yield(pending.popleft().result())
+
+def load_matches(source, max_workers = None, max_pending = None) :
+    '''
+    This function loads all the matches of source (directory or list of match ids) and concatenates them.
+    It returns (df_events, df_line_up_infos), with a match_id column.
+    '''
+    events, line_ups = [], []
+    for match_id, df_events, df_line_up_infos in iter_matches(source, max_workers, max_pending) :
+        events.append(df_events)
+        line_ups.append(df_line_up_infos)
+    if not events :
+        return(pd.DataFrame(), pd.DataFrame())
+    return(helpers_events.concat_events(events), pd.concat(line_ups, ignore_index=True))
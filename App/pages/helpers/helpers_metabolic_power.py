@@ -0,0 +1,134 @@
+'''
+    This script computes the metabolic power of each player from the tracking data:
+    - accelerations
+    - metabolic cost of each frame (energy cost of running with a given acceleration, times the speed)
+    - metabolic power, i.e the metabolic cost summed over the last 5 minutes
+    - mean of the metabolic power per second, as stored in metabolic_power_home.csv / metabolic_power_away.csv
+
+    All players of a team are handled at once, as a (frames x players) matrix,
+    either from a tracking dataframe or in place in a position store (see helpers_position_store).
+'''
+
+# LIBRAIRIES ----------------------------------------------------
+# STANDARD LIBRARIES
+import pandas as pd
+import numpy as np
+import warnings
+warnings.simplefilter(action='ignore', category=FutureWarning)
+pd.set_option('max_colwidth', 400)
+pd.set_option('display.max_columns', None)
+pd.options.mode.chained_assignment = None
+
+# LOCAL LIBRARIES
+from pages.helpers import helpers_statistics, helpers_position_store, helpers_clock
+import pages.helpers.LaurieOnTracking_package.Metrica_Velocities as mvel
+
+
+# FUNCTIONS ----------------------------------------------------
+def calculate_accelerations(speed, time, maxacc = 6) :
+    '''
+    This function computes the accelerations of all players from the (frames x players) speed matrix.
+    Accelerations greater than maxacc (m/s²) are most likely tracking errors and are set to NaN.
+    '''
+    acc = np.full(speed.shape, np.nan)
+    acc[1:] = np.diff(speed, axis=0) / np.diff(time)[:,None]
+    acc[np.absolute(acc) > maxacc] = np.nan
+    return(acc)
+
+def metabolic_cost(acc) :
+    '''
+    This function computes the energy cost of running with the acceleration acc, for a whole array at once.
+    The cost is 0 when the acceleration is 0 or unknown.
+    '''
+    with np.errstate(over='ignore', invalid='ignore') :
+        cost = np.where(acc > 0,
+                        0.102 * ((acc ** 2 + 96.2) ** 0.5) * (4.03 * acc + 3.6 * np.exp(-0.408 * acc)),
+                        np.where(acc < 0,
+                                0.102 * ((acc ** 2 + 96.2) ** 0.5) * (-0.85 * acc + 3.6 * np.exp(1.33 * acc)),
+                                0)
+                        )
+    return(cost)
+
+def rolling_nansum(values, window) :
+    '''
+    This function computes the sum over the last `window` frames of each column, ignoring NaN values.
+    It uses the difference of two cumulative sums, so the cost does not depend on the window size.
+    As with pandas rolling(window, min_periods=1), the result is NaN when the window has no valid value.
+    '''
+    is_valid = ~np.isnan(values)
+    cumsum = np.zeros((values.shape[0] + 1, values.shape[1]))
+    cumsum[1:] = np.cumsum(np.where(is_valid, values, 0.), axis=0, dtype=np.float64)
+    cumcount = np.zeros((values.shape[0] + 1, values.shape[1]), dtype=np.int64)
+    cumcount[1:] = np.cumsum(is_valid, axis=0)
+
+    start = np.maximum(np.arange(1, values.shape[0] + 1) - window, 0)
+    total = cumsum[1:] - cumsum[start]
+    count = cumcount[1:] - cumcount[start]
+    return(np.where(count > 0, total, np.nan))
+
+def compute_metabolic_power(df_tracking, teamname, window = 7500) :
+    '''
+    This function computes the metabolic power of each player at each frame,
+    i.e the metabolic cost summed over the last `window` frames (7500 frames = 5 minutes).
+    df_tracking must contain the players' speed (see Metrica_Velocities.calc_player_velocities_matrix).
+    It returns a dataframe with the Period, the time and one '_Metabolic_power' column per player.
+    '''
+    player_columns, speed = helpers_statistics.extract_player_matrix(df_tracking, teamname, '_speed')
+    acc = calculate_accelerations(speed, df_tracking['Time [s]'].to_numpy(dtype=float))
+    cost = metabolic_cost(acc) * speed
+    power = rolling_nansum(cost, window)
+
+    df_power = pd.DataFrame(power,
+                            index = df_tracking.index,
+                            columns = [teamname + '_' + player + '_Metabolic_power' for player in player_columns])
+    df_power = pd.concat([df_tracking[['Period','Time [s]']], df_power], axis=1)
+    return(df_power)
+
+def compute_mean_of_metabolic_power_per_second(df_power) :
+    '''
+    This function averages the metabolic power on each second of the game,
+    and adds the match time in minutes and the official clock (e.g 45'+2).
+    '''
+    df_power['Time_sec'] = df_power['Time [s]'].round()
+    df_power = df_power[['Time_sec', 'Period'] + df_power.columns[df_power.columns.str.contains("Metabolic_power")].tolist()]
+    df_power = df_power.groupby(['Period','Time_sec']).mean().reset_index()
+    return(add_official_clock(df_power))
+
+def add_official_clock(df_power) :
+    '''
+    This function adds to a table with one row per second (Period, Time_sec) the match time in minutes
+    and the official clock (e.g 45'+2).
+    '''
+    df_power['time'] = helpers_clock.get_match_minutes(df_power['Time_sec'])
+    df_power['official_clock'] = helpers_clock.get_official_clock(df_power['time'], df_power['Period'])
+    return(df_power)
+
+def build_metabolic_power_table(df_tracking, teamname) :
+    '''
+    This function builds the metabolic power table of a team (one row per second, one column per player)
+    directly from the tracking data (players' positions).
+    '''
+    df_tracking = mvel.calc_player_velocities_matrix(df_tracking, smoothing=True)
+    df_power = compute_metabolic_power(df_tracking, teamname)
+    return(compute_mean_of_metabolic_power_per_second(df_power))
+
+def compute_store_metabolic_power(store, speed = None, window = 7500) :
+    '''
+    This function computes the accelerations, the metabolic cost and the metabolic power of the players
+    in the channels of a position store, from the float64 speed returned by helpers_position_store.compute_velocities
+    (the speed channel by default).
+    '''
+    speed = np.asarray(helpers_position_store.get_channel(store, 'speed') if speed is None else speed, dtype=np.float64)
+    acc = calculate_accelerations(speed, helpers_position_store.get_time(store))
+    cost = metabolic_cost(acc) * speed
+    helpers_position_store.set_channel(store, 'Acc', acc)
+    helpers_position_store.set_channel(store, 'Metabolic_cost', cost)
+    helpers_position_store.set_channel(store, 'Metabolic_power', rolling_nansum(cost, window))
+    return(store)
+
+def build_store_metabolic_power_table(store) :
+    '''
+    This function builds the metabolic power table of a team (one row per second, one column per player)
+    from its position store, whose metabolic power has been computed.
+    '''
+    return(compute_mean_of_metabolic_power_per_second(helpers_position_store.to_dataframe(store, ['Metabolic_power'])))
@@ -0,0 +1,190 @@
+'''
+    This script stores the tracking data of a team in a single preallocated float32 array of shape
+    (frames x players x channels), instead of a dataframe growing column by column
+    (positions, then _vx / _vy / _speed, then _Acc, _Metabolic_cost and _Metabolic_power):
+    - the memory of a match is known in advance: frames x players x channels x 4 bytes (+ 9 bytes per frame for Period and Time [s])
+    - get_channel returns a (frames x players) view of a channel, set_channel writes it in place
+    - append_frames adds frames at the end, the store being used as a ring buffer (the oldest frames are overwritten)
+      when it is full, e.g. for a live match
+    - to_dataframe returns a dataframe with the usual '<teamname>_<id>_<channel>' columns, which is a view of the store
+      (no copy) when all the channels are asked for and the store has not wrapped around
+    The channels derived from the positions are computed in float64 and only stored in float32: the metabolic cost jumps
+    when the acceleration is exactly 0, so differentiating float32 positions or speeds would change the metabolic power.
+'''
+
+# LIBRAIRIES ----------------------------------------------------
+# STANDARD LIBRARIES
+import pandas as pd
+import numpy as np
+import scipy.signal as signal
+import warnings
+warnings.simplefilter(action='ignore', category=FutureWarning)
+pd.set_option('max_colwidth', 400)
+pd.set_option('display.max_columns', None)
+pd.options.mode.chained_assignment = None
+
+STORE_CHANNELS = ['x', 'y', 'vx', 'vy', 'speed', 'Acc', 'Metabolic_cost', 'Metabolic_power']
+
+
+# FUNCTIONS ----------------------------------------------------
+def create_position_store(capacity, players, channels = STORE_CHANNELS) :
+    '''
+    This function creates an empty store of capacity frames, for the players given by the prefix of their columns (e.g 'Home_3').
+    '''
+    store = {
+        'players' : list(players),
+        'channels' : list(channels),
+        'data' : np.full((capacity, len(players), len(channels)), np.nan, dtype=np.float32),
+        'period' : np.zeros(capacity, dtype=np.int8),
+        'time' : np.zeros(capacity, dtype=np.float64),
+        'n_frames' : 0,
+    }
+    return(store)
+
+def get_memory(store) :
+    '''
+    This function returns the memory used by a store (bytes).
+    '''
+    return(store['data'].nbytes + store['period'].nbytes + store['time'].nbytes)
+
+def get_frame_positions(store, frames) :
+    '''
+    This function returns the rows of the store where the given frames (numbers since the first frame appended) are kept.
+    '''
+    return(np.asarray(frames) % len(store['data']))
+
+def get_kept_frames(store) :
+    '''
+    This function returns the numbers of the frames kept in the store, oldest first.
+    '''
+    capacity = len(store['data'])
+    return(np.arange(max(0, store['n_frames'] - capacity), store['n_frames']))
+
+def is_contiguous(store) :
+    '''
+    This function checks if the frames kept are stored in order from the first row (the store has not wrapped around),
+    in which case the channels and the dataframe are views of the store.
+    '''
+    return(store['n_frames'] <= len(store['data']))
+
+def append_frames(store, period, time, **channels) :
+    '''
+    This function adds frames at the end of the store: period and time of each frame,
+    and the (frames x players) values of some channels (e.g x=..., y=...), the others being NaN.
+    When the store is full, the oldest frames are overwritten.
+    It returns the numbers of the frames added.
+    '''
+    n_new = len(time)
+    frames = store['n_frames'] + np.arange(n_new)
+    rows = get_frame_positions(store, frames[-len(store['data']):])
+    store['period'][rows] = np.broadcast_to(period, n_new)[-len(rows):]
+    store['time'][rows] = np.asarray(time)[-len(rows):]
+    store['data'][rows] = np.nan
+    for channel, values in channels.items() :
+        store['data'][rows, :, store['channels'].index(channel)] = np.asarray(values)[-len(rows):]
+    store['n_frames'] += n_new
+    return(frames)
+
+def set_frames(store, frames, channel, values) :
+    '''
+    This function writes the (frames x players) values of a channel for some frames, those no longer kept being ignored.
+    '''
+    frames = np.asarray(frames)
+    is_kept = frames >= store['n_frames'] - len(store['data'])
+    store['data'][get_frame_positions(store, frames[is_kept]), :, store['channels'].index(channel)] = np.asarray(values)[is_kept]
+
+def get_channel(store, channel) :
+    '''
+    This function returns the (frames x players) values of a channel for the frames kept, oldest first
+    (a view of the store if it has not wrapped around, a copy otherwise).
+    '''
+    index = store['channels'].index(channel)
+    if is_contiguous(store) :
+        return(store['data'][:store['n_frames'], :, index])
+    return(store['data'][get_frame_positions(store, get_kept_frames(store)), :, index])
+
+def set_channel(store, channel, values) :
+    '''
+    This function writes the (frames x players) values of a channel for all the frames kept, oldest first.
+    '''
+    store['data'][get_frame_positions(store, get_kept_frames(store)), :, store['channels'].index(channel)] = values
+
+def get_period(store) :
+    return(store['period'][get_frame_positions(store, get_kept_frames(store))])
+
+def get_time(store) :
+    return(store['time'][get_frame_positions(store, get_kept_frames(store))])
+
+def to_dataframe(store, channels = None) :
+    '''
+    This function returns the frames kept as a tracking dataframe: Period, Time [s] and one '<player>_<channel>' column
+    per player and channel (all the channels by default).
+    With all the channels, on a store that has not wrapped around, the columns of the players are a view of the store.
+    '''
+    channels = store['channels'] if channels is None else list(channels)
+    columns = [player + '_' + channel for player in store['players'] for channel in channels]
+    if channels == store['channels'] and is_contiguous(store) :
+        values = store['data'][:store['n_frames']].reshape(store['n_frames'], -1)
+    else :
+        indexes = [store['channels'].index(channel) for channel in channels]
+        values = store['data'][get_frame_positions(store, get_kept_frames(store))][:, :, indexes].reshape(-1, len(columns))
+    df_tracking = pd.DataFrame(values, columns=columns, copy=False)
+    df_tracking.insert(0, 'Time [s]', get_time(store))
+    df_tracking.insert(0, 'Period', get_period(store))
+    return(df_tracking)
+
+def get_tracking_positions(df_tracking, teamname) :
+    '''
+    This function returns the players of a team in a tracking dataframe ('<teamname>_<id>' prefixes)
+    and their (frames x players) x and y positions.
+    '''
+    players = [c[:-2] for c in df_tracking.columns if c[-2:].lower()=='_x' and c[:4] == teamname]
+    x = df_tracking[[player + '_x' for player in players]].to_numpy(dtype=np.float64)
+    y = df_tracking[[player + '_y' for player in players]].to_numpy(dtype=np.float64)
+    return(players, x, y)
+
+def build_position_store(df_tracking, teamname, channels = STORE_CHANNELS) :
+    '''
+    This function builds the store of a team from a tracking dataframe ('<teamname>_<id>_x' / '_y' columns).
+    '''
+    players, x, y = get_tracking_positions(df_tracking, teamname)
+    store = create_position_store(len(df_tracking), players, channels)
+    append_frames(store, df_tracking['Period'].to_numpy(), df_tracking['Time [s]'].to_numpy(dtype=float), x=x, y=y)
+    return(store)
+
+def compute_velocities(store, x = None, y = None, smoothing = True, window = 7, polyorder = 1, maxspeed = 12) :
+    '''
+    This function computes the velocities (vx, vy) and the speed of the players in the store,
+    as Metrica_Velocities.calc_player_velocities_matrix (Savitzky-Golay smoothing on each half).
+    The velocities are computed in float64 from the (frames x players) positions x and y, the x and y channels by default.
+    Giving the float64 positions the store was built from gives the same velocities as the tracking dataframe.
+    It returns the speed, in float64.
+    '''
+    x = np.asarray(get_channel(store, 'x') if x is None else x, dtype=np.float64)
+    y = np.asarray(get_channel(store, 'y') if y is None else y, dtype=np.float64)
+    dt = np.diff(get_time(store))[:,None]
+    vx = np.full(x.shape, np.nan)
+    vy = np.full(y.shape, np.nan)
+    vx[1:] = np.diff(x, axis=0) / dt
+    vy[1:] = np.diff(y, axis=0) / dt
+
+    if maxspeed > 0 :
+        with np.errstate(invalid='ignore') :
+            raw_speed = np.sqrt(vx**2 + vy**2)
+            vx[raw_speed > maxspeed] = np.nan
+            vy[raw_speed > maxspeed] = np.nan
+
+    if smoothing :
+        period = get_period(store)
+        for half in [1,2] :
+            half_idx = period == half
+            if half_idx.sum() < window :
+                continue
+            vx[half_idx] = signal.savgol_filter(vx[half_idx], window_length=window, polyorder=polyorder, axis=0)
+            vy[half_idx] = signal.savgol_filter(vy[half_idx], window_length=window, polyorder=polyorder, axis=0)
+
+    speed = np.sqrt(vx**2 + vy**2)
+    set_channel(store, 'vx', vx)
+    set_channel(store, 'vy', vy)
+    set_channel(store, 'speed', speed)
+    return(speed)
@@ -0,0 +1,154 @@
+'''
+    This script computes the technical statistics of every player of every catalogued match in batch,
+    and stores them in assets/Data/technical_statistics (columnar table, see helpers_storage):
+    - one row per player and per match, with the statistics of aggregate_technical_statistics
+    - the minutes played and the statistics per 90 minutes
+    - the position group of the player (Goalkeeper, Defender, Midfielder, Attacker)
+    The averages per 90 minutes of each position group are stored alongside, in assets/Data/technical_statistics_positions.
+
+    The table is updated incrementally by update_statistics.py: only the matches whose events file is new or has changed
+    (hash of its content) are computed, the rows of the other matches are kept as they are. The app only reads it,
+    and computes in memory the rows of the matches that are not up to date in it.
+'''
+
+# LIBRAIRIES ----------------------------------------------------
+# STANDARD LIBRARIES
+import os
+import pandas as pd
+import numpy as np
+import warnings
+warnings.simplefilter(action='ignore', category=FutureWarning)
+pd.set_option('max_colwidth', 400)
+pd.set_option('display.max_columns', None)
+pd.options.mode.chained_assignment = None
+
+# LOCAL LIBRARIES
+from pages.helpers import helpers_statistics, helpers_storage, helpers_cache, helpers_catalog, helpers_data
+
+TECHNICAL_TABLE_PATH = os.path.join(helpers_catalog.DATA_PATH, 'technical_statistics')
+POSITIONS_TABLE_PATH = os.path.join(helpers_catalog.DATA_PATH, 'technical_statistics_positions')
+COUNT_STATISTICS = [col for col in helpers_statistics.TECHNICAL_STATISTICS if '(%)' not in col]
+PER_90_STATISTICS = [col + ' per 90' for col in COUNT_STATISTICS]
+
+# Statistics displayed for each position group (see helpers_statistics.differentiate_statistics)
+POSITION_STATISTICS = {
+    'Attacker' : ['Shot accuracy (%)','Pass accuracy (%)', 'Total shots','Total of lost balls', 'Shots on target', 'Offsides'],
+    'Midfielder' : ['Shot accuracy (%)','Pass accuracy (%)', 'Tackle accuracy (%)','Total successfull tackles',
+                    'Interceptions','Total of lost balls'],
+    'Defender' : ['Pass accuracy (%)', 'Total crosses', 'Tackle accuracy (%)', 'Interceptions', 'Clearances',
+                  'Total of lost balls','Fouls'],
+}
+
+
+# FUNCTIONS ----------------------------------------------------
+def get_position_group(position_id) :
+    '''
+    This function returns the position group of StatsBomb position ids:
+    1 Goalkeeper, 2 to 8 Defender, 9 to 20 Midfielder, 21 and more Attacker.
+    '''
+    position_id = np.asarray(position_id, dtype=float)
+    return(np.select([position_id == 1, position_id <= 8, position_id <= 20, position_id >= 21],
+                     ['Goalkeeper', 'Defender', 'Midfielder', 'Attacker'],
+                     default=''))
+
+def compute_minutes_played(df_line_up_infos, df_events) :
+    '''
+    This function computes the minutes played by each player from the positions of the StatsBomb lineups
+    (from / to, a missing "to" being the end of the match).
+    '''
+    end_of_match = (df_events['minute'] * 60 + df_events['second']).max()
+    start = pd.to_timedelta(df_line_up_infos['from']).dt.total_seconds()
+    end = pd.to_timedelta(df_line_up_infos['to']).dt.total_seconds().fillna(end_of_match)
+    df_minutes = pd.DataFrame({'player_id' : df_line_up_infos['player_id'], 'Minutes played' : (end - start) / 60})
+    return(df_minutes.groupby('player_id', sort=False)['Minutes played'].sum().reset_index())
+
+def compute_match_technical_statistics(match_id, df_events, df_line_up_infos) :
+    '''
+    This function computes the rows of a match: technical statistics, minutes played, statistics per 90 minutes
+    and position group of each player.
+    '''
+    df_stats = helpers_statistics.aggregate_technical_statistics(df_events)
+    df_positions = df_line_up_infos.drop_duplicates('player_id')[['player_id', 'position_id']]
+    df_stats = df_stats.merge(compute_minutes_played(df_line_up_infos, df_events), on='player_id', how='left')
+    df_stats = df_stats.merge(df_positions, on='player_id', how='left')
+
+    minutes = df_stats['Minutes played'].to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore') :
+        per_90 = np.where(minutes[:,None] > 0, df_stats[COUNT_STATISTICS].to_numpy(dtype=float) / minutes[:,None] * 90, np.nan)
+    df_stats = pd.concat([df_stats, pd.DataFrame(per_90.round(2), columns=PER_90_STATISTICS, index=df_stats.index)], axis=1)
+
+    df_stats['position_group'] = get_position_group(df_stats['position_id'])
+    df_stats.insert(0, 'match_id', match_id)
+    return(df_stats)
+
+def compute_position_averages(df_table) :
+    '''
+    This function computes the average statistics per 90 minutes of each position group, over all the matches.
+    '''
+    df_table = df_table[df_table['position_group'] != '']
+    return(df_table.groupby('position_group')[PER_90_STATISTICS].mean().round(2).reset_index())
+
+def get_events_signature(match_id) :
+    '''
+    This function returns the signature of the events and lineups files of a match (hashes of their content),
+    used to know if its rows are up to date.
+    '''
+    match_infos = helpers_data.get_match_infos(match_id)
+    return('-'.join(helpers_cache.get_file_hash(match_infos[path]) for path in ['events_path', 'lineups_path']))
+
+def read_technical_statistics_table(path = TECHNICAL_TABLE_PATH) :
+    if not helpers_storage.is_table(path) :
+        return(None)
+    return(helpers_cache.get_table(('technical_statistics', None, None), path, helpers_storage.read_table))
+
+def update_technical_statistics_table(match_ids = None, path = TECHNICAL_TABLE_PATH, positions_path = POSITIONS_TABLE_PATH) :
+    '''
+    This function adds to the table the matches (all the catalogued matches by default) that are not in it,
+    or whose events have changed since they were computed. The rows of the other matches are not recomputed.
+    It returns the list of the matches computed.
+    '''
+    match_ids = helpers_catalog.get_match_ids() if match_ids is None else match_ids
+    df_table = read_technical_statistics_table(path)
+    signatures = {} if df_table is None else dict(zip(df_table['match_id'], df_table['events_signature']))
+
+    updated_match_ids, frames = [], []
+    for match_id in match_ids :
+        signature = get_events_signature(match_id)
+        if signatures.get(match_id) == signature :
+            continue
+        df_match = compute_match_technical_statistics(match_id, helpers_data.get_events(match_id),
+                                                      helpers_data.get_line_up_infos(match_id))
+        df_match['events_signature'] = signature
+        frames.append(df_match)
+        updated_match_ids.append(match_id)
+
+    if not updated_match_ids :
+        return(updated_match_ids)
+    if df_table is not None :
+        frames.insert(0, df_table[~df_table['match_id'].isin(updated_match_ids)])
+    df_table = pd.concat(frames, ignore_index=True)
+    helpers_storage.write_table(df_table, path)
+    helpers_storage.write_table(compute_position_averages(df_table), positions_path)
+    return(updated_match_ids)
+
+def get_player_technical_statistics(match_id, player_id) :
+    '''
+    This function reads the row of a player in the table (one row dataframe, empty if the player has no event).
+    If the match is not in the table yet, or if its events have changed since it was computed, the rows of the match
+    are computed in memory instead (the table is only updated by update_statistics.py, never here).
+    '''
+    df_table = read_technical_statistics_table()
+    if df_table is None or not (df_table['match_id'] == match_id).any() or \
+       df_table.loc[df_table['match_id'] == match_id, 'events_signature'].iloc[0] != get_events_signature(match_id) :
+        df_table = helpers_cache.get_table(('technical_statistics', match_id, None), helpers_data.get_match_infos(match_id)['events_path'],
+                                           lambda path : compute_match_technical_statistics(match_id, helpers_data.get_events(match_id),
+                                                                                           helpers_data.get_line_up_infos(match_id)))
+    df_player = df_table[(df_table['match_id'] == match_id) & (df_table['player_id'] == player_id)]
+    df_player[COUNT_STATISTICS] = df_player[COUNT_STATISTICS].astype(np.int64)
+    return(df_player)
+
+def get_position_statistics(position_group) :
+    '''
+    This function returns the statistics displayed for a position group (none for the goalkeepers).
+    '''
+    return(POSITION_STATISTICS.get(position_group, []))
@@ -27,6 +27,9 @@ pd.options.mode.chained_assignment = None
 # Laurie Shaw package
 import pages.helpers.LaurieOnTracking_package.Metrica_Velocities as mvel
 
+# LOCAL LIBRARIES
+from pages.helpers import helpers_position_store
+
 # TECHNICAL STATISTICS -------------------------------------
 # SHOTS -------------------------------------
 def compute_total_of_shots(df_events) :
@@ -153,39 +156,87 @@ def compute_total_of_lost_balls(df_events):
 
 
 # AGGREGATE TECHNINCAL STATISTICS -------------------------------------
-def aggregate_technical_statistics(df_events) :
-    df_shot = compute_total_of_shots(df_events)
-    df_shot_on_target = compute_total_of_shots_on_target(df_events)
-    df_shots = compute_shot_accuracy(df_shot,df_shot_on_target)
-    df_offsides = compute_total_of_offsides(df_events)
-    df_crosses = compute_total_of_crosses(df_events)
-    df_successfull_crosses = compute_total_of_successfull_crosses(df_events)
-    df_pass = compute_total_of_passes(df_events)
-    df_successfull_pass = compute_total_of_succesfull_passes(df_events)
-    df_passes = compute_pass_accuracy(df_pass,df_successfull_pass)
-    df_fouls = compute_total_of_fouls(df_events)
-    df_tackle = compute_total_of_tackles(df_events)
-    df_successfull_tackle = compute_total_of_successfull_tackles(df_events)
-    df_tackles = compute_tackle_accuracy(df_tackle,df_successfull_tackle)
-    df_duels = compute_total_of_duels(df_events)
-    df_successfull_duels = compute_total_of_successfull_duels(df_events)
-    df_interceptions = compute_total_of_interceptions(df_events)
-    df_clearances = compute_total_of_clearances(df_events)
-    df_lost_balls = compute_total_of_lost_balls(df_events)
-
-    df_players = df_events[~(df_events['player_id'].isnull())][['team_name','player_id','player_name']].drop_duplicates()
-
-    list_of_df = [df_shots,df_offsides, df_crosses, df_successfull_crosses, df_passes, df_fouls, df_tackles, df_duels, 
-                    df_successfull_duels, df_interceptions,df_clearances, df_lost_balls]
-
-    for df in list_of_df :
-        df_players = pd.merge(df_players,
-                            df, 
-                            on = ['team_name','player_id','player_name'],
-                            how = 'left')
-    df_players = df_players.replace(np.nan,0)
+SUCCESS_OUTCOMES = ['Success In Play','Won','Success Out','Success']
+TECHNICAL_STATISTICS = ['Total shots', 'Shots on target', 'Shot accuracy (%)', 'Offsides', 'Total crosses',
+                        'Total succesfull crosses', 'Total passes', 'Total successfull passes', 'Pass accuracy (%)',
+                        'Fouls', 'Total tackles', 'Total successfull tackles', 'Tackle accuracy (%)', 'Duels',
+                        'Total successfull duels', 'Interceptions', 'Clearances', 'Total of lost balls']
+
+def is_in(factorized_column, values) :
+    '''
+    This function is a faster column.isin(values) for columns with few distinct values (event types, outcomes):
+    factorized_column is pd.factorize(column), the distinct values are tested once, then the result is spread to the rows.
+    '''
+    codes, uniques = factorized_column
+    is_value = np.append(np.isin(np.asarray(uniques, dtype=object), values), False) # code -1 : missing value
+    return(is_value[codes])
+
+def tag_technical_events(df_events) :
+    '''
+    This function tags each event with all the counters it contributes to (one 0/1 column per counter),
+    with the same definitions as the compute_total_of_... functions above.
+    '''
+    type_name = pd.factorize(df_events['type_name'])
+    pass_outcome_name = pd.factorize(df_events['pass_outcome_name'])
+    duel_outcome_name = pd.factorize(df_events['duel_outcome_name'])
+
+    is_shot = is_in(type_name, ["Shot"])
+    is_pass = is_in(type_name, ["Pass"])
+    is_duel = is_in(type_name, ["Duel"])
+    is_pass_outcome_null = pass_outcome_name[0] == -1
+    is_cross = is_pass & (df_events['pass_cross'] == True).to_numpy()
+    is_tackle = is_duel & is_in(pd.factorize(df_events['duel_type_name']), ["Tackle"])
+
+    df_tags = pd.DataFrame({
+        'Total shots' : is_shot,
+        'Shots on target' : is_shot & is_in(pd.factorize(df_events['shot_outcome_name']), ['Goal', 'Saved']),
+        'Offsides' : is_in(type_name, ['Offside']) | (is_pass & is_in(pass_outcome_name, ["Pass Offside"])),
+        'Total crosses' : is_cross,
+        'Total succesfull crosses' : is_cross & is_pass_outcome_null,
+        'Total passes' : is_pass & ~is_in(pass_outcome_name, ["Injury Clearance", "Unknown"]),
+        'Total successfull passes' : is_pass & is_pass_outcome_null,
+        'Fouls' : is_in(type_name, ['Foul Committed']),
+        'Total tackles' : is_tackle,
+        'Total successfull tackles' : is_tackle & is_in(duel_outcome_name, SUCCESS_OUTCOMES),
+        'Duels' : is_duel,
+        'Total successfull duels' : is_duel & is_in(duel_outcome_name, SUCCESS_OUTCOMES),
+        'Interceptions' : is_in(type_name, ['Interception']) & is_in(pd.factorize(df_events['interception_outcome_name']), SUCCESS_OUTCOMES),
+        'Clearances' : is_in(type_name, ['Clearance']),
+        'Total of lost balls' : is_in(type_name, ['Dispossessed', 'Miscontrol']),
+    }, index = df_events.index)
+    return(df_tags.astype(np.int64))
+
+def compute_ratio(numerator, denominator) :
+    '''
+    This function computes numerator / denominator in %, rounded to 0.1, and 0 when the denominator is 0.
+    '''
+    with np.errstate(divide='ignore', invalid='ignore') :
+        ratio = (numerator / denominator * 100).round(1)
+    return(ratio.where(denominator > 0, 0.))
 
-    return(df_players)
+def aggregate_technical_statistics(df_events) :
+    '''
+    This function computes all the technical statistics of each player in a single pass:
+    the events are tagged with the counters they contribute to, summed with one groupby, then the accuracies are derived.
+    It returns the same columns as the merge of the compute_... functions above (missing counts being 0).
+    '''
+    keys = ['team_name','player_id','player_name']
+    df_tags = tag_technical_events(df_events)
+    df_players = pd.concat([df_events[keys], df_tags], axis=1).groupby(keys, sort=False, observed=True).sum().reset_index()
+
+    # As in compute_shot_accuracy, shots are only counted for the players with at least one shot on target
+    has_shot_on_target = df_players['Shots on target'] > 0
+    df_players['Shot accuracy (%)'] = compute_ratio(df_players['Shots on target'], df_players['Total shots']).where(has_shot_on_target, 0.)
+    df_players['Total shots'] = df_players['Total shots'].where(has_shot_on_target, 0)
+    df_players['Pass accuracy (%)'] = compute_ratio(df_players['Total successfull passes'], df_players['Total passes'])
+    df_players['Tackle accuracy (%)'] = compute_ratio(df_players['Total successfull tackles'], df_players['Total tackles'])
+
+    # Counts missing for a player were NaN replaced by 0: such columns are floats
+    for col in df_tags.columns :
+        if (df_players[col] == 0).any() :
+            df_players[col] = df_players[col].astype(float)
+
+    return(df_players[keys + TECHNICAL_STATISTICS])
 
 
 # Let's differentiate statistics based on the player's position
@@ -283,25 +334,105 @@ def calculate_nb_sustained_sprints(df_tracking, teamname) :
 
     return(nsprints)
 
-# AGGREGATE PHYSICAL STATISTICS -------------------------------------
-def aggregate_physical_statistics(df_tracking, teamsheet, teamname) : 
-    df_summary = teamsheet[['jID','player']].drop_duplicates()
-    df_tracking = mvel.calc_player_velocities(df_tracking,smoothing=True)
-    
-    minutes = calculate_minutes_played(df_tracking,teamname)
-    df_summary.loc[:,'Minutes Played'] = minutes
-
-    distance = calculate_total_distance_covered(df_tracking,teamname)
-    df_summary.loc[:,'Distance [km]'] = distance
+# ALL PHYSICAL STATISTICS IN A SINGLE PASS -------------------------------------
+# Speed bands (m/s): walking < 2 <= jogging < 4 <= running < 7 <= sprinting
+SPEED_THRESHOLDS = [2, 4, 7]
+SPEED_BANDS = ['Walking [km]', 'Jogging [km]', 'Running [km]', 'Sprinting [km]']
 
-    walking, jogging, running, sprinting = calculate_distance_in_each_speed(df_tracking,teamname)
-    df_summary.loc[:,'Walking [km]'] = walking
-    df_summary.loc[:,'Jogging [km]'] = jogging
-    df_summary.loc[:,'Running [km]'] = running
-    df_summary.loc[:,'Sprinting [km]'] = sprinting
+def extract_player_matrix(df_tracking, teamname, suffix) :
+    '''
+    This function stacks one column per player (e.g. '_speed' or '_x') in a (frames x players) matrix.
+    Players are in the same order as their '_x' columns in the tracking dataframe.
+    '''
+    player_columns = [c.split('_')[1] for c in df_tracking.columns if c[-2:].lower()=='_x' and c[:4] in ['Home','Away']]
+    columns = [teamname + '_' + player + suffix for player in player_columns]
+    return player_columns, df_tracking[columns].to_numpy(dtype=float)
+
+def count_sustained_runs(is_active, min_length) :
+    '''
+    This function counts, for each column of a boolean (frames x players) matrix,
+    the number of runs of consecutive True values lasting at least min_length frames.
+    '''
+    n_frames, n_players = is_active.shape
+    # Pad each player with inactive frames, so that each run has a start and an end
+    padded = np.zeros((n_players, n_frames + 2), dtype=np.int8)
+    padded[:, 1:-1] = is_active.T
+    edges = np.diff(padded, axis=1)
+    # Starts and ends are both sorted by player then frame, so they pair up one to one
+    start_player, start_frame = np.nonzero(edges == 1)
+    _, end_frame = np.nonzero(edges == -1)
+    sustained = (end_frame - start_frame) >= min_length
+    return(np.bincount(start_player[sustained], minlength=n_players))
+
+def compute_physical_kernel(speed, positions=None, speed_thresholds=SPEED_THRESHOLDS, sprint_threshold=7,
+                            sprint_window=25, frame_rate=25) :
+    '''
+    This function computes, in one vectorized pass over the (frames x players) speed matrix:
+    - the total distance covered and the distance covered in each speed band (km)
+    - the number of sustained sprints (speed >= sprint_threshold during at least sprint_window frames)
+    - the first and last frames where the player is observed (from positions if given, else from speed)
+    It returns a dataframe with one row per column of the matrix.
+    '''
+    n_frames, n_players = speed.shape
+    is_observed = ~np.isnan(speed)
+    distance_per_frame = np.where(is_observed, speed, 0.) / frame_rate / 1000
+
+    # Distance in each speed band: one bincount on (band, player) pairs
+    band = np.searchsorted(speed_thresholds, np.where(is_observed, speed, 0.), side='right')
+    n_bands = len(speed_thresholds) + 1
+    band_player = band * n_players + np.arange(n_players)
+    distance_per_band = np.bincount(band_player.ravel(), weights=distance_per_frame.ravel(),
+                                    minlength=n_bands*n_players).reshape(n_bands, n_players)
+
+    # Sustained sprints
+    nsprints = count_sustained_runs(is_observed & (speed >= sprint_threshold), sprint_window)
+
+    # First and last frames the player is on the pitch
+    is_valid = is_observed if positions is None else ~np.isnan(positions)
+    on_pitch = is_valid.any(axis=0)
+    first_frame = np.where(on_pitch, is_valid.argmax(axis=0), -1)
+    last_frame = np.where(on_pitch, n_frames - 1 - is_valid[::-1].argmax(axis=0), -1)
+
+    df_kernel = pd.DataFrame({
+        'first_frame' : first_frame,
+        'last_frame' : last_frame,
+        'Minutes Played' : np.where(on_pitch, (last_frame - first_frame + 1) / frame_rate / 60., 0),
+        'Distance [km]' : distance_per_band.sum(axis=0),
+    })
+    band_names = SPEED_BANDS if n_bands == len(SPEED_BANDS) else ['Band {} [km]'.format(i) for i in range(n_bands)]
+    for name, distance in zip(band_names, distance_per_band) :
+        df_kernel[name] = distance
+    df_kernel['Number of sprints'] = nsprints
+    return(df_kernel)
 
-    nsprints = calculate_nb_sustained_sprints(df_tracking, teamname)
-    df_summary['Number of sprints'] = nsprints
+# AGGREGATE PHYSICAL STATISTICS -------------------------------------
+def aggregate_physical_statistics(df_tracking, teamsheet, teamname) :
+    df_tracking = mvel.calc_player_velocities_matrix(df_tracking,smoothing=True)
+
+    _, speed = extract_player_matrix(df_tracking, teamname, '_speed')
+    _, positions = extract_player_matrix(df_tracking, teamname, '_x')
+    return(summarize_physical_statistics(teamsheet, compute_physical_kernel(speed, positions)))
+
+def aggregate_store_physical_statistics(store, teamsheet) :
+    '''
+    This function computes the physical statistics of a team from its position store, whose speed has been computed
+    (see helpers_position_store).
+    '''
+    speed = helpers_position_store.get_channel(store, 'speed')
+    positions = helpers_position_store.get_channel(store, 'x')
+    return(summarize_physical_statistics(teamsheet, compute_physical_kernel(speed, positions)))
+
+def summarize_physical_statistics(teamsheet, df_kernel) :
+    '''
+    This function builds the table of the physical statistics of the players of a teamsheet
+    from their rows of compute_physical_kernel (in the same order).
+    '''
+    df_summary = teamsheet[['jID','player']].drop_duplicates()
+    df_summary.loc[:,'Minutes Played'] = df_kernel['Minutes Played'].values
+    df_summary.loc[:,'Distance [km]'] = df_kernel['Distance [km]'].values
+    for band in SPEED_BANDS :
+        df_summary.loc[:,band] = df_kernel[band].values
+    df_summary['Number of sprints'] = df_kernel['Number of sprints'].values
 
     df_summary = df_summary.round(2)
-    return(df_summary)
\ No newline at end of file
+    return(df_summary)
@@ -0,0 +1,158 @@
+'''
+    This script stores the large tables of the app (tracking data, metabolic power) in a binary columnar format,
+    so that they can be memory-mapped instead of parsed from semicolon CSV files.
+
+    A table is a directory containing:
+    - header.json : the number of rows and the columns of the table, in order, with the file and the dtype of each of them
+    - one .npy file per column, in its own dtype (positions in float32), text being stored as fixed-width unicode
+      with a second file marking its missing values.
+    read_table memory-maps the file of each numeric column and builds the dataframe from these maps without copying them:
+    the columns are only read from disk when they are used, and their pages are shared between the processes reading the table.
+'''
+
+# LIBRAIRIES ----------------------------------------------------
+# STANDARD LIBRARIES
+import os
+import json
+import uuid
+import pandas as pd
+import numpy as np
+import warnings
+warnings.simplefilter(action='ignore', category=FutureWarning)
+pd.set_option('max_colwidth', 400)
+pd.set_option('display.max_columns', None)
+pd.options.mode.chained_assignment = None
+
+TABLE_HEADER = 'header.json'
+TABLE_VERSION = 2
+
+
+# FUNCTIONS ----------------------------------------------------
+def read_header(path) :
+    '''
+    This function returns the header of the table path, None if path is not a table of this version.
+    '''
+    try :
+        with open(os.path.join(path, TABLE_HEADER), encoding='utf-8') as f :
+            header = json.load(f)
+    except (OSError, ValueError) :
+        return(None)
+    return(header if header.get('version') == TABLE_VERSION else None)
+
+def is_table(path) :
+    '''
+    This function checks if path is a table written by write_table.
+    '''
+    return(read_header(path) is not None)
+
+def is_position_column(column) :
+    '''
+    Players' and ball's coordinates are stored in float32.
+    '''
+    return(column[-2:] in ['_x','_y'])
+
+def get_column_values(series) :
+    '''
+    This function returns the values of a column to store, their dtype and the mask of its missing values
+    (None for the numeric columns, whose missing values are NaN).
+    '''
+    if pd.api.types.is_bool_dtype(series) and not series.isnull().any() :
+        return(series.to_numpy(dtype=bool), 'bool', None)
+    if pd.api.types.is_integer_dtype(series) and not series.isnull().any() :
+        return(series.to_numpy(dtype=series.dtype.numpy_dtype if hasattr(series.dtype, 'numpy_dtype') else series.dtype), str(series.dtype), None)
+    if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series) :
+        dtype = 'float32' if is_position_column(series.name) else 'float64'
+        return(series.to_numpy(dtype=dtype, na_value=np.nan), dtype, None)
+    missing = series.isnull().to_numpy()
+    return(series.astype(object).where(~missing, '').astype(str).to_numpy(dtype=str), 'unicode', missing)
+
+def write_table(df, path) :
+    '''
+    This function writes a dataframe as a table (see the description of this script).
+    The files of the columns get new names, and the header is replaced last (atomically), so that a process
+    reading the table sees either the previous version or the new one. The files of the previous version are removed
+    at the end: the processes that have memory-mapped them keep reading them.
+    '''
+    os.makedirs(path, exist_ok=True)
+    previous = read_header(path)
+    version = uuid.uuid4().hex[:8]
+
+    header = {'version' : TABLE_VERSION, 'n_rows' : len(df), 'columns' : []}
+    for i, column in enumerate(df.columns) :
+        values, dtype, missing = get_column_values(df[column])
+        entry = {'name' : column, 'dtype' : dtype, 'file' : '{}_{}.npy'.format(version, i), 'missing' : None}
+        np.save(os.path.join(path, entry['file']), values)
+        if missing is not None :
+            entry['missing'] = '{}_{}_missing.npy'.format(version, i)
+            np.save(os.path.join(path, entry['missing']), missing)
+        header['columns'].append(entry)
+
+    with open(os.path.join(path, TABLE_HEADER + '.tmp'), 'w', encoding='utf-8') as f :
+        json.dump(header, f)
+    os.replace(os.path.join(path, TABLE_HEADER + '.tmp'), os.path.join(path, TABLE_HEADER))
+
+    if previous is not None :
+        for entry in previous['columns'] :
+            for file in [entry['file'], entry['missing']] :
+                if file and os.path.isfile(os.path.join(path, file)) :
+                    os.remove(os.path.join(path, file))
+
+def read_column(path, entry, mmap_mode) :
+    '''
+    This function reads a column of a table: a memory map of its file for the numeric columns,
+    an object array (NaN when missing) for the text columns.
+    '''
+    if entry['dtype'] != 'unicode' :
+        return(np.load(os.path.join(path, entry['file']), mmap_mode=mmap_mode))
+    values = np.load(os.path.join(path, entry['file'])).astype(object)
+    values[np.load(os.path.join(path, entry['missing']))] = np.nan
+    return(values)
+
+def read_table(path, mmap_mode = 'c') :
+    '''
+    This function reads a table written by write_table.
+    The numeric columns are memory-mapped (copy-on-write by default) and given to the dataframe without copy:
+    each column is read from disk when it is used, and its pages are shared between the processes reading the same table.
+    The columns selected from the dataframe (e.g df[columns]) are copies.
+    '''
+    for attempt in range(2) :
+        header = read_header(path)
+        if header is None :
+            raise FileNotFoundError('no table in ' + path)
+        try :
+            columns = {entry['name'] : read_column(path, entry, mmap_mode) for entry in header['columns']}
+            break
+        except FileNotFoundError :
+            # The table has been written again since its header was read
+            if attempt :
+                raise
+    if not columns :
+        return(pd.DataFrame(index=pd.RangeIndex(header['n_rows'])))
+    return(pd.DataFrame(columns, copy=False))
+
+def convert_csv_to_table(csv_path, path, sep = ';') :
+    '''
+    This function converts a CSV file of the app (tracking, metabolic power) to a table.
+    '''
+    df = pd.read_csv(csv_path, sep=sep, encoding = "utf-8-sig")
+    write_table(df, path)
+    return(path)
+
+def resolve_table_path(name) :
+    '''
+    This function returns the path of the data named name (without extension):
+    the table if it has been converted, otherwise the CSV file, None if neither exists.
+    '''
+    if is_table(name) :
+        return(name)
+    if os.path.isfile(name + '.csv') :
+        return(name + '.csv')
+    return(None)
+
+def load_table(path, sep = ';') :
+    '''
+    This function loads a table or a CSV file, depending on path.
+    '''
+    if is_table(path) :
+        return(read_table(path))
+    return(pd.read_csv(path, sep=sep, encoding = "utf-8-sig"))
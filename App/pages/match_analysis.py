@@ -15,11 +15,8 @@
 # LIBRAIRIES ----------------------------------------------------
 import pandas as pd
 import numpy as np
-import json
 from datetime import datetime
 from math import *
-import os
-from floodlight.io.secondspectrum import read_position_data_jsonl, read_teamsheets_from_meta_json
 
 import warnings
 warnings.simplefilter(action='ignore', category=FutureWarning)
@@ -42,72 +39,13 @@ import plotly as plotly
 
 # LOCAL LIBRARIES ----------------------------------------------------
 from app import app
-from pages.helpers import helpers_processing, helpers_graph, helpers_statistics
+from pages.helpers import helpers_graph, helpers_data, helpers_season, helpers_figures
 
 ##############################################################
 #                       DATA LOADING 
 ##############################################################
-# STATSBOMB INFOS ----------------------------------------------------
-# LINEUP INFOS ----------------------------------------------------
-mancity_arsenal_lineup_path = os.path.join(os.getcwd(),'assets/Data/StatsBomb/ManCity_Arsenal_lineups.json')
-with open(mancity_arsenal_lineup_path, encoding='utf-8') as f:
-    data_json_line_up = json.load(f)
-    
-formations_infos, df_line_up_infos, events_infos = helpers_processing.extract_dataframe_from_json(data_json_line_up)
-df_line_up_home = df_line_up_infos[(df_line_up_infos['team_name'] == 'Manchester City WFC')]
-df_line_up_away = df_line_up_infos[~(df_line_up_infos['team_name'] == 'Manchester City WFC')]
-df_formation_home = formations_infos[(formations_infos['reason'] == "Starting XI") & 
-                                    (formations_infos['team_name'] == 'Manchester City WFC')]
-df_formation_away = formations_infos[(formations_infos['reason'] == "Starting XI") & 
-                                    ~(formations_infos['team_name'] == 'Manchester City WFC')]
-formation_home = str(df_formation_home['formation'].values[0])
-formation_away = str(df_formation_away['formation'].values[0])
-
-df_home = helpers_graph.create_df_line_up_stat(formation_home,df_line_up_home, events_infos,type = 'home')
-df_away = helpers_graph.create_df_line_up_stat(formation_away,df_line_up_away, events_infos,type = 'away')
-df_line_up = pd.concat([df_home, df_away])
-df_line_up = helpers_graph.add_emojis_to_events(df_line_up)
-
-df_substitutes_home =  df_line_up[~(df_line_up['from']==0) & 
-                                    (df_line_up['team_name'] == 'Manchester City WFC')]
-df_substitutes_away =  df_line_up[~(df_line_up['from'] == 0) & 
-                                    ~(df_line_up['team_name'] == 'Manchester City WFC')].sort_values(by = 'from')
-
-# EVENTS INFOS ----------------------------------------------------
-mancity_arsenal_events_path = os.path.join(os.getcwd(),'assets/Data/StatsBomb/ManCity_Arsenal_events.json')
-with open(mancity_arsenal_events_path, encoding='utf-8') as f:
-    data_json_events = json.load(f)
-    df_events = pd.json_normalize(data_json_events, sep = "_")
-
-# TECHNICAL INFOS ----------------------------------------------------
-df_cumulative_vaep_path = os.path.join(os.getcwd(),'assets/Data/arsenal_game_cumulative_vaep.csv')
-df_cumulative_vaep = pd.read_csv(df_cumulative_vaep_path,sep=',', encoding = "utf-8-sig")
-
-df_mean_vaep_path = os.path.join(os.getcwd(),'assets/Data/other_games_grouped_cumulative_vaep.csv')
-df_mean_vaep = pd.read_csv(df_mean_vaep_path,sep=',', encoding = "utf-8-sig")
-
-df_substitution_vaep_path = os.path.join(os.getcwd(),'assets/Data/vaep_rating_on_previous_games_per_positions.csv')
-df_substitution_vaep = pd.read_csv(df_substitution_vaep_path,sep=',', encoding = "utf-8-sig")
-
-# SECOND SPECTRUM INFOS ----------------------------------------------------
-df_tracking_home_path = os.path.join(os.getcwd(),'assets/Data/tracking_home.csv')
-df_tracking_home = pd.read_csv(df_tracking_home_path,sep=';', encoding = "utf-8-sig")
-
-df_tracking_away_path = os.path.join(os.getcwd(),'assets/Data/tracking_away.csv')
-df_tracking_away = pd.read_csv(df_tracking_away_path,sep=';', encoding = "utf-8-sig")
-
-filepath_metadata = os.path.join(os.getcwd(),'assets/Data/Second_Spectrum/g2312135_SecondSpectrum_meta.json')
-teamsheet = read_teamsheets_from_meta_json(filepath_metadata)
-teamsheet_home = teamsheet['Home']
-teamsheet_home['player'] = teamsheet_home['player'].str.replace("Angeldahl","Angeldal")
-teamsheet_away = teamsheet['Away']
-
-# METABOLIC POWER INFOS ----------------------------------------------------
-metabolic_power_home_path = os.path.join(os.getcwd(),'assets/Data/metabolic_power_home.csv')
-metabolic_power_home = pd.read_csv(metabolic_power_home_path,sep=";", encoding = "utf-8-sig")
-
-metabolic_power_away_path = os.path.join(os.getcwd(),'assets/Data/metabolic_power_away.csv')
-metabolic_power_away = pd.read_csv(metabolic_power_away_path,sep=";", encoding = "utf-8-sig")
+# Datasets are loaded on first use (see helpers_data): importing this page reads nothing.
+# The tracking data, the heaviest, is processed in the background when the page is first displayed.
 
 ##############################################################
 #                       GRAPHICAL SET UP
@@ -151,349 +89,364 @@ def generate_line_substitute(time, jersey, player_name, yellow_card, red_card, g
     div = html.P(str(time) + "' " + str(jersey) + '. ' + player_name + " " + str(goals)+ " "+ yellow_card + " " + red_card,className=className)
     return div
 
-match_analysis_content = html.Div(
-    [
-        dcc.Store(id='side_click',storage_type='session'),
+def generate_logo(logo):
+    if not logo :
+        return html.Div(className="logo_football_club")
+    return html.Img(src=app.get_relative_path('/assets/Images/' + logo),className="logo_football_club")
 
-        html.Div(
-            [
-                html.Div(
-                    [
-                        html.Img(src=app.get_relative_path('/assets/Images/logo_mancity.png'),className="logo_football_club"),
-                        html.H4("Manchester City vs Arsenal", className="app__header__title"),
-                        html.Img(src=app.get_relative_path('/assets/Images/logo_arsenal.png'),className="logo_football_club"),
-                    ], className="app__header__desc",
-                ),
+def create_match_analysis_content(match_id):
+    match_infos = helpers_data.get_match_infos(match_id)
+    df_line_up = helpers_data.get_line_up(match_id)
+    df_substitutes_home, df_substitutes_away = helpers_data.get_substitutes(match_id)
+
+    match_analysis_content = html.Div(
+        [
+            dcc.Store(id='side_click',storage_type='session'),
+            dcc.Store(id='match-id', data=match_id),
+            dcc.Store(id='player-context'),
+
+            html.Div(
+                [
+                    html.Div(
+                        [
+                            generate_logo(match_infos['home_logo']),
+                            html.H4(match_infos['title'], className="app__header__title"),
+                            generate_logo(match_infos['away_logo']),
+                        ], className="app__header__desc",
+                    ),
                 
-                html.Div(
-                    [
-                        html.P("Score: 2 - 1"),
-                    ],className = 'center_flex_container'
-                ),
+                    html.Div(
+                        [
+                            html.P("Score: " + (match_infos['score'] or "-")),
+                        ],className = 'center_flex_container'
+                    ),
 
-                html.Div(
-                    [
-                        html.Div(
-                            [
-                                html.Div(
-                                    [    
-                                        generate_line_substitute(time, jersey, player_name, yellow_card, red_card, goals, className = "substitutes_away") 
-                                        for time, jersey, player_name, yellow_card, red_card, goals in zip(df_substitutes_away['from'], 
-                                                        df_substitutes_away['jersey_number'],df_substitutes_away['player_name'], 
-                                                        df_substitutes_away['Yellow Card'],df_substitutes_away['Red Card'], 
-                                                        df_substitutes_away['goals'])
-                                    ]
-                                ),
-
-                                html.Div(
-                                    [
-
-                                    ], style = {'height' : '25vh'}
-                                ), 
-                                html.Div(
-                                    [    
-                                        generate_line_substitute(time, jersey, player_name, yellow_card, red_card, goals, className = "substitutes_home") 
-                                        for time, jersey, player_name, yellow_card, red_card, goals in zip(df_substitutes_home['from'], 
-                                                        df_substitutes_home['jersey_number'],df_substitutes_home['player_name'], 
-                                                        df_substitutes_home['Yellow Card'],df_substitutes_home['Red Card'], 
-                                                        df_substitutes_home['goals'])
-                                    ] 
-                                ),
-                            ], className = 'left_flex_container_pitch'
-                        ),
-
-                        html.Div(
-                            [
-                                dcc.Loading(
-                                    children=[
-                                        dcc.Graph(
-                                            id = 'pitch-graph', 
-                                            figure = helpers_graph.plot_line_up_on_pitch(df_line_up), 
-                                            responsive=True,
-                                            config={
-                                                'displayModeBar': False,
-                                                'displaylogo': False,
-                                                'autosizable': False, 
-                                                'doubleClick':False,
-                                                'responsive' :True,
-                                                'scrollZoom' :False,
-                                                'showAxisDragHandles' : False,
-                                            },
-                                        ),
-                                    ],
-                                    type="circle",
-                                    color='#5db7d3',
-                                    fullscreen = False,
-                                ),
-                            ], className = 'right_flex_container_pitch'
-                        )
-                    ]
-                )
-            ],className = 'left_flex_container'
-        ),
+                    html.Div(
+                        [
+                            html.Div(
+                                [
+                                    html.Div(
+                                        [    
+                                            generate_line_substitute(time, jersey, player_name, yellow_card, red_card, goals, className = "substitutes_away") 
+                                            for time, jersey, player_name, yellow_card, red_card, goals in zip(df_substitutes_away['from'], 
+                                                            df_substitutes_away['jersey_number'],df_substitutes_away['player_name'], 
+                                                            df_substitutes_away['Yellow Card'],df_substitutes_away['Red Card'], 
+                                                            df_substitutes_away['goals'])
+                                        ]
+                                    ),
 
-        html.Div(
-            [
-                html.Div(
-                    [
-                        html.Div(
-                            [
-                                html.H4(id = 'player_name'),
+                                    html.Div(
+                                        [
+
+                                        ], style = {'height' : '25vh'}
+                                    ), 
+                                    html.Div(
+                                        [    
+                                            generate_line_substitute(time, jersey, player_name, yellow_card, red_card, goals, className = "substitutes_home") 
+                                            for time, jersey, player_name, yellow_card, red_card, goals in zip(df_substitutes_home['from'], 
+                                                            df_substitutes_home['jersey_number'],df_substitutes_home['player_name'], 
+                                                            df_substitutes_home['Yellow Card'],df_substitutes_home['Red Card'], 
+                                                            df_substitutes_home['goals'])
+                                        ] 
+                                    ),
+                                ], className = 'left_flex_container_pitch'
+                            ),
+
+                            html.Div(
+                                [
+                                    dcc.Loading(
+                                        children=[
+                                            dcc.Graph(
+                                                id = 'pitch-graph', 
+                                                figure = helpers_figures.get_figure('pitch', match_id, None, helpers_data.get_line_up_version(match_id),
+                                                                                    lambda : helpers_graph.plot_line_up_on_pitch(df_line_up)), 
+                                                responsive=True,
+                                                config={
+                                                    'displayModeBar': False,
+                                                    'displaylogo': False,
+                                                    'autosizable': False, 
+                                                    'doubleClick':False,
+                                                    'responsive' :True,
+                                                    'scrollZoom' :False,
+                                                    'showAxisDragHandles' : False,
+                                                },
+                                            ),
+                                        ],
+                                        type="circle",
+                                        color='#5db7d3',
+                                        fullscreen = False,
+                                    ),
+                                ], className = 'right_flex_container_pitch'
+                            )
+                        ]
+                    )
+                ],className = 'left_flex_container'
+            ),
+
+            html.Div(
+                [
+                    html.Div(
+                        [
+                            html.Div(
+                                [
+                                    html.H4(id = 'player_name'),
                                 
-                                dbc.Button(
-                                    html.Span(
+                                    dbc.Button(
+                                        html.Span(
+                                            [
+                                                html.Div(children  =["\U000003A7"])
+                                            ]
+                                        ), className="xmark_sidebar_show",
+                                        id = 'xmark_sidebar'
+                                    ),              
+                                ]
+                            ),
+                        
+                            dbc.Card(
+                                [
+                                    dbc.CardBody(
                                         [
-                                            html.Div(children  =["\U000003A7"])
+                                            html.Div(
+                                                [
+                                                    html.Div(
+                                                        [
+                                                            html.Div(
+                                                                [
+                                                                    html.Div(
+                                                                        [
+                                                                            # NAME
+                                                                            html.P('Age',className = 'athlete_infos_item'),
+                                                                            html.P(id='player_age',className = 'athlete_infos__text'),
+                                                                        ],
+                                                                        className="athlete_info_container",
+                                                                    ),
+
+                                                                    html.Div(
+                                                                        [
+                                                                            # COUNTRY
+                                                                            html.P('Country',className = 'athlete_infos_item'),
+                                                                            html.P(id='player_country',className = 'athlete_infos__text'),
+                                                                        ],className="athlete_info_container",
+                                                                    ),
+                                                                ],className="athlete_info_container",
+                                                            ),
+
+                                                            html.Div(
+                                                                [
+                                                                    html.Div(
+                                                                        [
+                                                                            # HEIGHT
+                                                                            html.P('Height',className = 'athlete_infos_item'),
+                                                                            html.P(id='player_height',className = 'athlete_infos__text'),
+                                                                        ],
+                                                                        className="athlete_info_container",
+                                                                    ),
+
+                                                                    html.Div(
+                                                                        [
+                                                                            # WEIGHT
+                                                                            html.P('Weight',className = 'athlete_infos_item'),
+                                                                            html.P(id='player_weight',className = 'athlete_infos__text'),
+                                                                        ],
+                                                                        className="athlete_info_container",
+                                                                    ),
+                                                                ],className="athlete_info_container",
+                                                            ),
+
+                                                            html.Div(
+                                                                [
+                                                                    html.Div(
+                                                                        [
+                                                                            # POSITION
+                                                                            html.P('Position',className = 'athlete_infos_item'),
+                                                                            html.P(id='player_position',className = 'athlete_infos__text'),
+                                                                        ], className="athlete_info_container",
+                                                                    ),
+
+                                                                    html.Div(
+                                                                        [
+                                                                            # JERSEY NUMBER
+                                                                            html.P('Jersey number',className = 'athlete_infos_item'),
+                                                                            html.P(id='player_jersey_number',className = 'athlete_infos__text')
+                                                                        ],className="athlete_info_container",
+                                                                    ),
+                                                                ], className="athlete_info_container",
+                                                            )
+                                                        ],className='athlete_infos_container',
+                                                    ),
+                                                ],className = 'flex_content_transparent'
+                                            ),
                                         ]
-                                    ), className="xmark_sidebar_show",
-                                    id = 'xmark_sidebar'
-                                ),              
-                            ]
-                        ),
-                        
-                        dbc.Card(
-                            [
-                                dbc.CardBody(
-                                    [
-                                        html.Div(
-                                            [
-                                                html.Div(
-                                                    [
-                                                        html.Div(
-                                                            [
-                                                                html.Div(
-                                                                    [
-                                                                        # NAME
-                                                                        html.P('Age',className = 'athlete_infos_item'),
-                                                                        html.P(id='player_age',className = 'athlete_infos__text'),
-                                                                    ],
-                                                                    className="athlete_info_container",
-                                                                ),
-
-                                                                html.Div(
-                                                                    [
-                                                                        # COUNTRY
-                                                                        html.P('Country',className = 'athlete_infos_item'),
-                                                                        html.P(id='player_country',className = 'athlete_infos__text'),
-                                                                    ],className="athlete_info_container",
-                                                                ),
-                                                            ],className="athlete_info_container",
-                                                        ),
-
-                                                        html.Div(
-                                                            [
-                                                                html.Div(
-                                                                    [
-                                                                        # HEIGHT
-                                                                        html.P('Height',className = 'athlete_infos_item'),
-                                                                        html.P(id='player_height',className = 'athlete_infos__text'),
-                                                                    ],
-                                                                    className="athlete_info_container",
-                                                                ),
-
-                                                                html.Div(
-                                                                    [
-                                                                        # WEIGHT
-                                                                        html.P('Weight',className = 'athlete_infos_item'),
-                                                                        html.P(id='player_weight',className = 'athlete_infos__text'),
-                                                                    ],
-                                                                    className="athlete_info_container",
-                                                                ),
-                                                            ],className="athlete_info_container",
-                                                        ),
-
-                                                        html.Div(
-                                                            [
-                                                                html.Div(
-                                                                    [
-                                                                        # POSITION
-                                                                        html.P('Position',className = 'athlete_infos_item'),
-                                                                        html.P(id='player_position',className = 'athlete_infos__text'),
-                                                                    ], className="athlete_info_container",
-                                                                ),
-
-                                                                html.Div(
-                                                                    [
-                                                                        # JERSEY NUMBER
-                                                                        html.P('Jersey number',className = 'athlete_infos_item'),
-                                                                        html.P(id='player_jersey_number',className = 'athlete_infos__text')
-                                                                    ],className="athlete_info_container",
-                                                                ),
-                                                            ], className="athlete_info_container",
-                                                        )
-                                                    ],className='athlete_infos_container',
-                                                ),
-                                            ],className = 'flex_content_transparent'
-                                        ),
-                                    ]
-                                )
-                            ]
-                        ),
-
-                        html.Br(),
-
-                        # TECHNICAL PART
-                        dbc.Card(
-                            [
-                                dbc.CardBody(
-                                    [
-                                        html.Div(
-                                            [
-                                                html.Div(
-                                                    [
-                                                        html.Div(
-                                                            [
-                                                                html.P("Technical analysis", id='technical-title'),
-                                                            ], className = "flex_content_transparent"
-                                                        ),
-
-                                                        html.Div(
-                                                            [
-                                                                dcc.Loading(
-                                                                    id = 'loading-technical-graph',
-                                                                    children=[
-                                                                        dcc.Graph(
-                                                                            id = 'technical-graph', 
-                                                                            config={
-                                                                                'displayModeBar': False,
-                                                                                'displaylogo': False,
-                                                                                'autosizable': False, 
-                                                                                'doubleClick':False,
-                                                                                'responsive' :True,
-                                                                                'scrollZoom' :False,
-                                                                                'showAxisDragHandles' : False,
-                                                                            },
-                                                                        )
-                                                                    ],
-                                                                    type="circle",
-                                                                    fullscreen = False,
-                                                                ),
-                                                            ],className = 'left_flex_container_stats'
-                                                        ),
-
-                                                        html.Div(
-                                                            [
+                                    )
+                                ]
+                            ),
+
+                            html.Br(),
+
+                            # TECHNICAL PART
+                            dbc.Card(
+                                [
+                                    dbc.CardBody(
+                                        [
+                                            html.Div(
+                                                [
+                                                    html.Div(
+                                                        [
+                                                            html.Div(
+                                                                [
+                                                                    html.P("Technical analysis", id='technical-title'),
+                                                                ], className = "flex_content_transparent"
+                                                            ),
+
+                                                            html.Div(
+                                                                [
+                                                                    dcc.Loading(
+                                                                        id = 'loading-technical-graph',
+                                                                        children=[
+                                                                            dcc.Graph(
+                                                                                id = 'technical-graph', 
+                                                                                config={
+                                                                                    'displayModeBar': False,
+                                                                                    'displaylogo': False,
+                                                                                    'autosizable': False, 
+                                                                                    'doubleClick':False,
+                                                                                    'responsive' :True,
+                                                                                    'scrollZoom' :False,
+                                                                                    'showAxisDragHandles' : False,
+                                                                                },
+                                                                            )
+                                                                        ],
+                                                                        type="circle",
+                                                                        fullscreen = False,
+                                                                    ),
+                                                                ],className = 'left_flex_container_stats'
+                                                            ),
+
+                                                            html.Div(
+                                                                [
                                                             
-                                                                html.Div(
-                                                                    id = 'technical_stats'
-                                                                ),
-                                                            ],className = 'right_flex_container_stats'
-                                                        )
-                                                    ]
-                                                )
-                                            ], className="flex_content_transparent"
-                                        )
+                                                                    html.Div(
+                                                                        id = 'technical_stats'
+                                                                    ),
+                                                                ],className = 'right_flex_container_stats'
+                                                            )
+                                                        ]
+                                                    )
+                                                ], className="flex_content_transparent"
+                                            )
                                         
-                                    ]
-                                )
-                            ]
-                        ),
-
-                        html.Br(),
-
-                        # PHYSICAL PART
-                        dbc.Card(
-                            [
-                                dbc.CardBody(
-                                    [
-                                        html.Div(
-                                            [
-                                                html.P("Physical analysis", id='physical-title'),
-                                            ], className = "flex_content_transparent"
-                                        ),
+                                        ]
+                                    )
+                                ]
+                            ),
 
-                                        html.Div(
-                                            [
-                                                dcc.Loading(
-                                                    id= 'loading-physical-graph',
-                                                    children=[
-                                                        dcc.Graph(
-                                                            id = 'physical-graph', 
-                                                            config={
-                                                                'displayModeBar': False,
-                                                                'displaylogo': False,
-                                                                'autosizable': False, 
-                                                                'doubleClick':False,
-                                                                'responsive' :True,
-                                                                'scrollZoom' :False,
-                                                                'showAxisDragHandles' : False,
-                                                            },
-                                                        )
-                                                    ],
-                                                    type="circle",
-                                                    fullscreen = False,
-                                                ),
-                                            ],className = 'left_flex_container_stats'
-                                        ),
-
-                                        html.Div(
-                                            [
+                            html.Br(),
+
+                            # PHYSICAL PART
+                            dbc.Card(
+                                [
+                                    dbc.CardBody(
+                                        [
+                                            html.Div(
+                                                [
+                                                    html.P("Physical analysis", id='physical-title'),
+                                                ], className = "flex_content_transparent"
+                                            ),
+
+                                            html.Div(
+                                                [
+                                                    dcc.Loading(
+                                                        id= 'loading-physical-graph',
+                                                        children=[
+                                                            dcc.Graph(
+                                                                id = 'physical-graph', 
+                                                                config={
+                                                                    'displayModeBar': False,
+                                                                    'displaylogo': False,
+                                                                    'autosizable': False, 
+                                                                    'doubleClick':False,
+                                                                    'responsive' :True,
+                                                                    'scrollZoom' :False,
+                                                                    'showAxisDragHandles' : False,
+                                                                },
+                                                            )
+                                                        ],
+                                                        type="circle",
+                                                        fullscreen = False,
+                                                    ),
+                                                ],className = 'left_flex_container_stats'
+                                            ),
+
+                                            html.Div(
+                                                [
                                             
-                                                html.Div(
-                                                    id = 'physical_stats'
-                                                ),
-                                            ],className = 'right_flex_container_stats'
-                                        )
-                                    ]
-                                )
-                            ]
-                        ),
-
-                        html.Br(),
-
-                        # SUBSTITUTION PART
-                        dbc.Card(
-                            [
-                                dbc.CardBody(
-                                    [
-                                        html.Div(
-                                            [
-                                                html.P("Recommended substitution", id='substitution-title'),
-                                            ], className = "flex_content_transparent"
-                                        ),
+                                                    html.Div(
+                                                        id = 'physical_stats'
+                                                    ),
+                                                ],className = 'right_flex_container_stats'
+                                            )
+                                        ]
+                                    )
+                                ]
+                            ),
+
+                            html.Br(),
+
+                            # SUBSTITUTION PART
+                            dbc.Card(
+                                [
+                                    dbc.CardBody(
+                                        [
+                                            html.Div(
+                                                [
+                                                    html.P("Recommended substitution", id='substitution-title'),
+                                                ], className = "flex_content_transparent"
+                                            ),
 
                                         
 
-                                        html.Div(
-                                            [
-                                                html.Div(
-                                                    id = 'possible_substitution'
-                                                ),
-                                            ],className = 'flex_content_transparent'
-                                        )
-                                    ]
-                                )
-                            ]
-                        ),
+                                            html.Div(
+                                                [
+                                                    html.Div(
+                                                        id = 'possible_substitution'
+                                                    ),
+                                                ],className = 'flex_content_transparent'
+                                            )
+                                        ]
+                                    )
+                                ]
+                            ),
 
                     
-                    ],style = {'display' : "none"},
-                    id = 'show-sidebar'
+                        ],style = {'display' : "none"},
+                        id = 'show-sidebar'
                     
-                ),
-            ],className = 'right_flex_container'
-        ),
+                    ),
+                ],className = 'right_flex_container'
+            ),
 
 
-        #FOOTER
-        html.Div(
-            [
-                html.Div(
-                    [
-                        html.P('© Lutecity, 2023')
-                    ],
-                    className="footer_text",
-                )
-            ],
-            className="footer_container",
-        ),
-    ]
-)
+            #FOOTER
+            html.Div(
+                [
+                    html.Div(
+                        [
+                            html.P('© Lutecity, 2023')
+                        ],
+                        className="footer_text",
+                    )
+                ],
+                className="footer_container",
+            ),
+        ]
+    )
+    return match_analysis_content
 
-def match_analysis():
+def match_analysis(match_id):
+    helpers_data.warm_tracking_data(match_id)
     layout = html.Div(
         [
-            match_analysis_content
+            create_match_analysis_content(match_id)
         ]
     )
     return layout
@@ -502,6 +455,31 @@ def match_analysis():
 ##############################################################
 #                       CALLBACK
 ##############################################################
+# RESOLVE THE CLICKED PLAYER --------------------------------
+@app.callback(
+    Output(component_id = 'player-context', component_property = 'data'),
+    [
+        Input(component_id = 'pitch-graph', component_property = 'clickData')
+    ],
+    [
+        State(component_id = 'match-id', component_property = 'data')
+    ]
+)
+def resolve_player_context(clickData, match_id):
+    if not clickData:
+        raise dash.exceptions.PreventUpdate
+
+    # The markers of the players carry their id (customdata): the click is resolved once,
+    # the panels below only read the player's context
+    point = clickData['points'][0]
+    if 'customdata' not in point :
+        raise dash.exceptions.PreventUpdate
+    player_context = helpers_data.get_player_context(match_id, point['customdata'])
+    if player_context is None :
+        raise dash.exceptions.PreventUpdate
+    return player_context
+
+
 # SHOW SIDEBAR WITH INDIVIDUAL STATS --------------------------------
 @app.callback(
     [
@@ -509,26 +487,25 @@ def match_analysis():
         Output(component_id="side_click", component_property="data"),
     ],
     [
-        Input(component_id = 'pitch-graph', component_property = 'clickData'),
+        Input(component_id = 'player-context', component_property = 'data'),
         Input(component_id = "xmark_sidebar", component_property="n_clicks")
     ],
     [
-        State(component_id = "side_click", component_property="data")
+        State(component_id = "side_click", component_property="data"),
+        State(component_id = 'match-id', component_property = 'data')
     ]
 
 )
-def display_left_part(clickData,n_xmark,nclick):
-    if not clickData:
+def display_left_part(player_context,n_xmark,nclick,match_id):
+    if not player_context:
         raise dash.exceptions.PreventUpdate
+
     ctx = dash.callback_context
     input_id = ctx.triggered[0]["prop_id"]
 
-    x_clickData = clickData['points'][0]['x']
-    y_clickData = clickData['points'][0]['y']
-    df_line_up_player = df_line_up[(df_line_up['x_coord']==x_clickData) & (df_line_up['y_coord']==y_clickData)]
-    position = df_line_up_player['position'].unique()[0]
+    position = player_context['position']
 
-    if input_id == "pitch-graph.clickData" : 
+    if input_id == "player-context.data" : 
         sidebar_style = SIDEBAR_STYLE
         cur_nclick = "HIDDEN"
     
@@ -568,62 +545,65 @@ def display_left_part(clickData,n_xmark,nclick):
         Output(component_id = 'loading-physical-graph', component_property = 'color'),
     ],
     [
-        Input(component_id = 'pitch-graph', component_property = 'clickData')
+        Input(component_id = 'player-context', component_property = 'data')
+    ]
+    ,
+    [
+        State(component_id = 'match-id', component_property = 'data')
     ]
 )
-def display_player_infos(clickData):
-    if not clickData:
+def display_player_infos(player_context, match_id):
+    if not player_context:
         raise dash.exceptions.PreventUpdate
 
-    # Access the player infos depending of each click on graph
-    x_clickData = clickData['points'][0]['x']
-    y_clickData = clickData['points'][0]['y']
-    df_line_up_player = df_line_up[(df_line_up['x_coord']==x_clickData) & (df_line_up['y_coord']==y_clickData)]
-    player_id = df_line_up_player['player_id'].iloc[0]
-    df_line_up_infos_player = df_line_up_infos[df_line_up_infos['player_id']==player_id]
+    # Data of the match, loaded on first use
+    match_infos = helpers_data.get_match_infos(match_id)
+
+    # Access the player infos
+    player_infos = helpers_data.get_player_index(match_id)[player_context['player_id']]['infos']
     
     # Team
-    team = df_line_up_infos_player['team_name'].iloc[0]
+    team = player_infos['team_name']
 
     # Player name
-    player_name = df_line_up_infos_player['player_name'].iloc[0]
-    player_jersey_number = str(df_line_up_infos_player['jersey_number'].iloc[0])
-    if team == "Arsenal WFC" :
+    player_name = player_infos['player_name']
+    player_jersey_number = str(player_infos['jersey_number'])
+    if team == match_infos['away_team_name'] :
         player_name_style = "text_arsenal"
     else :
         player_name_style = "text_mancity"
 
     # Age
-    player_birth_date = df_line_up_infos_player['birth_date'].iloc[0]
-    if pd.isnull(player_birth_date):
+    player_birth_date = player_infos['birth_date']
+    if pd.isnull(player_birth_date) or match_infos['match_date'] is None:
         player_age = ""
     else: 
         player_birth_date = datetime.strptime(player_birth_date,"%Y-%m-%d")
-        match_date = datetime.strptime("2023-11-02", "%Y-%m-%d")
+        match_date = datetime.strptime(match_infos['match_date'], "%Y-%m-%d")
         player_age = format(np.round((match_date - player_birth_date).days/365.2425,1), '.0f')
 
     # Country
-    player_country = df_line_up_infos_player['country.name'].iloc[0]
+    player_country = player_infos['country.name']
 
     # Height
-    player_height = df_line_up_infos_player['player_height'].iloc[0]
+    player_height = player_infos['player_height']
     if player_height != player_height :
         player_height = format(player_height,'.0f') + " cm"
     else :
         player_height = "-"
 
     # Weight
-    player_weight = df_line_up_infos_player['player_weight'].iloc[0]
+    player_weight = player_infos['player_weight']
     if player_weight != player_weight :
         player_weight = format(player_weight,'.0f') + " cm"
     else :
         player_weight = "-"
 
     # Position
-    player_position = df_line_up_infos_player['position'].iloc[0]
+    player_position = player_infos['position']
 
     # Loading color
-    if team == "Arsenal WFC" :
+    if team == match_infos['away_team_name'] :
         color = "#d52e22"
     else :
         color = "#5db7d3"
@@ -634,19 +614,28 @@ def display_player_infos(clickData):
 @app.callback(
     Output(component_id = 'technical-graph', component_property = 'figure'),
     [
-        Input(component_id = 'pitch-graph', component_property = 'clickData')
+        Input(component_id = 'player-context', component_property = 'data')
+    ]
+    ,
+    [
+        State(component_id = 'match-id', component_property = 'data')
     ]
 )
-def display_vaep_graph(clickData):
-    if not clickData:
+def display_vaep_graph(player_context, match_id):
+    if not player_context:
         raise dash.exceptions.PreventUpdate
 
-    # Access the player infos depending of each click on graph
-    x_clickData = clickData['points'][0]['x']
-    y_clickData = clickData['points'][0]['y']
-    df_line_up_player = df_line_up[(df_line_up['x_coord']==x_clickData) & (df_line_up['y_coord']==y_clickData)]
-    player_id = df_line_up_player['player_id'].iloc[0]
-    position = df_line_up_player['position'].unique()[0]
+    # Figure built once per player and version of the VAEP tables (see helpers_figures)
+    return helpers_figures.get_figure('vaep', match_id, player_context['player_id'], helpers_data.get_vaep_version(match_id),
+                                      lambda : create_vaep_graph(player_context, match_id))
+
+def create_vaep_graph(player_context, match_id):
+    # Data of the match, loaded on first use
+    df_cumulative_vaep = helpers_data.get_cumulative_vaep(match_id)
+    df_mean_vaep = helpers_data.get_mean_vaep()
+
+    player_id = player_context['player_id']
+    position = player_context['position']
 
     df_cumulative_vaep_player = df_cumulative_vaep[df_cumulative_vaep['player_id']==player_id]
     df_mean_vaep_player = df_mean_vaep[df_mean_vaep['player_id']==player_id]
@@ -654,38 +643,35 @@ def display_vaep_graph(clickData):
     if position == 'Goalkeeper' :
         graph = helpers_graph.return_blank_fig(figure_height=20)
     else :
-        graph = helpers_graph.create_vaep_graph(df_cumulative_vaep_player, df_mean_vaep_player)
+        team_index = 0 if player_context['teamname'] == 'Home' else 1
+        graph = helpers_graph.create_vaep_graph(df_cumulative_vaep_player, df_mean_vaep_player, team_index)
     return graph 
 
 # DISPLAY PLAYER'S TECHNICAL STATS --------------------------------
 @app.callback(
     Output(component_id = 'technical_stats', component_property = 'children'),
     [
-        Input(component_id = 'pitch-graph', component_property = 'clickData')
+        Input(component_id = 'player-context', component_property = 'data')
+    ]
+    ,
+    [
+        State(component_id = 'match-id', component_property = 'data')
     ]
 )
-def display_technical_stats(clickData):
-    if not clickData:
+def display_technical_stats(player_context, match_id):
+    if not player_context:
         raise dash.exceptions.PreventUpdate
 
-    # Access the player infos depending of each click on graph
-    x_clickData = clickData['points'][0]['x']
-    y_clickData = clickData['points'][0]['y']
-    df_line_up_player = df_line_up[(df_line_up['x_coord']==x_clickData) & (df_line_up['y_coord']==y_clickData)]
-    player_id = df_line_up_player['player_id'].iloc[0]
-    df_line_up_infos_player = df_line_up_infos[df_line_up_infos['player_id']==player_id]
-    position = df_line_up_player['position'].unique()[0]
-    player_position_id = df_line_up_infos_player['position_id'].unique()[0]
+    player_id = player_context['player_id']
+    position = player_context['position']
+    position_group = helpers_season.get_position_group([player_context['position_id']])[0]
 
     if position == 'Goalkeeper' : 
         div = []
     else :
-        # Compute_statistics
-        df_events_sub = df_events[df_events['player_id']==player_id]
-        df_stats = helpers_statistics.aggregate_technical_statistics(df_events_sub)
-        df_player = helpers_statistics.differentiate_statistics(df_events_sub, df_stats, player_position_id)
-        
-        df_player = df_player[df_player.columns[~df_player.columns.isin(['team_name', 'player_id', 'player_name'])]]
+        # Read the player's statistics from the season table (computed by update_statistics.py, or else in memory)
+        df_player = helpers_season.get_player_technical_statistics(match_id, player_id)
+        df_player = df_player[helpers_season.get_position_statistics(position_group)]
         
         div_left, div_right = [], []
         for col_index in range(len(df_player.columns)) :
@@ -727,73 +713,70 @@ def display_technical_stats(clickData):
 @app.callback(
     Output(component_id = 'physical-graph', component_property = 'figure'),
     [
-        Input(component_id = 'pitch-graph', component_property = 'clickData')
+        Input(component_id = 'player-context', component_property = 'data')
+    ]
+    ,
+    [
+        State(component_id = 'match-id', component_property = 'data')
     ]
 )
-def display_metabolic_power_graph(clickData):
-    if not clickData:
+def display_metabolic_power_graph(player_context, match_id):
+    if not player_context:
         raise dash.exceptions.PreventUpdate
 
-    # Access the player infos depending of each click on graph
-    x_clickData = clickData['points'][0]['x']
-    y_clickData = clickData['points'][0]['y']
-    df_line_up_player = df_line_up[(df_line_up['x_coord']==x_clickData) & (df_line_up['y_coord']==y_clickData)]
-    player_id = df_line_up_player['player_id'].iloc[0]
-    df_line_up_infos_player = df_line_up_infos[df_line_up_infos['player_id']==player_id]
-    team_name = df_line_up_infos_player['team_name'].unique()[0]
-    position = df_line_up_player['position'].unique()[0]
-
-    if team_name == "Manchester City WFC" :
-        df_teamsheet = teamsheet_home
-        df_metabolic_power = metabolic_power_home
-        teamname = 'Home'
-    else :
-        df_teamsheet = teamsheet_away
-        df_metabolic_power = metabolic_power_away
-        teamname = 'Away'
+    # Figure built once per player and version of the metabolic power (see helpers_figures)
+    teamname = player_context['teamname']
+    return helpers_figures.get_figure('metabolic_power', match_id, player_context['player_id'],
+                                      helpers_data.get_metabolic_power_version(match_id, teamname),
+                                      lambda : create_metabolic_power_graph(player_context, match_id))
+
+def create_metabolic_power_graph(player_context, match_id):
+    team_name = player_context['team_name']
+    teamname = player_context['teamname']
+    position = player_context['position']
+    id_second_spectrum = player_context['second_spectrum_id']
+
+    # Data of the match, loaded on first use
+    df_metabolic_power = helpers_data.get_metabolic_power(match_id, teamname)
+    if df_metabolic_power is None or id_second_spectrum is None :
+        return helpers_graph.return_blank_fig(figure_height=20)
 
-    id_second_spectrum = helpers_graph.extract_from_second_spectrum_id(df_line_up_infos, df_teamsheet, player_id)
     df_metabolic_power = df_metabolic_power[['Period','Time_sec','official_clock',teamname +'_'+str(id_second_spectrum)+"_Metabolic_power"]]
-    metabolic_power = df_metabolic_power[df_metabolic_power['Time_sec'] > 3000][teamname +'_'+str(id_second_spectrum)+"_Metabolic_power"]
-    list_threshold = helpers_graph.find_fatigue_threshold(metabolic_power)
+    fatigue = helpers_data.get_player_fatigue(match_id, teamname, id_second_spectrum)
+    list_threshold = None if fatigue is None or pd.isnull(fatigue['onset']) else [fatigue['onset'], fatigue['last_time']]
 
     if position == 'Goalkeeper' :
         graph = helpers_graph.return_blank_fig(figure_height=20)
     else :
-        graph = helpers_graph.create_metabolic_power_graph(df_metabolic_power, list_threshold,team_name)
+        team_index = 0 if teamname == 'Home' else 1
+        graph = helpers_graph.create_metabolic_power_graph(df_metabolic_power, list_threshold,team_name, team_index)
     return graph 
 
 # DISPLAY PLAYER'S PHYSICAL STATS --------------------------------
 @app.callback(
     Output(component_id = 'physical_stats', component_property = 'children'),
     [
-        Input(component_id = 'pitch-graph', component_property = 'clickData')
+        Input(component_id = 'player-context', component_property = 'data')
+    ]
+    ,
+    [
+        State(component_id = 'match-id', component_property = 'data')
     ]
 )
-def display_physical_stats(clickData):
-    if not clickData:
+def display_physical_stats(player_context, match_id):
+    if not player_context:
         raise dash.exceptions.PreventUpdate
 
-    # Access the player infos depending of each click on graph
-    x_clickData = clickData['points'][0]['x']
-    y_clickData = clickData['points'][0]['y']
-    df_line_up_player = df_line_up[(df_line_up['x_coord']==x_clickData) & (df_line_up['y_coord']==y_clickData)]
-    player_id = df_line_up_player['player_id'].iloc[0]
-    df_line_up_infos_player = df_line_up_infos[df_line_up_infos['player_id']==player_id]
-    team_name = df_line_up_infos_player['team_name'].unique()[0]
-    jersey_number = df_line_up_infos_player['jersey_number'].unique()[0]
-    position = df_line_up_player['position'].unique()[0]
+    teamname = player_context['teamname']
+    jersey_number = player_context['jersey_number']
+    position = player_context['position']
 
-    if position == 'Goalkeeper' :
+    # Read the player's statistics from the cache
+    df_player = helpers_data.get_physical_statistics(match_id, teamname, jersey_number) if position != 'Goalkeeper' else None
+
+    if position == 'Goalkeeper' or df_player is None :
         div = []
     else:
-        if team_name == "Manchester City WFC" :
-            df_stats = helpers_statistics.aggregate_physical_statistics(df_tracking_home, teamsheet_home, 'Home')
-        else :
-            df_stats = helpers_statistics.aggregate_physical_statistics(df_tracking_away, teamsheet_away, 'Away')
-
-        # Compute_statistics        
-        df_player = df_stats[df_stats['jID']==jersey_number]
         df_player = df_player.drop(columns = ['jID','player'])
 
         div_left, div_right = [], []
@@ -835,20 +818,21 @@ def display_physical_stats(clickData):
 @app.callback(
     Output(component_id = 'possible_substitution', component_property = 'children'),
     [
-        Input(component_id = 'pitch-graph', component_property = 'clickData')
+        Input(component_id = 'player-context', component_property = 'data')
+    ]
+    ,
+    [
+        State(component_id = 'match-id', component_property = 'data')
     ]
 )
-def display_technical_stats(clickData):
-    if not clickData:
+def display_technical_stats(player_context, match_id):
+    if not player_context:
         raise dash.exceptions.PreventUpdate
 
-    # Access the player infos depending of each click on graph
-    x_clickData = clickData['points'][0]['x']
-    y_clickData = clickData['points'][0]['y']
-    df_line_up_player = df_line_up[(df_line_up['x_coord']==x_clickData) & (df_line_up['y_coord']==y_clickData)]
-    player_id = df_line_up_player['player_id'].iloc[0]
-    df_line_up_infos_player = df_line_up_infos[df_line_up_infos['player_id']==player_id]
-    player_position_name = df_line_up_infos_player['position'].unique()[0]
+    # Data of the match, loaded on first use
+    df_substitution_vaep = helpers_data.get_substitution_vaep()
+
+    player_position_name = player_context['position_name']
     
     if player_position_name == 'Goalkeeper' :
         div = []
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    File name: replay_tracking.py
+    Use: replays a recorded SecondSpectrum tracking file (JSONL) as if the match was played: its frames are written
+         to the live tracking file of the match (assets/Data/Second_Spectrum/<second_spectrum_id>_SecondSpectrum_tracking-live.jsonl
+         by default) at 1x to 50x speed, and the app follows them in its live mode (see helpers_live).
+         Run it from the App folder: python replay_tracking.py <recorded.jsonl> [--match-id ManCity_Arsenal] [--speed 10]
+    Author: Lutecity (Melanie Baconnais & Chloe Gobe) 
+    Date created: 04/2023
+    Python Version: 3.10.4
+"""
+
+##############################################################
+#                       IMPORTS
+##############################################################
+import argparse
+from pages.helpers import helpers_catalog, helpers_live
+
+##############################################################
+#                       REPLAY
+##############################################################
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay a recorded SecondSpectrum tracking file as a live match.')
+    parser.add_argument('source', help='recorded tracking file (JSONL)')
+    parser.add_argument('--match-id', default=None, help='match of the catalog (default match by default)')
+    parser.add_argument('--output', default=None, help='live tracking file (the one of the match by default)')
+    parser.add_argument('--speed', type=float, default=1, help='replay speed, from 1 to ' + str(helpers_live.MAX_REPLAY_SPEED))
+    parser.add_argument('--start-frame', type=int, default=0, help='first frame replayed')
+    args = parser.parse_args()
+    if not 1 <= args.speed <= helpers_live.MAX_REPLAY_SPEED :
+        parser.error('the speed must be between 1 and ' + str(helpers_live.MAX_REPLAY_SPEED))
+
+    output = args.output
+    if output is None :
+        match_id = args.match_id or helpers_catalog.get_default_match_id()
+        output = helpers_catalog.get_match_infos(match_id)['live_tracking_path']
+        if output is None :
+            parser.error('the match ' + match_id + ' has no SecondSpectrum data')
+    print('Replaying ' + args.source + ' to ' + output + ' at ' + str(args.speed) + 'x')
+    n_frames = helpers_live.replay_tracking_file(args.source, output, args.speed, args.start_frame)
+    print(str(n_frames) + ' frames replayed')
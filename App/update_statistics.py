@@ -0,0 +1,26 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    File name: update_statistics.py
+    Use: computes the technical statistics of the players of every catalogued match (assets/Data/technical_statistics).
+         Only the matches that are new, or whose events file has changed, are computed.
+         Run it from the App folder after adding the StatsBomb files of new matches.
+    Author: Lutecity (Melanie Baconnais & Chloe Gobe) 
+    Date created: 04/2023
+    Python Version: 3.10.4
+"""
+
+##############################################################
+#                       IMPORTS
+##############################################################
+from pages.helpers import helpers_catalog, helpers_season
+
+##############################################################
+#                       UPDATE
+##############################################################
+if __name__ == '__main__':
+    match_ids = helpers_season.update_technical_statistics_table()
+    print(str(len(match_ids)) + ' match(es) computed, ' + str(len(helpers_catalog.get_match_ids()) - len(match_ids)) + ' up to date')
+    for match_id in match_ids :
+        print('- ' + match_id)
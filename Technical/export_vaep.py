@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    File name: export_vaep.py
+    Use: regenerates the VAEP tables read by the App (Analyzing-VAEP-games.ipynb as a script):
+         - cumulative adjusted VAEP of the players of the analysed game, per minute (arsenal_game_cumulative_vaep.csv)
+         - mean cumulative adjusted VAEP of the players over the previous games (other_games_grouped_cumulative_vaep.csv)
+         - VAEP rating of the substitutes per position on the previous games (vaep_rating_on_previous_games_per_positions.csv)
+         The games are read from the StatsBomb data, valued in one batch with the trained model (modeles/mixed_VAEP_model.pkl,
+         see vaep_scoring, whose predictions are cached per game, model and actions in Data/vaep-predictions)
+         and post-processed with vaep_postprocess.
+         Run it from the Technical folder: python export_vaep.py [--game-id 3852832] [--output ../App/assets/Data]
+    Author: Lutecity (Melanie Baconnais & Chloe Gobe)
+    Date created: 04/2023
+    Python Version: 3.10.4
+"""
+
+##############################################################
+#                       IMPORTS
+##############################################################
+import os
+import json
+import argparse
+import pandas as pd
+
+# Socceraction
+from socceraction.data.statsbomb import StatsBombLoader
+import socceraction.spadl as spadl
+import socceraction.atomic.spadl as atomicspadl
+
+# Others
+from helper_preprocessing import extract_dataframe_from_json
+import vaep_postprocess
+import vaep_scoring
+
+##############################################################
+#                       VAEP VALUES
+##############################################################
+def load_games(SBL, competition_id, season_id, team_id, excluded_team_ids) :
+    '''
+    This function returns the games played at home by a team, with a score, except against some teams.
+    '''
+    df_games = SBL.games(competition_id=competition_id, season_id=season_id)
+    df_games = df_games[(df_games["home_team_id"] == team_id) & (~df_games["home_score"].isna())]
+    return(df_games[~df_games["away_team_id"].isin(excluded_team_ids)])
+
+def load_game(SBL, game) :
+    '''
+    This function converts the events of a game to atomic SPADL actions.
+    It returns the actions, the teams, the players and the events of the game.
+    '''
+    teams = SBL.teams(game.game_id)
+    players = SBL.players(game.game_id)
+    events = SBL.events(game.game_id)
+    actions = atomicspadl.convert_to_atomic(spadl.statsbomb.convert_to_actions(events, game.home_team_id))
+    return(actions, teams, players, events)
+
+def value_games(SBL, df_games, model_path, predictions_folder = vaep_scoring.PREDICTIONS_FOLDER) :
+    '''
+    This function values the atomic SPADL actions of games, all the games being scored in one batch (see vaep_scoring.score_games).
+    It returns the actions with the names of their types and body parts, the players and teams infos, and their VAEP values,
+    and the players and the events of the games.
+    '''
+    games = {game.game_id : load_game(SBL, game) for game in df_games.itertuples()}
+    values = vaep_scoring.score_games([(game.game_id, game.home_team_id, games[game.game_id][0]) for game in df_games.itertuples()],
+                                      model_path, predictions_folder)
+
+    list_actions = []
+    for game_id, (actions, teams, players, events) in games.items() :
+        list_actions.append(values[game_id].merge(players, how="left").merge(teams, how="left"))
+        print('Valued game ' + str(game_id) + ': ' + str(len(actions)) + ' actions')
+    players = pd.concat([game[2] for game in games.values()])
+    events = pd.concat([game[3] for game in games.values()])
+    return(pd.concat(list_actions), players, events)
+
+def read_lineup_positions(lineups_path, team_id) :
+    '''
+    This function returns the positions played by the players of a team in a game, from its StatsBomb lineups file.
+    '''
+    with open(lineups_path, encoding='utf-8') as f:
+        lineups = json.load(f)
+    _, df_lineups, _ = extract_dataframe_from_json(lineups)
+    return(df_lineups[df_lineups["team_id"] == team_id][["player_name", "player_id", "position"]])
+
+##############################################################
+#                       EXPORT
+##############################################################
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Regenerate the VAEP tables of the App.')
+    parser.add_argument('--data', default='Data/StatsBomb-City-VAEP/Data/', help='StatsBomb data (local getter of socceraction)')
+    parser.add_argument('--competition-id', type=int, default=37)
+    parser.add_argument('--season-id', type=int, default=235)
+    parser.add_argument('--team-id', type=int, default=746, help='team whose home games are used')
+    parser.add_argument('--excluded-team-ids', type=int, nargs='*', default=[1475], help='opponents whose games are not in the data')
+    parser.add_argument('--game-id', type=int, default=3852832, help='analysed game, the others being the previous games')
+    parser.add_argument('--model', default=vaep_scoring.MODEL_PATH)
+    parser.add_argument('--predictions', default=vaep_scoring.PREDICTIONS_FOLDER, help='cache of the predictions of the games')
+    parser.add_argument('--matrix', default='matrice_vaep.csv', help='distribution of the VAEP values (Training-VAEP-model.ipynb)')
+    parser.add_argument('--positions', default='poste.csv')
+    parser.add_argument('--output', default=os.path.join('..', 'App', 'assets', 'Data'))
+    parser.add_argument('--game-name', default='arsenal_game', help='prefix of the cumulative VAEP file of the analysed game')
+    args = parser.parse_args()
+
+    SBL = StatsBombLoader(getter="local", root=args.data)
+    df_games = load_games(SBL, args.competition_id, args.season_id, args.team_id, args.excluded_team_ids)
+    if args.game_id not in df_games["game_id"].values :
+        parser.error('the game ' + str(args.game_id) + ' is not a home game of the team ' + str(args.team_id))
+
+    # VAEP values of the actions of every game
+    df_actions_vaep, players, df_events = value_games(SBL, df_games, args.model, args.predictions)
+    df_actions_vaep = df_actions_vaep.sort_values(["game_id", "period_id", "time_seconds"]).reset_index(drop=True)
+
+    # Post-processing
+    df_actions_vaep = vaep_postprocess.rescale_goals(df_actions_vaep)
+    df_actions_vaep = vaep_postprocess.add_real_time(df_actions_vaep)
+    df_actions_vaep = vaep_postprocess.add_positions(df_actions_vaep, df_events)
+    df_actions_vaep = vaep_postprocess.adjust_vaep(df_actions_vaep,
+                                                   vaep_postprocess.read_vaep_matrix(args.matrix),
+                                                   vaep_postprocess.read_position_weights(args.positions))
+    df_previous_games = df_actions_vaep[df_actions_vaep["game_id"] != args.game_id]
+    df_game = df_actions_vaep[df_actions_vaep["game_id"] == args.game_id]
+
+    # Tables of the App
+    df_cumulative = vaep_postprocess.compute_cumulative_vaep(df_game, players[players["game_id"] == args.game_id])
+    df_previous_cumulative = vaep_postprocess.compute_games_cumulative_vaep(df_previous_games, players)
+    df_mean = vaep_postprocess.compute_mean_cumulative_vaep(df_previous_cumulative)
+
+    df_positions = pd.concat([read_lineup_positions(os.path.join(args.data, 'lineups', str(game_id) + '.json'), args.team_id)
+                              for game_id in df_games["game_id"]])
+    df_positions = df_positions.drop_duplicates().sort_values(by="player_name")
+    starting_players = players[(players["game_id"] == args.game_id) & (players["team_id"] == args.team_id)
+                               & (players["starting_position_name"] != "Substitute")]["player_id"]
+    df_ratings = vaep_postprocess.compute_substitution_ratings(df_previous_games, df_positions, starting_players)
+
+    for df, name in [(df_cumulative, args.game_name + '_cumulative_vaep.csv'),
+                     (df_mean, 'other_games_grouped_cumulative_vaep.csv'),
+                     (df_ratings, 'vaep_rating_on_previous_games_per_positions.csv')] :
+        df.to_csv(os.path.join(args.output, name), index=False)
+        print('Exported ' + os.path.join(args.output, name) + ': ' + str(len(df)) + ' rows')
@@ -0,0 +1,204 @@
+'''
+This script stores the VAEP features and labels of the atomic SPADL actions (see Training-VAEP-model.ipynb),
+one partition per game, instead of one HDF key per game read whole:
+- a partition is a folder (game_<game_id>) with one float32 .npy file per column (the codes for a categorical column),
+  so that only the columns requested are read, and a metadata.json file: columns, number of actions, and signature of what produced it
+  (FEATURE_STORE_VERSION, version of socceraction, number of previous actions, feature and label functions,
+  with a hash of their code)
+- build_partitions computes the partitions that are missing or stale (signature different from the current one)
+- read_features reads some columns of several games, in parallel, into a single float32 matrix allocated once
+check_feature_store builds the partition of one game in a temporary folder and compares the columns read with the
+features computed directly. Run it from the Technical folder:
+python feature_store.py [--events ../Data/StatsBomb/ManCity_Arsenal_events.json]
+'''
+
+# LIBRAIRIES ----------------------------------------------------
+# STANDARD LIBRARIES
+import os
+import json
+import shutil
+import argparse
+import tempfile
+import hashlib
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import numpy as np
+import warnings
+warnings.simplefilter(action='ignore', category=FutureWarning)
+pd.set_option('max_colwidth', 400)
+pd.set_option('display.max_columns', None)
+pd.options.mode.chained_assignment = None
+
+# Socceraction
+import socceraction
+import socceraction.spadl as spadl
+import socceraction.atomic.spadl as atomicspadl
+import socceraction.atomic.vaep.features as fs
+import socceraction.atomic.vaep.labels as lab
+
+FEATURE_STORE_VERSION = 1
+NB_PREVIOUS_ACTIONS = 3
+FEATURE_FUNCTIONS = [
+    #fs.actiontype, # names of the action types (categorical), see actiontype_onehot
+    fs.actiontype_onehot,
+    #fs.bodypart, # names of the body parts (categorical), see bodypart_onehot
+    fs.bodypart_onehot,
+    fs.goalscore,
+    fs.location,
+    fs.polar,
+    fs.movement_polar,
+    fs.direction,
+    fs.team,
+    fs.time,
+    fs.time_delta,
+]
+LABEL_FUNCTIONS = [lab.scores, lab.concedes]
+
+# FUNCTIONS ----------------------------------------------------
+
+def get_function_signature(fn) :
+    '''
+    This function identifies a feature or label function: its name and a hash of its code.
+    '''
+    code = inspect.unwrap(fn).__code__
+    return('{}.{}:{}'.format(fn.__module__, fn.__name__, hashlib.sha1(code.co_code + repr(code.co_consts).encode()).hexdigest()[:12]))
+
+def get_signature(xfns = FEATURE_FUNCTIONS, yfns = LABEL_FUNCTIONS, nb_previous_actions = NB_PREVIOUS_ACTIONS) :
+    '''
+    This function returns the signature of the partitions computed with some feature and label functions.
+    '''
+    return({
+        'version' : FEATURE_STORE_VERSION,
+        'socceraction' : socceraction.__version__,
+        'nb_previous_actions' : nb_previous_actions,
+        'features' : [get_function_signature(fn) for fn in xfns],
+        'labels' : [get_function_signature(fn) for fn in yfns],
+    })
+
+def get_partition_path(folder, game_id) :
+    return(os.path.join(folder, 'game_{}'.format(game_id)))
+
+def read_metadata(folder, game_id) :
+    '''
+    This function returns the metadata of the partition of a game, None if there is no partition.
+    '''
+    path = os.path.join(get_partition_path(folder, game_id), 'metadata.json')
+    if not os.path.isfile(path) :
+        return(None)
+    with open(path, encoding='utf-8') as f:
+        return(json.load(f))
+
+def is_stale(metadata, signature) :
+    '''
+    This function tells if a partition is missing or has been computed with another signature.
+    '''
+    return(metadata is None or metadata['signature'] != signature)
+
+def compute_partition(actions, home_team_id, xfns = FEATURE_FUNCTIONS, yfns = LABEL_FUNCTIONS, nb_previous_actions = NB_PREVIOUS_ACTIONS) :
+    '''
+    This function computes the features of the game states and the labels of the atomic SPADL actions of a game.
+    '''
+    actions = atomicspadl.add_names(actions)
+    gamestates = fs.gamestates(actions, nb_previous_actions)
+    gamestates = fs.play_left_to_right(gamestates, home_team_id)
+    X = pd.concat([fn(gamestates) for fn in xfns], axis=1)
+    Y = pd.concat([fn(actions) for fn in yfns], axis=1)
+    return(pd.concat([X, Y], axis=1))
+
+def write_partition(folder, game_id, df_partition, signature) :
+    '''
+    This function writes the partition of a game: one float32 .npy file per column (the codes for a categorical column, -1 if missing),
+    and the metadata.
+    The partition is written next to the previous one, which is replaced at the end.
+    '''
+    path = get_partition_path(folder, game_id)
+    tmp_path = path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for i, col in enumerate(df_partition.columns) :
+        values = df_partition[col].cat.codes if isinstance(df_partition[col].dtype, pd.CategoricalDtype) else df_partition[col]
+        np.save(os.path.join(tmp_path, '{}.npy'.format(i)), values.to_numpy(dtype=np.float32))
+    with open(os.path.join(tmp_path, 'metadata.json'), 'w', encoding='utf-8') as f:
+        json.dump({'columns' : list(df_partition.columns), 'n_rows' : len(df_partition), 'signature' : signature}, f)
+    shutil.rmtree(path, ignore_errors=True)
+    os.rename(tmp_path, path)
+
+def build_partitions(folder, df_games, load_actions, xfns = FEATURE_FUNCTIONS, yfns = LABEL_FUNCTIONS,
+                     nb_previous_actions = NB_PREVIOUS_ACTIONS, force = False) :
+    '''
+    This function computes the partitions of the games (game_id, home_team_id) that are missing or stale,
+    load_actions(game_id) returning the atomic SPADL actions of a game. It returns the ids of the games computed.
+    '''
+    signature = get_signature(xfns, yfns, nb_previous_actions)
+    built = []
+    for game in df_games.itertuples() :
+        if force or is_stale(read_metadata(folder, game.game_id), signature) :
+            df_partition = compute_partition(load_actions(game.game_id), game.home_team_id, xfns, yfns, nb_previous_actions)
+            write_partition(folder, game.game_id, df_partition, signature)
+            built.append(game.game_id)
+    return(built)
+
+def read_features(folder, game_ids, columns, max_workers = None, signature = None) :
+    '''
+    This function reads some columns (features or labels) of the partitions of games, in parallel,
+    into a single float32 matrix. The partitions must exist (see build_partitions), and have the signature
+    given (that of the default functions by default).
+    '''
+    signature = get_signature() if signature is None else signature
+    metadatas = [read_metadata(folder, game_id) for game_id in game_ids]
+    stale = [game_id for game_id, metadata in zip(game_ids, metadatas) if is_stale(metadata, signature)]
+    if stale :
+        raise ValueError('missing or stale partitions, build them with build_partitions: {}'.format(stale))
+    missing = [col for col in columns if col not in metadatas[0]['columns']] if metadatas else []
+    if missing :
+        raise ValueError('columns not in the partitions: {}'.format(missing))
+
+    offsets = np.cumsum([0] + [metadata['n_rows'] for metadata in metadatas])
+    X = np.empty((offsets[-1], len(columns)), dtype=np.float32, order='F')
+
+    def read_partition(i) :
+        index = {col : j for j, col in enumerate(metadatas[i]['columns'])}
+        for j, col in enumerate(columns) :
+            X[offsets[i]:offsets[i + 1], j] = np.load(os.path.join(get_partition_path(folder, game_ids[i]), '{}.npy'.format(index[col])), mmap_mode='r')
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor :
+        list(executor.map(read_partition, range(len(game_ids))))
+    return(pd.DataFrame(X, columns=columns, copy=False))
+
+def load_features(folder, df_games, load_actions, columns, max_workers = None) :
+    '''
+    This function reads some columns of the partitions of the games (game_id, home_team_id) into a single float32 matrix,
+    the partitions missing or stale being computed first (see build_partitions).
+    '''
+    build_partitions(folder, df_games, load_actions)
+    return(read_features(folder, list(df_games["game_id"]), columns, max_workers))
+
+def check_feature_store(actions, game_id, home_team_id) :
+    '''
+    This function builds the partition of a game (atomic SPADL actions) in a temporary folder, reads back the features
+    and labels used by the models, and returns the greatest difference with the features computed directly.
+    '''
+    columns = fs.feature_column_names(FEATURE_FUNCTIONS, nb_prev_actions=NB_PREVIOUS_ACTIONS) + [fn.__name__ for fn in LABEL_FUNCTIONS]
+    df_games = pd.DataFrame({'game_id' : [game_id], 'home_team_id' : [home_team_id]})
+    with tempfile.TemporaryDirectory() as folder :
+        df_read = load_features(folder, df_games, lambda game_id : actions, columns)
+        built = build_partitions(folder, df_games, lambda game_id : actions)
+    df_partition = compute_partition(actions, home_team_id)[columns].astype(np.float32)
+    print('Partition of game ' + str(game_id) + ': ' + str(df_read.shape[0]) + ' actions, ' + str(df_read.shape[1]) + ' columns read, '
+          + str(len(built)) + ' partition(s) rebuilt when up to date')
+    return(np.abs(df_read.to_numpy() - df_partition.to_numpy()).max())
+
+if __name__ == '__main__':
+    import vaep_live
+
+    parser = argparse.ArgumentParser(description='Build and read the partition of one game.')
+    parser.add_argument('--events', default=os.path.join('..', 'Data', 'StatsBomb', 'ManCity_Arsenal_events.json'))
+    parser.add_argument('--game-id', type=int, default=3852832)
+    args = parser.parse_args()
+
+    with open(args.events, encoding='utf-8') as f:
+        raw_events = json.load(f)
+    home_team_id = vaep_live.get_home_team_id(raw_events)
+    actions = atomicspadl.convert_to_atomic(spadl.statsbomb.convert_to_actions(vaep_live.read_events(raw_events, args.game_id), home_team_id))
+    print('Greatest difference with the features computed directly: ' + str(check_feature_store(actions, args.game_id, home_team_id)))
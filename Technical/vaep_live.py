@@ -0,0 +1,385 @@
+'''
+This script values the actions of a game while it is played (live substitution assistant), from the StatsBomb events
+arriving by blocks, the work done for a block depending on its number of events and not on the time played:
+- the new events are converted to atomic SPADL actions together with the pending events: the last SPADL action
+  of a block depends on the next one (end of the clearances, dribbles, receivals of the passes),
+  so it is only kept when it is converted again with the next block
+- only the new actions are featurized and scored (see vaep_scoring), with their NB_PREVIOUS_ACTIONS previous actions
+  as context, the score of the game (goalscore features) being counted from the kick off in the state
+- the VAEP values of the new actions are post-processed as in vaep_postprocess: goals rescaling, real time,
+  positions of the players and adjusted VAEP (distribution of the values, matrice_vaep.csv, and weights of the positions, poste.csv)
+- the cumulative VAEP and adjusted VAEP of each player are updated with the new actions, and the cumulative adjusted VAEP
+  of the players at each minute is written as soon as the minute is over (the table of compute_cumulative_vaep)
+replay_events replays the events file of a game by blocks of game time, and check_live_vaep compares the live values
+with the values of the whole game (vaep_scoring.score_game).
+Run it from the Technical folder:
+python vaep_live.py [--events ../Data/StatsBomb/ManCity_Arsenal_events.json] [--lineups ../Data/StatsBomb/ManCity_Arsenal_lineups.json] [--check]
+'''
+
+# LIBRAIRIES ----------------------------------------------------
+# STANDARD LIBRARIES
+import os
+import json
+import time
+import argparse
+import itertools
+import pandas as pd
+import numpy as np
+import warnings
+warnings.simplefilter(action='ignore', category=FutureWarning)
+pd.set_option('max_colwidth', 400)
+pd.set_option('display.max_columns', None)
+pd.options.mode.chained_assignment = None
+
+# Socceraction
+import socceraction.spadl as spadl
+import socceraction.atomic.spadl as atomicspadl
+import socceraction.atomic.vaep.formula as vaepformula
+
+# Others
+import vaep_scoring
+import vaep_postprocess
+
+BLOCK_SECONDS = 60 # seconds of game time per block of the replay
+EVENT_COLUMNS = ["game_id", "event_id", "period_id", "timestamp", "minute", "second", "type_id", "type_name",
+                 "team_id", "team_name", "player_id", "player_name", "position_name", "location", "extra",
+                 "related_events", "under_pressure", "counterpress"]
+GOALSCORE_COLUMNS = ["goalscore_team", "goalscore_opponent", "goalscore_diff"]
+
+# FUNCTIONS ----------------------------------------------------
+
+def flatten_event(event) :
+    '''
+    This function flattens the {id, name} fields of a StatsBomb event (e.g type_id and type_name),
+    the other nested fields being kept in extra.
+    '''
+    flat, extra = {}, {}
+    for key, value in event.items() :
+        if isinstance(value, dict) and "id" in value and "name" in value :
+            flat[key + "_id"] = value["id"]
+            flat[key + "_name"] = value["name"]
+        elif isinstance(value, dict) :
+            extra[key] = value
+        else :
+            flat[key] = value
+    flat["extra"] = extra
+    return(flat)
+
+def read_events(raw_events, game_id) :
+    '''
+    This function reads StatsBomb events (list of JSON events) as the events of socceraction's StatsBombLoader.
+    '''
+    df_events = pd.DataFrame([flatten_event(event) for event in raw_events])
+    df_events = df_events.rename(columns={"id" : "event_id", "index" : "event_index", "period" : "period_id"})
+    df_events = df_events.reindex(columns=df_events.columns.union(EVENT_COLUMNS, sort=False))
+    df_events["game_id"] = game_id
+    df_events["timestamp"] = pd.to_timedelta(df_events["timestamp"])
+    df_events["related_events"] = df_events["related_events"].apply(lambda d: d if isinstance(d, list) else [])
+    df_events["under_pressure"] = df_events["under_pressure"].fillna(False).astype(bool)
+    df_events["counterpress"] = df_events["counterpress"].fillna(False).astype(bool)
+    return(df_events)
+
+def create_live_vaep(game_id, home_team_id, matrix, df_position_weights, model_path = vaep_scoring.MODEL_PATH) :
+    '''
+    This function creates the state of a game valued live, matrix and df_position_weights being read
+    with vaep_postprocess.read_vaep_matrix and read_position_weights.
+    '''
+    models, model_hash = vaep_scoring.load_models(model_path)
+    return({
+        'game_id' : game_id,
+        'home_team_id' : home_team_id,
+        'models' : models,
+        'model_hash' : model_hash,
+        'matrix' : matrix,
+        'position_weights' : df_position_weights,
+        'pending_events' : [], # events of the last SPADL action, converted again with the next block
+        'context' : None, # last atomic actions scored, with their predictions
+        'n_actions' : 0,
+        'teams' : {}, # {team_id : team_name}
+        'players' : {}, # {player_id : {player_name, team_name, jersey_number, is_starter}}
+        'positions' : {}, # {player_id : last position_name}
+        'goals' : {}, # {team_id : goals scored}
+        'end_of_first_period' : 0, # minutes of real time
+        'period' : 1,
+        'real_time' : 0, # minutes of real time of the last action
+        'totals' : pd.DataFrame(columns=["vaep_value", "adjusted_vaep"], dtype=float),
+        'minute' : vaep_postprocess.FIRST_MINUTE - 1, # last minute of the cumulative VAEP
+        'cumulative' : [], # cumulative adjusted VAEP of the players at each minute over
+        'actions' : [], # actions valued, per block
+    })
+
+def seed_players(live, lineups) :
+    '''
+    This function registers the players of both squads from the StatsBomb lineups of the game (list of teams),
+    known before the kick off, so that the substitutes have their jersey number when they come in.
+    '''
+    for team in lineups :
+        for player in team["lineup"] :
+            live['players'][player["player_id"]] = {"player_name" : player["player_name"], "team_name" : team["team_name"],
+                                                    "jersey_number" : player["jersey_number"], "is_starter" : False}
+
+def update_players(live, raw_events) :
+    '''
+    This function updates the teams, the players and their positions from new events:
+    the starting XI, the position of the player of each event, and the replacements taking the position of the player replaced.
+    '''
+    for event in raw_events :
+        if "team" in event :
+            live['teams'][event["team"]["id"]] = event["team"]["name"]
+        if event["type"]["name"] == "Starting XI" :
+            for player in event["tactics"]["lineup"] :
+                live['players'][player["player"]["id"]] = {"player_name" : player["player"]["name"], "team_name" : event["team"]["name"],
+                                                           "jersey_number" : player["jersey_number"], "is_starter" : True}
+                live['positions'][player["player"]["id"]] = player["position"]["name"]
+        elif "player" in event :
+            live['players'].setdefault(event["player"]["id"], {"player_name" : event["player"]["name"], "team_name" : event["team"]["name"],
+                                                               "jersey_number" : np.nan, "is_starter" : False})
+            if "position" in event :
+                live['positions'][event["player"]["id"]] = event["position"]["name"]
+            if "substitution" in event :
+                replacement = event["substitution"]["replacement"]
+                live['players'].setdefault(replacement["id"], {"player_name" : replacement["name"], "team_name" : event["team"]["name"],
+                                                               "jersey_number" : np.nan, "is_starter" : False})
+                live['positions'][replacement["id"]] = live['positions'].get(event["player"]["id"])
+
+def convert_events(live, raw_events, final = False) :
+    '''
+    This function converts the pending events and new events to atomic SPADL actions.
+    The last SPADL action is only kept when final is True (end of the game), otherwise its events stay pending.
+    It returns the new atomic actions and the events converted.
+    '''
+    events = live['pending_events'] + list(raw_events)
+    live['pending_events'] = []
+    if not events :
+        return(pd.DataFrame(), pd.DataFrame(columns=EVENT_COLUMNS))
+    df_events = read_events(events, live['game_id'])
+    actions = spadl.statsbomb.convert_to_actions(df_events, live['home_team_id'])
+    if len(actions) == 0 :
+        return(pd.DataFrame(), df_events)
+
+    atomic_actions = atomicspadl.convert_to_atomic(actions)
+    if not final :
+        # The atomic actions of the last event (which can give several actions, e.g an interception and a pass)
+        # are the last ones, and do not depend on the next actions
+        last_event_id = actions["original_event_id"].iloc[-1]
+        n_last_actions = len(actions) - np.flatnonzero(actions["original_event_id"].to_numpy() == last_event_id)[0]
+        n_last = len(atomicspadl.convert_to_atomic(actions.iloc[-n_last_actions:].reset_index(drop=True)))
+        atomic_actions = atomic_actions.iloc[:len(atomic_actions) - n_last]
+        live['pending_events'] = events[df_events.index[df_events["event_id"] == last_event_id][0]:]
+
+    atomic_actions = atomic_actions.reset_index(drop=True)
+    atomic_actions["action_id"] = live['n_actions'] + np.arange(len(atomic_actions))
+    live['n_actions'] += len(atomic_actions)
+    return(atomic_actions, df_events)
+
+def compute_goalscore(live, actions) :
+    '''
+    This function computes the goalscore features of actions (goals of the team and of its opponent before each action),
+    from the goals of the game before them, and adds the goals of the actions to the score of the game.
+    '''
+    team_id = actions["team_id"].to_numpy()
+    type_name = atomicspadl.add_names(actions)["type_name"].to_numpy()
+    opponent = {team : other for team in live['teams'] for other in live['teams'] if other != team}
+    scorer = np.where(type_name == "goal", team_id,
+                      np.where(type_name == "owngoal", pd.Series(team_id).map(opponent).to_numpy(), np.nan))
+
+    goals_before = {}
+    for team in set(live['teams']) | set(team_id) :
+        goals = (scorer == team).astype(int)
+        goals_before[team] = live['goals'].get(team, 0) + np.cumsum(goals) - goals
+        live['goals'][team] = live['goals'].get(team, 0) + goals.sum()
+    goalscore_team = np.select([team_id == team for team in goals_before], list(goals_before.values()), 0)
+    goalscore_total = np.sum(list(goals_before.values()), axis=0)
+    return(pd.DataFrame({
+        "goalscore_team" : goalscore_team,
+        "goalscore_opponent" : goalscore_total - goalscore_team,
+        "goalscore_diff" : 2 * goalscore_team - goalscore_total,
+    }))
+
+def score_actions(live, actions) :
+    '''
+    This function values new atomic actions, with the last NB_PREVIOUS_ACTIONS actions scored as context.
+    It returns the actions with their names, their predictions (scores, concedes) and their VAEP values.
+    '''
+    context = live['context']
+    n_context = 0 if context is None else len(context)
+    window = actions if context is None else pd.concat([context[actions.columns], actions], ignore_index=True)
+
+    X = vaep_scoring.compute_features(window, live['home_team_id']).iloc[n_context:].reset_index(drop=True)
+    X[GOALSCORE_COLUMNS] = compute_goalscore(live, actions)
+    preds = vaep_scoring.predict(live['models'], X)
+
+    scores = pd.concat([context[vaep_scoring.YCOLS], preds], ignore_index=True) if n_context else preds
+    window = atomicspadl.add_names(window)
+    values = vaepformula.value(window, scores["scores"], scores["concedes"]).iloc[n_context:].reset_index(drop=True)
+
+    live['context'] = pd.concat([window[actions.columns], scores], axis=1).iloc[-vaep_scoring.NB_PREVIOUS_ACTIONS:].reset_index(drop=True)
+    return(pd.concat([window.iloc[n_context:].reset_index(drop=True), preds, values], axis=1))
+
+def postprocess_actions(live, df_actions, df_events) :
+    '''
+    This function adds the players infos, the real time, the positions and the adjusted VAEP of new valued actions
+    (see vaep_postprocess).
+    '''
+    df_players = pd.DataFrame.from_dict(live['players'], orient='index')
+    df_actions = df_actions.join(df_players, on="player_id")
+    df_actions["game_id"] = live['game_id']
+    df_actions = vaep_postprocess.rescale_goals(df_actions)
+
+    # Real time, the second period starting at the end of the first one
+    minutes = df_actions["time_seconds"] / 60
+    first_period = minutes.where(df_actions["period_id"] == 1).round(3)
+    live['end_of_first_period'] = max(live['end_of_first_period'], first_period.max(skipna=True) if first_period.notnull().any() else 0)
+    df_actions["real_time_mn"] = np.where(df_actions["period_id"] == 1,
+                                          first_period,
+                                          np.where(df_actions["period_id"] == 2, (minutes + live['end_of_first_period']).round(3), np.nan))
+    df_actions["round_real_time_mn"] = np.ceil(df_actions["real_time_mn"])
+
+    # Position of the player at each action, or else their last known position
+    df_actions = df_actions.merge(df_events[["event_id", "player_id", "position_name"]].drop_duplicates(),
+                                  how='left', left_on=['original_event_id', "player_id"], right_on=["event_id", "player_id"])
+    df_actions["position_name"] = df_actions["position_name"].fillna(df_actions["player_id"].map(live['positions']))
+    return(vaep_postprocess.adjust_vaep(df_actions, live['matrix'], live['position_weights']))
+
+def write_minutes(live, last_minute) :
+    '''
+    This function writes the cumulative adjusted VAEP of the players who have played at each minute over, until last_minute.
+    '''
+    for minute in range(live['minute'] + 1, int(last_minute) + 1) :
+        df_minute = live['totals'][["adjusted_vaep"]].rename_axis("player_id").reset_index()
+        df_minute["time"] = minute
+        df_minute["period"] = live['period']
+        live['cumulative'].append(df_minute)
+    live['minute'] = max(live['minute'], int(last_minute))
+
+def update_cumulative_vaep(live, df_actions) :
+    '''
+    This function adds the VAEP of new actions to the cumulative VAEP of the players:
+    as in compute_cumulative_vaep, an action counts from the first minute after it, and the minutes before are written first.
+    '''
+    df_actions = df_actions.dropna(subset=["player_id", "real_time_mn"])
+    df_actions["time"] = np.maximum(np.floor(df_actions["real_time_mn"]) + 1, vaep_postprocess.FIRST_MINUTE)
+    for minute, df_minute in df_actions.groupby("time", sort=True) :
+        write_minutes(live, minute - 1)
+        df_sums = df_minute.groupby("player_id")[["vaep_value", "adjusted_vaep"]].sum()
+        live['totals'] = live['totals'].add(df_sums, fill_value=0)
+        live['period'] = df_minute["period_id"].iloc[-1]
+        live['real_time'] = max(live['real_time'], df_minute["real_time_mn"].max())
+
+def update_live_vaep(live, raw_events, final = False) :
+    '''
+    This function values the new events of a game (list of StatsBomb JSON events), final being True at the end of the game.
+    It returns the new actions valued.
+    '''
+    update_players(live, raw_events)
+    actions, df_events = convert_events(live, raw_events, final)
+    if len(actions) :
+        df_actions = postprocess_actions(live, score_actions(live, actions), df_events)
+        update_cumulative_vaep(live, df_actions)
+        live['actions'].append(df_actions)
+    else :
+        df_actions = pd.DataFrame()
+    if final :
+        write_minutes(live, np.ceil(live['real_time']))
+    return(df_actions)
+
+def get_player_vaep(live) :
+    '''
+    This function returns the cumulative VAEP and adjusted VAEP of the players, from the best adjusted VAEP.
+    '''
+    df_players = pd.DataFrame.from_dict(live['players'], orient='index')
+    df_totals = live['totals'].join(df_players).rename_axis("player_id").reset_index()
+    return(df_totals.sort_values("adjusted_vaep", ascending=False).reset_index(drop=True))
+
+def get_cumulative_vaep(live) :
+    '''
+    This function returns the cumulative adjusted VAEP of the players at each minute over
+    (columns of compute_cumulative_vaep, without the minutes played, unknown during the game).
+    '''
+    if not live['cumulative'] :
+        return(pd.DataFrame())
+    df_cumulative = pd.concat(live['cumulative'], ignore_index=True)
+    df_cumulative = df_cumulative.join(pd.DataFrame.from_dict(live['players'], orient='index'), on="player_id")
+    df_cumulative["game_id"] = live['game_id']
+    df_cumulative["official_clock"] = vaep_postprocess.get_official_clock(df_cumulative["time"], df_cumulative["period"], live['end_of_first_period'])
+    return(df_cumulative[["player_id", "jersey_number", "team_name", "game_id", "adjusted_vaep", "player_name", "is_starter", "time", "period", "official_clock"]])
+
+# REPLAY ----------------------------------------------------
+
+def split_events(raw_events, block_seconds = BLOCK_SECONDS) :
+    '''
+    This function splits the events of a game in blocks of block_seconds of game time.
+    '''
+    key = lambda event : (event["period"], (60 * event["minute"] + event["second"]) // block_seconds)
+    return([list(block) for _, block in itertools.groupby(raw_events, key=key)])
+
+def get_home_team_id(raw_events) :
+    '''
+    This function returns the team of the first starting XI of the events, the home team.
+    '''
+    return(next(event["team"]["id"] for event in raw_events if event["type"]["name"] == "Starting XI"))
+
+def replay_events(raw_events, live, block_seconds = BLOCK_SECONDS, speed = None) :
+    '''
+    This function values the events of a game by blocks of block_seconds of game time, waiting between the blocks
+    when a speed is given (e.g 10 for 10x). It returns the number of events and the time spent (seconds) of each block.
+    '''
+    timings = []
+    blocks = split_events(raw_events, block_seconds)
+    for i, block in enumerate(blocks) :
+        start = time.perf_counter()
+        update_live_vaep(live, block, final=(i == len(blocks) - 1))
+        timings.append((len(block), time.perf_counter() - start))
+        if speed :
+            time.sleep(max(0, block_seconds / speed - timings[-1][1]))
+    return(timings)
+
+def check_live_vaep(live, raw_events, model_path = vaep_scoring.MODEL_PATH) :
+    '''
+    This function values the whole game at once (vaep_scoring.score_game) and returns the greatest difference
+    between its VAEP values and the live ones, None if the actions differ.
+    '''
+    df_events = read_events(raw_events, live['game_id'])
+    actions = atomicspadl.convert_to_atomic(spadl.statsbomb.convert_to_actions(df_events, live['home_team_id']))
+    df_batch = vaep_scoring.score_game(live['game_id'], live['home_team_id'], actions, model_path, predictions_folder=None)
+    df_live = pd.concat(live['actions'], ignore_index=True)
+    if len(df_batch) != len(df_live) or (df_batch["type_name"].to_numpy() != df_live["type_name"].to_numpy()).any() :
+        return(None)
+    return(np.abs(df_batch["vaep_value"].to_numpy() - df_live["vaep_value"].to_numpy()).max())
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay the events of a game through the live VAEP.')
+    parser.add_argument('--events', default=os.path.join('..', 'Data', 'StatsBomb', 'ManCity_Arsenal_events.json'))
+    parser.add_argument('--lineups', default=os.path.join('..', 'Data', 'StatsBomb', 'ManCity_Arsenal_lineups.json'),
+                        help='squads of the teams, for the jersey numbers of the substitutes')
+    parser.add_argument('--game-id', type=int, default=3852832)
+    parser.add_argument('--home-team-id', type=int, default=None, help='team of the first starting XI by default')
+    parser.add_argument('--block-seconds', type=int, default=BLOCK_SECONDS)
+    parser.add_argument('--speed', type=float, default=None, help='replay speed (e.g 10 for 10x), as fast as possible by default')
+    parser.add_argument('--model', default=vaep_scoring.MODEL_PATH)
+    parser.add_argument('--matrix', default='matrice_vaep.csv', help='distribution of the VAEP values (Training-VAEP-model.ipynb)')
+    parser.add_argument('--positions', default='poste.csv')
+    parser.add_argument('--output', default=None, help='CSV file of the cumulative adjusted VAEP per minute')
+    parser.add_argument('--check', action='store_true', help='compare the live VAEP values with the values of the whole game')
+    args = parser.parse_args()
+
+    with open(args.events, encoding='utf-8') as f:
+        raw_events = json.load(f)
+    home_team_id = args.home_team_id if args.home_team_id is not None else get_home_team_id(raw_events)
+    live = create_live_vaep(args.game_id, home_team_id,
+                            vaep_postprocess.read_vaep_matrix(args.matrix),
+                            vaep_postprocess.read_position_weights(args.positions),
+                            args.model)
+    with open(args.lineups, encoding='utf-8') as f:
+        seed_players(live, json.load(f))
+
+    timings = replay_events(raw_events, live, args.block_seconds, args.speed)
+    durations = np.array([duration for n_events, duration in timings])
+    print('Replayed ' + str(len(raw_events)) + ' events in ' + str(len(timings)) + ' blocks: ' + str(live['n_actions']) + ' actions, '
+          + 'mean ' + str(round(1000 * durations.mean(), 1)) + ' ms, max ' + str(round(1000 * durations.max(), 1)) + ' ms per block')
+    print(get_player_vaep(live).head(10))
+
+    if args.output :
+        get_cumulative_vaep(live).to_csv(args.output, index=False)
+    if args.check :
+        print('Greatest difference with the whole game: ' + str(check_live_vaep(live, raw_events, args.model)))
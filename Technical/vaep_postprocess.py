@@ -0,0 +1,193 @@
+'''
+This script post-processes the VAEP values of the atomic actions of several games (see Analyzing-VAEP-games.ipynb),
+on whole columns at once:
+- players' nicknames, goals rescaling, real time played and positions of the players
+- VAEP adjusted to the distribution of the values of each type of action and position (matrice_vaep.csv),
+  and weighted by the offensive and defensive parts of each position (poste.csv)
+- cumulative adjusted VAEP of the players per minute played, mean over several games,
+  and rating of the substitutes per position (the tables read by the App)
+'''
+
+# LIBRAIRIES ----------------------------------------------------
+# STANDARD LIBRARIES
+import pandas as pd
+import numpy as np
+import warnings
+warnings.simplefilter(action='ignore', category=FutureWarning)
+pd.set_option('max_colwidth', 400)
+pd.set_option('display.max_columns', None)
+pd.options.mode.chained_assignment = None
+
+GOAL_RESCALING = 10
+FIRST_MINUTE = 3
+PLAYER_KEYS = ["player_id", "jersey_number", "team_name", "game_id"]
+
+# FUNCTIONS ----------------------------------------------------
+
+def use_nicknames(df_actions) :
+    '''
+    This function uses the nickname of the players as their name when they have one.
+    '''
+    has_nickname = df_actions["nickname"].notnull() & (df_actions["nickname"] != "")
+    df_actions["player_name"] = np.where(has_nickname, df_actions["nickname"], df_actions["player_name"])
+    return(df_actions.drop(columns=["nickname"]))
+
+def rescale_goals(df_actions, rescaling = GOAL_RESCALING) :
+    '''
+    This function divides the offensive value of the goals, so that a goal does not make the VAEP of a player skyrocket.
+    '''
+    df_actions["offensive_value"] = np.where(df_actions["type_name"] == 'goal',
+                                             df_actions["offensive_value"] / rescaling,
+                                             df_actions["offensive_value"])
+    return(df_actions)
+
+def add_real_time(df_actions) :
+    '''
+    This function adds the real time played in minutes (real_time_mn), the second period starting at the end
+    of the first one in each game, so that there are not two 46th minutes, and its rounding up (round_real_time_mn).
+    The actions of the other periods have no real time.
+    '''
+    minutes = df_actions["time_seconds"] / 60
+    first_period = minutes.where(df_actions["period_id"] == 1).round(3)
+    end_of_first_period = first_period.groupby(df_actions["game_id"]).transform('max')
+    df_actions["real_time_mn"] = np.where(df_actions["period_id"] == 1,
+                                          first_period,
+                                          np.where(df_actions["period_id"] == 2, (minutes + end_of_first_period).round(3), np.nan))
+    df_actions["round_real_time_mn"] = np.ceil(df_actions["real_time_mn"])
+    return(df_actions)
+
+def add_positions(df_actions, df_events) :
+    '''
+    This function adds the position of the player at each action (position_name), from the StatsBomb events.
+    When it is not given, the starting position of the player is used, or else their only position in the events.
+    '''
+    df_actions = df_actions.merge(df_events[["game_id", "event_id", "player_id", "position_name"]].drop_duplicates(),
+                                  how='left', left_on=["game_id", 'original_event_id', "player_id"], right_on=['game_id', "event_id", "player_id"])
+    df_actions["position_name"] = df_actions["position_name"].fillna(df_actions["starting_position_name"])
+    df_actions.loc[df_actions["position_name"] == "Substitute", "position_name"] = np.nan
+
+    # Players still without a position: their position in the events, if they only had one
+    missing_players = df_actions.loc[df_actions["position_name"].isnull(), "player_id"].unique()
+    df_missing = df_events[["player_id", "position_name"]].drop_duplicates()
+    df_missing = df_missing[df_missing["player_id"].isin(missing_players)].drop_duplicates(subset='player_id', keep=False)
+    df_actions["position_name"] = df_actions["position_name"].fillna(df_actions["player_id"].map(df_missing.set_index("player_id")["position_name"]))
+    return(df_actions)
+
+def read_vaep_matrix(path) :
+    '''
+    This function reads the distribution of the VAEP values per type of position and type of action
+    (mean and standard deviation, see Training-VAEP-model.ipynb).
+    '''
+    matrix = pd.read_csv(path)
+    matrix = matrix.drop(index=0).drop(columns="Unnamed: 0")
+    matrix = matrix.rename(columns={
+        "offensive_value" : "offensive_value_mean",
+        "offensive_value.1" : "offensive_value_std",
+        "defensive_value" : "defensive_value_mean",
+        "defensive_value.1" : "defensive_value_std",
+    })
+    return(matrix.astype({
+        "offensive_value_mean" : float,
+        "offensive_value_std" : float,
+        "defensive_value_mean" : float,
+        "defensive_value_std" : float,
+    }))
+
+def read_position_weights(path) :
+    '''
+    This function reads the type (Defender, Midfielder...) and the offensive and defensive parts of each position.
+    '''
+    return(pd.read_csv(path, sep=";").set_index("position_name"))
+
+def adjust_vaep(df_actions, matrix, df_position_weights) :
+    '''
+    This function adjusts the offensive and defensive values of the actions to their distribution
+    for the type of action and of position, and weights them by the parts of the position (adjusted_vaep).
+    '''
+    df_actions["poste_type"] = df_actions["position_name"].map(df_position_weights["type"])
+    df_actions = df_actions.merge(matrix, how='left', on=["poste_type", "type_name"])
+
+    df_actions["adjusted_offensive"] = (
+        (df_actions["offensive_value"] - df_actions["offensive_value_mean"]) / (df_actions["offensive_value_std"]))
+    df_actions["adjusted_defensive"] = (
+        (df_actions["defensive_value"] - df_actions["defensive_value_mean"]) / (df_actions["defensive_value_std"]))
+
+    df_actions["offensive_part"] = df_actions["position_name"].map(df_position_weights["offensive"])
+    df_actions["defensive_part"] = df_actions["position_name"].map(df_position_weights["defensive"])
+    df_actions["adjusted_vaep"] = ((df_actions["offensive_part"] * df_actions["adjusted_offensive"])
+                                   + (df_actions["defensive_part"] * df_actions["adjusted_defensive"]))
+    return(df_actions)
+
+def get_official_clock(time, period, end_of_1st) :
+    '''
+    This function writes minutes of real time played as the official clock (e.g 45'+2), the second period
+    starting at end_of_1st minutes of real time.
+    '''
+    return(np.where(period == 1,
+                    np.where(time > 45, "45'+" + (time - 45).astype(str), time.astype(str)),
+                    np.where(time > 45 + end_of_1st,
+                             "90'+" + np.round(time - end_of_1st - 45).astype(int).astype(str),
+                             (np.round(time - end_of_1st).astype(int) + 45).astype(str))))
+
+def compute_cumulative_vaep(df_game, df_players) :
+    '''
+    This function computes the cumulative adjusted VAEP of the players of a game at each minute of real time played,
+    from the 3rd minute to the end of the game: at minute t, the sum over the actions before t of the players
+    who made at least one action. df_game is sorted by period and time, df_players gives the name, starting status
+    and minutes played of the players of the game.
+    It also adds the period and the official clock (e.g 45'+2) of each minute.
+    '''
+    df_game = df_game.reset_index(drop=True)
+    last_minute = int(np.ceil(df_game["real_time_mn"].iloc[-1]))
+    end_of_1st = df_game.loc[df_game["period_id"] == 1, "real_time_mn"].iloc[-1]
+    minutes = np.arange(FIRST_MINUTE, last_minute + 1)
+
+    # Each action counts from the first minute after it
+    df_game["time"] = np.maximum(np.floor(df_game["real_time_mn"]) + 1, FIRST_MINUTE)
+    df_game = df_game[df_game["time"] <= last_minute]
+
+    # Sum of the actions of each player per minute, then cumulated from the first action of the player
+    df_sums = df_game.dropna(subset=PLAYER_KEYS).groupby(PLAYER_KEYS + ["time"])["adjusted_vaep"].sum().unstack("time")
+    df_sums = df_sums.reindex(columns=minutes)
+    has_played = df_sums.notnull().cummax(axis=1)
+    df_cumulative = df_sums.fillna(0).cumsum(axis=1).where(has_played).stack().rename("adjusted_vaep").reset_index()
+    df_cumulative = df_cumulative.sort_values(["time"] + PLAYER_KEYS, kind='stable').reset_index(drop=True)
+
+    # Add player names
+    df_cumulative = df_cumulative.merge(df_players[["player_id", "player_name", "is_starter", "minutes_played"]].drop_duplicates(), how="left")
+
+    # Period of the last action before each minute
+    last_action = pd.Series(df_game.index, index=df_game["time"].astype(int)).groupby(level=0).max()
+    last_action = last_action.reindex(minutes).ffill().cummax()
+    period = pd.Series(df_game["period_id"].reindex(last_action.values).values, index=minutes)
+    df_cumulative["time"] = df_cumulative["time"].astype(int)
+    df_cumulative["period"] = df_cumulative["time"].map(period)
+
+    # Change time format
+    df_cumulative["official_clock"] = get_official_clock(df_cumulative["time"], df_cumulative["period"], end_of_1st)
+    return(df_cumulative[PLAYER_KEYS + ["adjusted_vaep", "player_name", "is_starter", "minutes_played", "time", "period", "official_clock"]])
+
+def compute_games_cumulative_vaep(df_actions, df_players) :
+    '''
+    This function computes the cumulative adjusted VAEP of the players of several games (see compute_cumulative_vaep).
+    '''
+    return(pd.concat([compute_cumulative_vaep(df_game, df_players[df_players["game_id"] == game_id])
+                      for game_id, df_game in df_actions.groupby("game_id", sort=False)]))
+
+def compute_mean_cumulative_vaep(df_cumulative) :
+    '''
+    This function averages the cumulative adjusted VAEP of the players over several games, per minute of real time played.
+    '''
+    df_mean = df_cumulative.groupby(["player_name", "player_id", "team_name", "time"])[["adjusted_vaep"]].mean()
+    return(df_mean.reset_index())
+
+def compute_substitution_ratings(df_actions, df_positions, starting_players) :
+    '''
+    This function rates the players on their adjusted VAEP per 90 minutes played over several games,
+    for each position they played (df_positions: player_name, player_id, position), except the starting players.
+    '''
+    df_ranking = df_actions[["player_id", "minutes_played", "adjusted_vaep"]].groupby("player_id").sum().reset_index()
+    df_ranking["vaep_rating_per_mn_played"] = df_ranking["adjusted_vaep"] * 90 / df_ranking["minutes_played"]
+    df_ratings = df_positions.merge(df_ranking[["player_id", "vaep_rating_per_mn_played"]]).sort_values(
+        by=["position", "vaep_rating_per_mn_played"], ascending=[True, False])
+    return(df_ratings[~df_ratings["player_id"].isin(starting_players)])
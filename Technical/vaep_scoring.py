@@ -0,0 +1,173 @@
+'''
+This script values atomic SPADL actions with the trained VAEP models (see Training-VAEP-model.ipynb), by batches of games:
+- the models (scores and concedes) are loaded once per model file, and identified by the hash of the file
+- the features of the game states (the action and its NB_PREVIOUS_ACTIONS previous actions) of all the games
+  of a batch are computed and stacked, then each model predicts the whole batch in a single call
+- the predictions of each game are cached per (game, model hash, actions hash), in memory and in PREDICTIONS_FOLDER,
+  so that a game is only predicted again when the model or its actions change (the actions hash is a hash of their content)
+- the VAEP values are computed from the predictions with vaepformula.value, on all the actions of a game at once
+'''
+
+# LIBRAIRIES ----------------------------------------------------
+# STANDARD LIBRARIES
+import os
+import hashlib
+import pickle
+import threading
+import pandas as pd
+import numpy as np
+import warnings
+warnings.simplefilter(action='ignore', category=FutureWarning)
+pd.set_option('max_colwidth', 400)
+pd.set_option('display.max_columns', None)
+pd.options.mode.chained_assignment = None
+
+# Socceraction
+import socceraction.atomic.spadl as atomicspadl
+import socceraction.atomic.vaep.features as fs
+import socceraction.atomic.vaep.formula as vaepformula
+
+MODEL_PATH = os.path.join("modeles", "mixed_VAEP_model.pkl")
+PREDICTIONS_FOLDER = os.path.join("Data", "vaep-predictions")
+NB_PREVIOUS_ACTIONS = 3
+LIST_FEATURES = [
+    fs.actiontype_onehot,
+    fs.bodypart_onehot,
+    fs.goalscore,
+    fs.location,
+    fs.polar,
+    fs.movement_polar,
+    fs.direction,
+    fs.team,
+    fs.time,
+    fs.time_delta,
+]
+XCOLS = fs.feature_column_names(LIST_FEATURES, nb_prev_actions=NB_PREVIOUS_ACTIONS)
+YCOLS = ["scores", "concedes"]
+
+# FUNCTIONS ----------------------------------------------------
+
+def get_model_hash(model_path) :
+    '''
+    This function returns the hash of a model file (SHA-1 of its content).
+    '''
+    sha1 = hashlib.sha1()
+    with open(model_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 ** 2), b''):
+            sha1.update(chunk)
+    return(sha1.hexdigest())
+
+# {model path : (modification time and size, model hash, models)}
+_models = {}
+_models_lock = threading.Lock()
+
+def load_models(model_path = MODEL_PATH) :
+    '''
+    This function returns the models of a model file ({'scores' : model, 'concedes' : model}) and the hash of the file.
+    The file is only read again when it changes.
+    '''
+    stat = os.stat(model_path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _models_lock :
+        if model_path not in _models or _models[model_path][0] != signature :
+            with open(model_path, 'rb') as file:
+                models = pickle.load(file)
+            _models[model_path] = (signature, get_model_hash(model_path), models)
+        signature, model_hash, models = _models[model_path]
+    return(models, model_hash)
+
+def compute_features(actions, home_team_id) :
+    '''
+    This function computes the features of the game states of the atomic SPADL actions of a game (XCOLS).
+    '''
+    gamestates = fs.gamestates(atomicspadl.add_names(actions), NB_PREVIOUS_ACTIONS)
+    gamestates = fs.play_left_to_right(gamestates, home_team_id)
+    X = pd.concat([fn(gamestates) for fn in LIST_FEATURES], axis=1)
+    return(X[XCOLS])
+
+def predict(models, X) :
+    '''
+    This function predicts the probabilities of scoring and conceding of the game states X.
+    '''
+    return(pd.DataFrame({col : models[col].predict_proba(X)[:, 1] for col in YCOLS}))
+
+def get_actions_hash(actions, home_team_id) :
+    '''
+    This function returns the hash of the content of the atomic SPADL actions of a game (and of the home team,
+    which changes the features), used to know if cached predictions were made on the same actions.
+    '''
+    sha1 = hashlib.sha1(pd.util.hash_pandas_object(actions, index=False).to_numpy().tobytes())
+    sha1.update(str(home_team_id).encode())
+    return(sha1.hexdigest())
+
+def get_predictions_path(game_id, model_hash, actions_hash, predictions_folder = PREDICTIONS_FOLDER) :
+    return(os.path.join(predictions_folder, '{}_{}_{}.csv'.format(game_id, model_hash[:12], actions_hash[:12])))
+
+# {(game_id, model hash, actions hash) : predictions}
+_predictions = {}
+_predictions_lock = threading.Lock()
+
+def get_cached_predictions(game_id, model_hash, actions_hash, predictions_folder = PREDICTIONS_FOLDER) :
+    '''
+    This function returns the cached predictions of a game for a model, None if they are not cached
+    or if they were made on other actions (another actions hash).
+    '''
+    key = (game_id, model_hash, actions_hash)
+    with _predictions_lock :
+        preds = _predictions.get(key)
+    path = get_predictions_path(game_id, model_hash, actions_hash, predictions_folder) if predictions_folder else None
+    if preds is None and path and os.path.isfile(path) :
+        preds = pd.read_csv(path)
+        with _predictions_lock :
+            _predictions[key] = preds
+    return(preds)
+
+def cache_predictions(game_id, model_hash, actions_hash, preds, predictions_folder = PREDICTIONS_FOLDER) :
+    '''
+    This function caches the predictions of a game for a model, in memory and in predictions_folder.
+    The predictions of the game made on other actions by the same model are removed.
+    '''
+    with _predictions_lock :
+        for key in [key for key in _predictions if key[:2] == (game_id, model_hash)] :
+            del _predictions[key]
+        _predictions[(game_id, model_hash, actions_hash)] = preds
+    if predictions_folder :
+        os.makedirs(predictions_folder, exist_ok=True)
+        prefix = '{}_{}_'.format(game_id, model_hash[:12])
+        for filename in os.listdir(predictions_folder) :
+            if filename.startswith(prefix) :
+                os.remove(os.path.join(predictions_folder, filename))
+        preds.to_csv(get_predictions_path(game_id, model_hash, actions_hash, predictions_folder), index=False)
+
+def score_games(games, model_path = MODEL_PATH, predictions_folder = PREDICTIONS_FOLDER) :
+    '''
+    This function values the atomic SPADL actions of a batch of games, given as a list of (game_id, home_team_id, actions).
+    The games whose predictions are not cached are predicted together, in one call per model.
+    It returns {game_id : actions with their names, the predictions (scores, concedes) and the VAEP values}.
+    '''
+    models, model_hash = load_models(model_path)
+
+    # Predictions of the games not cached yet, on the stacked features of the batch
+    actions_hashes = {game_id : get_actions_hash(actions, home_team_id) for game_id, home_team_id, actions in games}
+    preds = {game_id : get_cached_predictions(game_id, model_hash, actions_hashes[game_id], predictions_folder) for game_id, home_team_id, actions in games}
+    missing = [(game_id, home_team_id, actions) for game_id, home_team_id, actions in games if preds[game_id] is None]
+    if missing :
+        X = pd.concat([compute_features(actions, home_team_id) for game_id, home_team_id, actions in missing], ignore_index=True)
+        Y_pred = predict(models, X)
+        starts = np.cumsum([0] + [len(actions) for game_id, home_team_id, actions in missing])
+        for (game_id, home_team_id, actions), start, end in zip(missing, starts[:-1], starts[1:]) :
+            preds[game_id] = Y_pred.iloc[start:end].reset_index(drop=True)
+            cache_predictions(game_id, model_hash, actions_hashes[game_id], preds[game_id], predictions_folder)
+
+    # VAEP values of each game
+    values = {}
+    for game_id, home_team_id, actions in games :
+        actions = atomicspadl.add_names(actions).reset_index(drop=True)
+        values[game_id] = pd.concat([actions, preds[game_id], vaepformula.value(actions, preds[game_id]["scores"], preds[game_id]["concedes"])], axis=1)
+    return(values)
+
+def score_game(game_id, home_team_id, actions, model_path = MODEL_PATH, predictions_folder = PREDICTIONS_FOLDER) :
+    '''
+    This function values the atomic SPADL actions of one game (see score_games).
+    '''
+    return(score_games([(game_id, home_team_id, actions)], model_path, predictions_folder)[game_id])